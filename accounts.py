@@ -0,0 +1,298 @@
+import hashlib
+import json
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+
+MAX_BACKOFF_LEVEL = 255
+
+
+def account_key(token):
+    """Функция возвращает ключ аккаунта по токену, не раскрывая токен."""
+    return hashlib.sha256(str(token).encode()).hexdigest()[:32]
+
+
+@dataclass
+class Account:
+    """
+    Класс хранит состояние опроса API для одного аккаунта.
+    Содержит токен Практикума, идентификатор чата Telegram,
+    временную метку последнего опроса, отпечаток последней ошибки,
+    последний полученный статус работы, время его смены
+    и уровень backoff.
+    subscribers — дополнительные чаты и каналы (группа наставников,
+    канал курса), которые получают уведомления о статусах работ.
+    """
+
+    token: str
+    chat_id: str
+    current_timestamp: int = field(default_factory=lambda: int(time.time()))
+    current_error: str = ''
+    last_status: str = ''
+    status_changed_at: float = 0.0
+    backoff_level: int = 0
+    subscribers: tuple = ()
+
+    @property
+    def key(self):
+        """Возвращает ключ аккаунта для хранилища без самого токена."""
+        return account_key(self.token)
+
+    @property
+    def destinations(self):
+        """Возвращает чат аккаунта и чаты подписчиков без повторов."""
+        return tuple(dict.fromkeys((self.chat_id, *self.subscribers)))
+
+
+def load_accounts(path):
+    """
+    Функция загружает список аккаунтов из JSON-файла.
+    Файл должен содержать список объектов с ключами
+    practicum_token и chat_id и необязательным списком subscribers.
+    Возвращает список экземпляров Account.
+    """
+    with open(path, encoding='utf-8') as accounts_file:
+        data = json.load(accounts_file)
+    if not isinstance(data, list):
+        raise TypeError(f'Файл аккаунтов должен содержать список. '
+                        f'Тип: {type(data)}')
+    return [Account(token=item['practicum_token'], chat_id=item['chat_id'],
+                    subscribers=tuple(item.get('subscribers', ())))
+            for item in data]
+
+
+class Symbols:
+    """
+    Класс нумерует повторяющиеся строки (статусы, отпечатки ошибок).
+    В колонках таблицы аккаунтов хранятся номера строк,
+    а сами строки хранятся в одном экземпляре.
+    """
+
+    def __init__(self):
+        self.values = ['']
+        self.codes = {'': 0}
+
+    def code(self, value):
+        """Возвращает номер строки, добавляя ее при первом обращении."""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+
+class AccountTable:
+    """
+    Класс хранит состояние опроса множества аккаунтов по колонкам.
+    Числовые поля (курсор, время следующего опроса, уровень backoff,
+    номера статуса и отпечатка ошибки) и числовые идентификаторы чатов
+    лежат в массивах array, статусы и отпечатки ошибок хранятся один раз
+    в Symbols, поэтому аккаунт занимает десятки байт вместо сотен
+    у экземпляра Account. Строковые идентификаторы чатов (@channel)
+    и подписчики хранятся в словарях только у тех аккаунтов, где заданы.
+    Время следующего опроса индексировано двоичной кучей: schedule
+    переставляет аккаунт за O(log n), peek возвращает ближайший.
+    Элементы таблицы — легкие строки AccountRow с интерфейсом Account.
+    """
+
+    def __init__(self, accounts=()):
+        self.tokens = []
+        self.chat_ids = array('q')
+        self.chat_names = {}
+        self.subscribers = {}
+        self.cursors = array('q')
+        self.next_due = array('d')
+        self.status_changed_at = array('d')
+        self.backoff_levels = array('B')
+        self.status_codes = array('H')
+        self.error_codes = array('I')
+        self.statuses = Symbols()
+        self.errors = Symbols()
+        self._heap = array('q')
+        self._positions = array('q')
+        for account in accounts:
+            self.append(account.token, account.chat_id,
+                        account.current_timestamp, account.subscribers)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self.tokens):
+            raise IndexError(f'Нет аккаунта с номером {index}')
+        return AccountRow(self, index)
+
+    def __iter__(self):
+        return (AccountRow(self, index) for index in range(len(self)))
+
+    def append(self, token, chat_id, current_timestamp=None,
+               subscribers=(), due=0.0):
+        """Добавляет аккаунт в таблицу и возвращает его номер."""
+        index = len(self.tokens)
+        self.tokens.append(token)
+        if isinstance(chat_id, int):
+            self.chat_ids.append(chat_id)
+        else:
+            self.chat_ids.append(0)
+            self.chat_names[index] = chat_id
+        if subscribers:
+            self.subscribers[index] = tuple(subscribers)
+        if current_timestamp is None:
+            current_timestamp = int(time.time())
+        self.cursors.append(current_timestamp)
+        self.next_due.append(due)
+        self.status_changed_at.append(0.0)
+        self.backoff_levels.append(0)
+        self.status_codes.append(0)
+        self.error_codes.append(0)
+        self._heap.append(index)
+        self._positions.append(index)
+        self._sift_up(index)
+        return index
+
+    def peek(self):
+        """Возвращает номер аккаунта с ближайшим опросом или None."""
+        return self._heap[0] if self._heap else None
+
+    def schedule(self, index, due):
+        """Назначает время следующего опроса аккаунта."""
+        previous = self.next_due[index]
+        self.next_due[index] = due
+        if due < previous:
+            self._sift_up(self._positions[index])
+        else:
+            self._sift_down(self._positions[index])
+
+    def _sift_up(self, position):
+        heap, positions, next_due = self._heap, self._positions, self.next_due
+        index = heap[position]
+        due = next_due[index]
+        while position:
+            parent = (position - 1) >> 1
+            parent_index = heap[parent]
+            if next_due[parent_index] <= due:
+                break
+            heap[position] = parent_index
+            positions[parent_index] = position
+            position = parent
+        heap[position] = index
+        positions[index] = position
+
+    def _sift_down(self, position):
+        heap, positions, next_due = self._heap, self._positions, self.next_due
+        size = len(heap)
+        index = heap[position]
+        due = next_due[index]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if (child + 1 < size
+                    and next_due[heap[child + 1]] < next_due[heap[child]]):
+                child += 1
+            child_index = heap[child]
+            if next_due[child_index] >= due:
+                break
+            heap[position] = child_index
+            positions[child_index] = position
+            position = child
+        heap[position] = index
+        positions[index] = position
+
+
+class AccountRow:
+    """
+    Класс предоставляет доступ к аккаунту в AccountTable.
+    Атрибуты совпадают с Account, чтение и запись идут в колонки таблицы,
+    поэтому строку можно передавать в функции опроса и политики.
+    """
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __repr__(self):
+        return f'AccountRow(index={self.index}, chat_id={self.chat_id!r})'
+
+    @property
+    def token(self):
+        """Возвращает токен Практикума."""
+        return self.table.tokens[self.index]
+
+    @property
+    def chat_id(self):
+        """Возвращает идентификатор чата Telegram."""
+        chat_id = self.table.chat_names.get(self.index)
+        if chat_id is None:
+            return self.table.chat_ids[self.index]
+        return chat_id
+
+    @property
+    def subscribers(self):
+        """Возвращает дополнительные чаты аккаунта."""
+        return self.table.subscribers.get(self.index, ())
+
+    @subscribers.setter
+    def subscribers(self, value):
+        if value:
+            self.table.subscribers[self.index] = tuple(value)
+        else:
+            self.table.subscribers.pop(self.index, None)
+
+    @property
+    def current_timestamp(self):
+        """Возвращает временную метку последнего опроса."""
+        return self.table.cursors[self.index]
+
+    @current_timestamp.setter
+    def current_timestamp(self, value):
+        self.table.cursors[self.index] = value
+
+    @property
+    def current_error(self):
+        """Возвращает отпечаток последней ошибки."""
+        return self.table.errors.values[self.table.error_codes[self.index]]
+
+    @current_error.setter
+    def current_error(self, value):
+        self.table.error_codes[self.index] = self.table.errors.code(value)
+
+    @property
+    def last_status(self):
+        """Возвращает последний полученный статус работы."""
+        return self.table.statuses.values[
+            self.table.status_codes[self.index]]
+
+    @last_status.setter
+    def last_status(self, value):
+        self.table.status_codes[self.index] = self.table.statuses.code(value)
+
+    @property
+    def status_changed_at(self):
+        """Возвращает время смены последнего статуса."""
+        return self.table.status_changed_at[self.index]
+
+    @status_changed_at.setter
+    def status_changed_at(self, value):
+        self.table.status_changed_at[self.index] = value
+
+    @property
+    def backoff_level(self):
+        """Возвращает уровень backoff."""
+        return self.table.backoff_levels[self.index]
+
+    @backoff_level.setter
+    def backoff_level(self, value):
+        # Выше нескольких десятков уровень не меняет интервал backoff.
+        self.table.backoff_levels[self.index] = min(value, MAX_BACKOFF_LEVEL)
+
+    @property
+    def next_due(self):
+        """Возвращает время следующего опроса по часам движка."""
+        return self.table.next_due[self.index]
+
+    key = Account.key
+    destinations = Account.destinations
@@ -0,0 +1,116 @@
+import hashlib
+import re
+import threading
+import time
+
+from exceptions import CircuitOpenError
+
+DEFAULT_WINDOW = 600
+DEFAULT_MAX_ALERTS = 50
+MAX_CAUSE_LENGTH = 200
+
+# Тело ответа и параметры запроса отличаются у каждого сбоя.
+VOLATILE_TAIL = re.compile(r'(Содержание ответа|Параметры запроса):.*',
+                           re.DOTALL)
+LONG_NUMBER = re.compile(r'\d{4,}')
+SPACES = re.compile(r'\s+')
+
+
+def normalize_cause(error):
+    """
+    Функция возвращает текст ошибки без изменчивых частей.
+    Отбрасываются тело ответа и параметры запроса,
+    длинные числа (временные метки, идентификаторы) заменяются на #.
+    Разомкнутый выключатель описывается только эндпоинтом:
+    ожидание восстановления и пробного запроса — одна причина.
+    """
+    if isinstance(error, CircuitOpenError):
+        return f'Запросы к {error.endpoint} приостановлены'
+    cause = VOLATILE_TAIL.sub('', str(error))
+    cause = LONG_NUMBER.sub('#', cause)
+    return SPACES.sub(' ', cause).strip()[:MAX_CAUSE_LENGTH]
+
+
+def fingerprint(error):
+    """Функция возвращает отпечаток ошибки: класс и нормализованную причину."""
+    cause = normalize_cause(error)
+    digest = hashlib.sha1(cause.encode()).hexdigest()[:12]
+    return f'{type(error).__name__}:{digest}'
+
+
+class AlertSuppressor:
+    """
+    Класс подавляет повторные уведомления об ошибках.
+    Об ошибке с одним отпечатком аккаунт узнает не чаще раза в window
+    секунд, а всего за окно отправляется не больше max_alerts уведомлений
+    с этим отпечатком. Подавленные ошибки учитываются и раз в окно
+    сворачиваются в сводку методом digest.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, max_alerts=DEFAULT_MAX_ALERTS,
+                 now=time.monotonic):
+        self.window = window
+        self.max_alerts = max_alerts
+        self.now = now
+        self.sent = 0
+        self.suppressed = 0
+        self._last_sent = {}
+        self._stats = {}
+        self._digest_at = now()
+        self._lock = threading.Lock()
+
+    def record(self, account, error):
+        """
+        Учитывает ошибку аккаунта.
+        Возвращает отпечаток ошибки и признак того,
+        нужно ли отправить уведомление сейчас.
+        """
+        key = fingerprint(error)
+        current = self.now()
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'name': type(error).__name__,
+                    'cause': normalize_cause(error),
+                    'count': 0,
+                    'alerts': 0,
+                    'accounts': set(),
+                }
+            stats['count'] += 1
+            stats['accounts'].add(account)
+            last_sent = self._last_sent.get((account, key))
+            if ((last_sent is None or current - last_sent >= self.window)
+                    and stats['alerts'] < self.max_alerts):
+                self._last_sent[(account, key)] = current
+                stats['alerts'] += 1
+                self.sent += 1
+                return key, True
+            self.suppressed += 1
+            return key, False
+
+    def digest(self):
+        """
+        Возвращает сводку ошибок за окно или None.
+        Сводка формируется не чаще раза в window секунд,
+        после чего статистика окна обнуляется.
+        """
+        current = self.now()
+        with self._lock:
+            if current - self._digest_at < self.window:
+                return None
+            self._digest_at = current
+            stats, self._stats = self._stats, {}
+            self._last_sent = {
+                key: sent_at for key, sent_at in self._last_sent.items()
+                if current - sent_at < self.window
+            }
+        lines = [
+            f'{item["name"]} x {item["count"]} по '
+            f'{len(item["accounts"])} аккаунтам за последние '
+            f'{self.window / 60:.0f} мин: {item["cause"]}'
+            for item in sorted(stats.values(),
+                               key=lambda item: -item['count'])
+            if item['count'] > item['alerts']
+        ]
+        return '\n'.join(lines) or None
@@ -0,0 +1,150 @@
+"""
+Нагрузочный тест конвейера опроса на фейковых серверах.
+Запускает N аккаунтов против локальных заглушек API Практикума
+и Bot API и выводит пропускную способность, задержки и RSS.
+Пример: python benchmarks/bench_polling.py --accounts 1000 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import telegram  # noqa: E402
+
+import homework  # noqa: E402
+from accounts import Account, AccountTable  # noqa: E402
+from benchmarks.fake_servers import (FakeServer, PracticumHandler,  # noqa
+                                     TelegramHandler)
+from engine import PollingEngine  # noqa: E402
+from outbox import TelegramOutbox  # noqa: E402
+from scheduler import FixedPollPolicy  # noqa: E402
+from storage import StateStore  # noqa: E402
+
+
+def percentile(values, share):
+    """Функция возвращает перцентиль share (от 0 до 1) списка значений."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(share * len(ordered)))
+    return ordered[index]
+
+
+def parse_args(argv=None):
+    """Функция разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=1,
+                        help='интервал опроса каждого аккаунта, с')
+    parser.add_argument('--in-flight', type=int, default=64)
+    parser.add_argument('--api-latency', type=float, default=0.01)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--homeworks', type=int, default=3,
+                        help='число работ в ответе API')
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    parser.add_argument('--stream', action='store_true',
+                        help='разбирать ответы API потоково')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='уровень логирования во время теста')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результат в формате JSON')
+    return parser.parse_args(argv)
+
+
+async def run_load(args, api, bot_api, store):
+    """Функция запускает движок и очередь отправки на args.duration секунд."""
+    bot = telegram.Bot(token='1234:benchmark', base_url=f'{bot_api.url}/bot')
+    outbox = TelegramOutbox(bot, global_rate=10 ** 6, chat_rate=10 ** 6,
+                            backoff=0)
+    accounts = AccountTable(Account(token=f'token{index}', chat_id=index)
+                            for index in range(args.accounts))
+    durations = []
+
+    def poll(account):
+        started = time.perf_counter()
+        outcome = homework.poll_account(outbox, account, store)
+        durations.append(time.perf_counter() - started)
+        return outcome
+
+    engine = PollingEngine(accounts, poll, FixedPollPolicy(args.interval),
+                           max_in_flight=args.in_flight)
+    await outbox.start()
+    loop = asyncio.get_running_loop()
+    loop.call_later(args.duration, engine.stop)
+    await engine.run()
+    await outbox.stop(timeout=args.duration)
+    return durations, outbox.stats()
+
+
+@contextmanager
+def patched_homework(endpoint, stream):
+    """Функция временно направляет бота на фейковый API."""
+    saved = homework.ENDPOINT, homework.STREAM_RESPONSES
+    homework.ENDPOINT = endpoint
+    homework.STREAM_RESPONSES = stream
+    try:
+        yield
+    finally:
+        homework.ENDPOINT, homework.STREAM_RESPONSES = saved
+
+
+def run(args):
+    """Функция выполняет нагрузочный тест и возвращает отчет."""
+    with FakeServer(PracticumHandler, latency=args.api_latency,
+                    error_rate=args.api_error_rate,
+                    homeworks=args.homeworks) as api, \
+            FakeServer(TelegramHandler, latency=args.telegram_latency,
+                       error_rate=args.telegram_error_rate) as bot_api, \
+            tempfile.TemporaryDirectory() as directory:
+        store = StateStore(os.path.join(directory, 'state.sqlite3'))
+        endpoint = f'{api.url}/api/user_api/homework_statuses/'
+        started = time.perf_counter()
+        with patched_homework(endpoint, args.stream):
+            durations, outbox_stats = asyncio.run(
+                run_load(args, api, bot_api, store))
+        elapsed = time.perf_counter() - started
+        store.close()
+    return {
+        'accounts': args.accounts,
+        'elapsed_s': round(elapsed, 3),
+        'polls': len(durations),
+        'polls_per_s': round(len(durations) / elapsed, 1),
+        'messages': outbox_stats['sent'],
+        'messages_per_s': round(outbox_stats['sent'] / elapsed, 1),
+        'messages_dropped': outbox_stats['dropped'],
+        'poll_p50_ms': round(percentile(durations, 0.5) * 1000, 2),
+        'poll_p99_ms': round(percentile(durations, 0.99) * 1000, 2),
+        'poll_max_ms': round(max(durations, default=0) * 1000, 2),
+        'send_max_ms': round(outbox_stats['latency_max'] * 1000, 2),
+        'http_pool': homework.get_http_session().stats(),
+        'max_rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main(argv=None):
+    """Запускает нагрузочный тест и печатает отчет."""
+    args = parse_args(argv)
+    logging.getLogger().setLevel(args.log_level)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        for name, value in report.items():
+            print(f'{name:>18}: {value}')
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Проверка времени запуска бота.
+Замеряет в отдельных процессах время импорта homework и проверки
+конфигурации (homework.py --check) и завершается с кодом 1,
+если медиана превышает бюджет или при импорте загружены тяжелые клиенты.
+Пример: python benchmarks/bench_startup.py --runs 10 --budget-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from os.path import abspath, dirname
+
+ROOT = dirname(dirname(abspath(__file__)))
+HEAVY_MODULES = ('asyncio', 'requests', 'telegram')
+IMPORT_SCRIPT = (
+    'import json, sys, time\n'
+    'started = time.perf_counter()\n'
+    'import homework\n'
+    'elapsed = time.perf_counter() - started\n'
+    'heavy = [name for name in {heavy!r} if name in sys.modules]\n'
+    'print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))\n'
+)
+
+
+def parse_args(argv=None):
+    """Функция разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=150,
+                        help='допустимая медиана времени импорта, мс')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результат в формате JSON')
+    return parser.parse_args(argv)
+
+
+def measure_import():
+    """
+    Функция импортирует homework в новом процессе.
+    Возвращает время импорта и список загруженных тяжелых модулей.
+    """
+    script = IMPORT_SCRIPT.format(heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT,
+                            check=True, capture_output=True, text=True)
+    result = json.loads(output.stdout.splitlines()[-1])
+    return result['elapsed'], result['heavy']
+
+
+def measure_check():
+    """Функция запускает homework.py --check и возвращает время и код."""
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'homework.py'), '--check'],
+        cwd=ROOT, capture_output=True)
+    return time.perf_counter() - started, process.returncode
+
+
+def run(args):
+    """Функция выполняет замеры и возвращает отчет."""
+    imports, checks, heavy = [], [], set()
+    for _ in range(args.runs):
+        elapsed, loaded = measure_import()
+        imports.append(elapsed)
+        heavy.update(loaded)
+        elapsed, _ = measure_check()
+        checks.append(elapsed)
+    import_median = statistics.median(imports) * 1000
+    return {
+        'runs': args.runs,
+        'import_min_ms': round(min(imports) * 1000, 2),
+        'import_median_ms': round(import_median, 2),
+        'check_median_ms': round(statistics.median(checks) * 1000, 2),
+        'heavy_modules': sorted(heavy),
+        'budget_ms': args.budget_ms,
+        'ok': import_median <= args.budget_ms and not heavy,
+    }
+
+
+def main(argv=None):
+    """Запускает замеры, печатает отчет и возвращает код выхода."""
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        for name, value in report.items():
+            print(f'{name:>18}: {value}')
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
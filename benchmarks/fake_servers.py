@@ -0,0 +1,127 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Класс общей логики обработчиков фейковых серверов."""
+
+    protocol_version = 'HTTP/1.1'
+    server_config = None
+
+    def log_message(self, *args):
+        """Не пишет в лог каждый запрос."""
+        pass
+
+    def reply(self, status, payload, headers=None):
+        """Отправляет JSON-ответ с заданным кодом."""
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self):
+        """
+        Ждет заданную задержку и решает, вернуть ли ошибку.
+        Возвращает True, если запрос должен завершиться ошибкой.
+        """
+        config = self.server_config
+        if config.latency:
+            time.sleep(config.latency)
+        config.requests += 1
+        return random.random() < config.error_rate
+
+
+class PracticumHandler(FakeHandler):
+    """Класс отвечает как эндпоинт homework_statuses."""
+
+    def do_GET(self):
+        """Возвращает случайные статусы работ."""
+        if self.simulate():
+            self.reply(500, {'error': 'Internal Server Error'})
+            return
+        query = parse_qs(urlparse(self.path).query)
+        from_date = int(query.get('from_date', ['0'])[0])
+        size = self.server_config.homeworks
+        homeworks = [
+            {
+                'id': index,
+                'homework_name': f'student__hw{index:02d}.zip',
+                'status': random.choice(STATUSES),
+                'reviewer_comment': 'Комментарий ревьюера.',
+                'date_updated': '2022-01-01T12:00:00Z',
+                'lesson_name': f'Урок {index}',
+            }
+            for index in range(size)
+        ]
+        self.reply(200, {'homeworks': homeworks,
+                         'current_date': max(from_date, int(time.time()))})
+
+
+class TelegramHandler(FakeHandler):
+    """Класс отвечает как метод sendMessage Bot API."""
+
+    def do_POST(self):
+        """Принимает сообщение и возвращает объект Message."""
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        if self.simulate():
+            self.reply(429, {'ok': False, 'error_code': 429,
+                             'description': 'Too Many Requests',
+                             'parameters': {'retry_after': 1}})
+            return
+        content_type = self.headers.get('Content-Type', '')
+        if 'json' in content_type:
+            data = json.loads(raw or b'{}')
+        else:
+            data = {key: values[0]
+                    for key, values in parse_qs(raw.decode()).items()}
+        self.server_config.messages += 1
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': self.server_config.messages,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+
+class FakeServer:
+    """
+    Класс запускает фейковый HTTP-сервер в фоновом потоке.
+    latency — задержка ответа в секундах, error_rate — доля ошибок,
+    homeworks — число работ в ответе API Практикума.
+    """
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0, homeworks=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.homeworks = homeworks
+        self.requests = 0
+        self.messages = 0
+        handler = type(handler.__name__, (handler,), {'server_config': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+
+    @property
+    def url(self):
+        """Возвращает базовый адрес сервера."""
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
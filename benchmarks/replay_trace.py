@@ -0,0 +1,203 @@
+"""
+Воспроизведение записанной трассы ответов API.
+Отдает ответы из трассы (TRACE_FILE) в homework.poll_account вместо
+API Практикума с ускорением --speed, поэтому работает весь конвейер:
+сворачивание, дедупликация по хранилищу, объединение сообщений,
+карантин и курсоры. Выводит число сообщений, процессорное время
+и хеш всех сообщений. С --expect-digest завершается с кодом 1,
+если сообщения отличаются от эталонных.
+Пример: python benchmarks/replay_trace.py trace.jsonl.gz --repeat 100
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+# Загружается заранее, чтобы импорт не попадал в замер времени.
+import telegram  # noqa: E402, F401
+
+import homework  # noqa: E402
+from accounts import Account  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+from exceptions import ApiError  # noqa: E402
+from reconcile import ReconcileSchedule  # noqa: E402
+from storage import StateStore  # noqa: E402
+from traces import CaptureSink, read_trace  # noqa: E402
+
+STATE = ('get_account_api_answer', 'quarantine_homework', 'STREAM_RESPONSES',
+         'TRACE_RECORDER', 'CLOCK', 'API_BREAKER', 'ALERTS', 'RECONCILER')
+
+
+def parse_args(argv=None):
+    """Функция разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('trace', help='файл трассы')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='ускорение относительно записи, 0 — без пауз')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='сколько раз воспроизвести трассу')
+    parser.add_argument('--expect-digest',
+                        help='ожидаемый хеш сообщений')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='уровень логирования во время воспроизведения')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результат в формате JSON')
+    return parser.parse_args(argv)
+
+
+class TraceApi:
+    """
+    Класс заменяет homework.get_account_api_answer при воспроизведении.
+    Отдает тело текущей записи трассы entry, для кода ответа,
+    отличного от 200, выбрасывает ApiError, как запрос к API.
+    """
+
+    def __init__(self):
+        self.entry = None
+
+    def __call__(self, token, current_timestamp):
+        entry = self.entry
+        if entry.status != HTTPStatus.OK:
+            raise ApiError(f'Сбой при работе с эндпоинт.'
+                           f'API вернул {entry.status}'
+                           f'Содержание ответа: {entry.body}'
+                           f'Параметры запроса: '
+                           f'{{"from_date": {current_timestamp}}}',
+                           status_code=entry.status)
+        return json.loads(entry.body)
+
+
+@contextmanager
+def patched_homework(api, clock, quarantined):
+    """
+    Функция временно направляет опрос homework в трассу.
+    Выключатель и подавление ошибок создаются заново на часах трассы,
+    сверка снимков отключена: полных снимков в трассе нет.
+    Карантин работ дополнительно учитывается в quarantined.
+    """
+    saved = [getattr(homework, name) for name in STATE]
+    quarantine = homework.quarantine_homework
+
+    def count_quarantine(*args, **kwargs):
+        quarantined.append(args[1])
+        quarantine(*args, **kwargs)
+
+    homework.get_account_api_answer = api
+    homework.quarantine_homework = count_quarantine
+    homework.STREAM_RESPONSES = False
+    homework.TRACE_RECORDER = None
+    homework.CLOCK = clock
+    homework.API_BREAKER, homework.ALERTS, _ = homework.make_clock_state()
+    homework.RECONCILER = ReconcileSchedule(0)
+    try:
+        yield
+    finally:
+        for name, value in zip(STATE, saved):
+            setattr(homework, name, value)
+
+
+def count_homeworks(entry):
+    """Функция возвращает число работ в успешном ответе из трассы."""
+    if entry.status != HTTPStatus.OK:
+        return 0
+    try:
+        homeworks = json.loads(entry.body).get('homeworks')
+    except (ValueError, AttributeError):
+        return 0
+    return len(homeworks) if isinstance(homeworks, list) else 0
+
+
+def replay(entries, sink, speed=0, sleep=time.sleep, now=time.monotonic):
+    """
+    Функция пропускает записи трассы через homework.poll_account.
+    Для каждого ключа аккаунта из трассы создается аккаунт с чатом,
+    равным ключу, состояние работ хранится в отдельной базе в памяти,
+    поэтому повторное воспроизведение дает те же сообщения.
+    Неудачные опросы учитываются как ошибки, работы в карантине —
+    как некорректные, а расхождения курсора аккаунта с from_date
+    из трассы — в cursor_mismatches.
+    При speed > 0 паузы между ответами сокращаются в speed раз.
+    Возвращает словарь со счетчиками.
+    """
+    stats = {'responses': 0, 'errors': 0, 'homeworks': 0, 'invalid': 0,
+             'cursor_mismatches': 0}
+    api = TraceApi()
+    clock = VirtualClock()
+    quarantined = []
+    accounts = {}
+    store = StateStore(':memory:')
+    first = started = None
+    try:
+        with patched_homework(api, clock, quarantined):
+            for entry in entries:
+                if speed:
+                    if first is None:
+                        first, started = entry.time, now()
+                    delay = started + (entry.time - first) / speed - now()
+                    if delay > 0:
+                        sleep(delay)
+                clock.now = entry.time
+                account = accounts.get(entry.account)
+                if account is None:
+                    account = accounts[entry.account] = Account(
+                        token=entry.account, chat_id=entry.account,
+                        current_timestamp=entry.from_date)
+                elif account.current_timestamp != entry.from_date:
+                    stats['cursor_mismatches'] += 1
+                api.entry = entry
+                outcome = homework.poll_account(sink, account, store)
+                stats['responses'] += 1
+                stats['errors'] += outcome.error is not None
+                stats['homeworks'] += count_homeworks(entry)
+    finally:
+        store.close()
+    stats['invalid'] = len(quarantined)
+    return stats
+
+
+def run(args):
+    """Функция воспроизводит трассу и возвращает отчет."""
+    entries = list(read_trace(args.trace))
+    sink = CaptureSink(keep=False)
+    stats = {}
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for name, value in replay(entries, sink, args.speed).items():
+            stats[name] = stats.get(name, 0) + value
+    cpu = time.process_time() - cpu_started
+    elapsed = time.perf_counter() - started
+    return {
+        **stats,
+        'messages': sink.count,
+        'elapsed_s': round(elapsed, 3),
+        'cpu_s': round(cpu, 3),
+        'responses_per_cpu_s': round(stats.get('responses', 0)
+                                     / max(cpu, 1e-9), 1),
+        'digest': sink.digest(),
+    }
+
+
+def main(argv=None):
+    """Воспроизводит трассу, печатает отчет и возвращает код выхода."""
+    args = parse_args(argv)
+    logging.getLogger().setLevel(args.log_level)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        for name, value in report.items():
+            print(f'{name:>19}: {value}')
+    if args.expect_digest and args.expect_digest != report['digest']:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
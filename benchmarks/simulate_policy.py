@@ -0,0 +1,253 @@
+"""
+Моделирование расписания опроса в виртуальном времени.
+Движок опроса и homework.poll_account работают против модели API,
+в которой у каждого аккаунта работы уходят на проверку и получают
+вердикты, а API периодически недоступен. Модель подменяет пул
+HTTP-соединений, поэтому запросы проходят через выключатель API,
+а выключатель, подавление ошибок и сверки идут по виртуальным часам.
+Недели опроса моделируются за секунды, для каждой политики выводятся
+число запросов к API, задержка уведомлений и число запросов во время сбоев.
+Пример: python benchmarks/simulate_policy.py --accounts 20 --days 14
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import random
+import sys
+import time
+from contextlib import contextmanager
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from accounts import Account  # noqa: E402
+from benchmarks.bench_polling import percentile  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from scheduler import AdaptivePollPolicy, FixedPollPolicy  # noqa: E402
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+START = 1650000000
+
+
+def parse_args(argv=None):
+    """Функция разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--days', type=float, default=14)
+    parser.add_argument('--policy', choices=('fixed', 'adaptive', 'all'),
+                        default='all')
+    parser.add_argument('--outages', type=int, default=2,
+                        help='число сбоев API за моделируемый период')
+    parser.add_argument('--outage-hours', type=float, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--log-level', default='CRITICAL',
+                        help='уровень логирования во время моделирования')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результат в формате JSON')
+    return parser.parse_args(argv)
+
+
+class ModelResponse:
+    """Класс ответа модели API с интерфейсом ответа requests."""
+
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.reason = 'OK' if status_code == 200 else 'Service Unavailable'
+        self.payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        """Возвращает тело ответа."""
+        return self.payload
+
+
+class ApiModel:
+    """
+    Класс моделирует API Практикума в виртуальном времени.
+    Для каждого аккаунта заранее генерируются переходы статусов:
+    работа уходит на проверку, через 2-48 часов получает вердикт,
+    следующая работа отправляется через 1-5 дней.
+    Метод get совместим с пулом HTTP-соединений homework.
+    """
+
+    def __init__(self, clock, accounts, days, outages, outage_hours, rng):
+        self.clock = clock
+        self.calls = 0
+        self.outage_calls = 0
+        self.transitions = {}
+        self.expected = {}
+        end = START + days * DAY
+        for account in accounts:
+            events = []
+            submitted = START + rng.uniform(0, DAY)
+            number = 0
+            while submitted < end:
+                verdict = submitted + rng.uniform(2 * HOUR, 48 * HOUR)
+                name = f'hw{number:02d}'
+                events.append((submitted, name, 'reviewing'))
+                events.append((verdict, name, rng.choice(
+                    ('approved', 'rejected'))))
+                submitted = verdict + rng.uniform(DAY, 5 * DAY)
+                number += 1
+            events = [event for event in events if event[0] < end]
+            self.transitions[account.token] = events
+            for changed_at, name, status in events:
+                message = homework.parse_status(
+                    {'homework_name': name, 'status': status})
+                self.expected[(account.chat_id, message)] = changed_at
+        self.outages = sorted(
+            (start, start + outage_hours * HOUR)
+            for start in (START + rng.uniform(0, days * DAY)
+                          for _ in range(outages)))
+
+    def in_outage(self, moment):
+        """Возвращает True, если API недоступен в момент moment."""
+        index = bisect.bisect(self.outages, (moment, float('inf'))) - 1
+        return index >= 0 and moment < self.outages[index][1]
+
+    def get(self, url, headers=None, params=None, stream=False):
+        """Возвращает ответ API на запрос статусов работ."""
+        token = headers['Authorization'].split(' ', 1)[1]
+        return self.answer(token, params['from_date'])
+
+    def answer(self, token, current_timestamp):
+        """Возвращает ответ API аккаунта на момент виртуального времени."""
+        self.calls += 1
+        now = self.clock.time()
+        if self.in_outage(now):
+            self.outage_calls += 1
+            return ModelResponse(503, {})
+        latest = {}
+        for changed_at, name, status in self.transitions[token]:
+            if changed_at > now:
+                break
+            latest[name] = (changed_at, status)
+        homeworks = [
+            {'homework_name': name, 'status': status}
+            for name, (changed_at, status) in sorted(
+                latest.items(), key=lambda item: -item[1][0])
+            if changed_at >= current_timestamp
+        ]
+        return ModelResponse(200, {'homeworks': homeworks,
+                                   'current_date': int(now)})
+
+
+class LatencySink:
+    """Класс вместо Telegram учитывает задержку уведомлений о переходах."""
+
+    def __init__(self, clock, expected):
+        self.clock = clock
+        self.pending = dict(expected)
+        self.latencies = []
+        self.messages = 0
+
+    def send_message(self, chat_id, text):
+        """Сопоставляет строки сообщения с ожидаемыми переходами."""
+        self.messages += 1
+        for line in text.split('\n'):
+            changed_at = self.pending.pop((chat_id, line), None)
+            if changed_at is not None:
+                self.latencies.append(self.clock.time() - changed_at)
+
+
+STATE = ('HTTP_SESSION', 'STREAM_RESPONSES', 'CLOCK', 'API_BREAKER',
+         'ALERTS', 'RECONCILER')
+
+
+@contextmanager
+def patched_api(model):
+    """
+    Функция временно направляет опрос homework в модель API.
+    Выключатель, подавление ошибок и расписание сверок создаются
+    заново на виртуальных часах модели.
+    """
+    saved = [getattr(homework, name) for name in STATE]
+    homework.HTTP_SESSION = model
+    homework.STREAM_RESPONSES = False
+    homework.CLOCK = model.clock
+    (homework.API_BREAKER, homework.ALERTS,
+     homework.RECONCILER) = homework.make_clock_state()
+    try:
+        yield
+    finally:
+        for name, value in zip(STATE, saved):
+            setattr(homework, name, value)
+
+
+def make_policy(name, clock, rng):
+    """Функция создает политику опроса по названию."""
+    if name == 'fixed':
+        return FixedPollPolicy(homework.RETRY_TIME)
+    return AdaptivePollPolicy(base_delay=homework.RETRY_TIME,
+                              fast_delay=homework.FAST_RETRY_TIME,
+                              slow_delay=homework.SLOW_RETRY_TIME,
+                              max_backoff=homework.MAX_BACKOFF_TIME,
+                              now=clock.time, rng=rng.random)
+
+
+def simulate(policy_name, args):
+    """Функция моделирует опрос с политикой policy_name и возвращает отчет."""
+    clock = VirtualClock(START)
+    rng = random.Random(args.seed)
+    accounts = [Account(token=f'token{index}', chat_id=index,
+                        current_timestamp=START)
+                for index in range(args.accounts)]
+    model = ApiModel(clock, accounts, args.days, args.outages,
+                     args.outage_hours, rng)
+    sink = LatencySink(clock, model.expected)
+    engine = PollingEngine(accounts,
+                           lambda account: homework.poll_account(sink,
+                                                                 account),
+                           make_policy(policy_name, clock, rng),
+                           inline=True)
+
+    async def scenario():
+        asyncio.get_running_loop().call_later(args.days * DAY, engine.stop)
+        await engine.run()
+
+    started = time.perf_counter()
+    with patched_api(model):
+        clock.run(scenario())
+    elapsed = time.perf_counter() - started
+    account_days = max(args.accounts * args.days, 1)
+    latencies = sink.latencies
+    return {
+        'policy': policy_name,
+        'simulated_days': args.days,
+        'wall_s': round(elapsed, 2),
+        'api_calls': model.calls,
+        'calls_per_account_day': round(model.calls / account_days, 1),
+        'outage_calls': model.outage_calls,
+        'transitions': len(model.expected),
+        'notified': len(latencies),
+        'missed': len(sink.pending),
+        'latency_p50_min': round(percentile(latencies, 0.5) / 60, 1),
+        'latency_p95_min': round(percentile(latencies, 0.95) / 60, 1),
+        'latency_max_min': round(max(latencies, default=0) / 60, 1),
+    }
+
+
+def main(argv=None):
+    """Моделирует политики опроса и печатает отчеты."""
+    args = parse_args(argv)
+    logging.getLogger().setLevel(args.log_level)
+    policies = ('fixed', 'adaptive') if args.policy == 'all' else (
+        args.policy,)
+    reports = [simulate(name, args) for name in policies]
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False))
+    else:
+        for report in reports:
+            for name, value in report.items():
+                print(f'{name:>22}: {value}')
+            print()
+    return reports
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_TTL = 60 * 60
+
+
+class LruTtlCache:
+    """
+    Класс ограниченного кеша в памяти.
+    Хранит не больше max_size записей, при переполнении вытесняется
+    запись, к которой дольше всего не обращались (LRU). Запись живет
+    ttl секунд с момента сохранения, устаревшая запись считается
+    промахом. Ведет счетчики попаданий, промахов и вытеснений.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL,
+                 now=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.now = now
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Возвращает значение по ключу или default при промахе."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                value, expires_at = item
+                if self.now() < expires_at:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+                self.expired += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Сохраняет значение, вытесняя старые записи при переполнении."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (value, self.now() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evicted += 1
+
+    def discard(self, predicate):
+        """
+        Удаляет записи, для ключей которых predicate(key) истинен.
+        Возвращает число удаленных записей.
+        """
+        with self._lock:
+            keys = [key for key in self._items if predicate(key)]
+            for key in keys:
+                del self._items[key]
+            return len(keys)
+
+    def stats(self):
+        """Возвращает размер кеша, счетчики и долю попаданий."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+
+from exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Класс автоматического выключателя для общего эндпоинта.
+    После failure_threshold сбоев подряд выключатель размыкается
+    и запросы сразу завершаются CircuitOpenError. Через recovery_timeout
+    секунд пропускается не более half_open_probes пробных запросов:
+    успех замыкает выключатель, сбой снова размыкает его.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30,
+                 half_open_probes=1, now=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self.now = now
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.probes = 0
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Проверяет, можно ли выполнить запрос.
+        Если выключатель разомкнут, выбрасывает CircuitOpenError.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.retry_after()
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f'Запросы к {self.name} приостановлены '
+                        f'после серии сбоев',
+                        retry_after=remaining, endpoint=self.name)
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_probes:
+                    raise CircuitOpenError(
+                        f'Запросы к {self.name} ожидают результата '
+                        f'пробного запроса',
+                        retry_after=self.recovery_timeout,
+                        endpoint=self.name)
+                self.probes += 1
+
+    def release_probe(self):
+        """
+        Возвращает слот пробного запроса, прерванного не эндпоинтом.
+        Вызывается, если запрос завершился исключением до ответа
+        и без сетевого сбоя (например, ошибкой кодирования заголовка):
+        такой запрос не говорит о состоянии эндпоинта, но без возврата
+        слота выключатель остался бы полуразомкнутым навсегда.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def record_success(self):
+        """Учитывает успешный запрос."""
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        """Учитывает неудачный запрос."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                    self.failures >= self.failure_threshold):
+                self.opened_at = self.now()
+                if self.state != OPEN:
+                    self._set_state(OPEN)
+
+    def retry_after(self):
+        """Возвращает число секунд до пробного запроса."""
+        if self.state != OPEN:
+            return 0
+        return max(self.opened_at + self.recovery_timeout - self.now(), 0)
+
+    @property
+    def state_code(self):
+        """Возвращает состояние числом: 0 — замкнут, 2 — разомкнут."""
+        return STATE_CODES[self.state]
+
+    def _set_state(self, state):
+        previous, self.state = self.state, state
+        self.probes = 0
+        log = logger.warning if state == OPEN else logger.info
+        log('Выключатель %s: %s -> %s', self.name, previous, state)
+        for listener in self.listeners:
+            listener(self, previous, state)
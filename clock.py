@@ -0,0 +1,51 @@
+import time
+
+
+class SystemClock:
+    """Класс реальных часов: время time.time, цикл событий asyncio.run."""
+
+    def time(self):
+        """Возвращает текущее время в секундах."""
+        return time.time()
+
+    def sleep(self, delay):
+        """Блокирует поток на delay секунд."""
+        time.sleep(delay)
+
+    def run(self, coroutine):
+        """Выполняет корутину в новом цикле событий."""
+        import asyncio
+
+        return asyncio.run(coroutine)
+
+
+class VirtualClock:
+    """
+    Класс виртуальных часов для моделирования опроса.
+    Время идет только при вызове sleep или когда цикл событий,
+    созданный методом run, ожидает таймер: часы сразу переводятся
+    к ближайшему таймеру. Недели расписания опроса моделируются
+    за секунды, если опросы выполняются в цикле событий, без потоков.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        """Возвращает виртуальное время в секундах."""
+        return self.now
+
+    def sleep(self, delay):
+        """Переводит часы на delay секунд вперед."""
+        self.now += max(delay, 0)
+
+    def run(self, coroutine):
+        """Выполняет корутину в цикле событий с виртуальным временем."""
+        from virtual_loop import VirtualEventLoop
+
+        loop = VirtualEventLoop(self)
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
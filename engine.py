@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from accounts import AccountTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_IDLE_DELAY = 10
+
+
+class PollingEngine:
+    """
+    Класс опрашивает API для множества аккаунтов в одном процессе.
+    Для каждого аккаунта запускается отдельная корутина,
+    которая вызывает функцию poll(account) и ждет интервал,
+    вычисленный политикой policy по результату опроса.
+    Блокирующие запросы выполняются в пуле потоков,
+    количество одновременных опросов ограничено max_in_flight.
+    Атрибут lag хранит отставание последнего опроса от расписания.
+    Если передана функция owns(account), опрашиваются только аккаунты,
+    для которых она возвращает True; остальные перепроверяются
+    каждые idle_delay секунд.
+    При inline=True опрос выполняется прямо в цикле событий без пула
+    потоков: так движок работает в цикле с виртуальным временем
+    (clock.VirtualClock), где время не должно идти во время опроса.
+    Если accounts — таблица AccountTable, вместо корутины на каждый
+    аккаунт работает один диспетчер: он берет из кучи таблицы аккаунты,
+    время опроса которых наступило, и запускает их опрос.
+    """
+
+    def __init__(self, accounts, poll, policy,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, owns=None,
+                 idle_delay=DEFAULT_IDLE_DELAY, inline=False):
+        if not isinstance(accounts, AccountTable):
+            accounts = list(accounts)
+        self.accounts = accounts
+        self.poll = poll
+        self.policy = policy
+        self.max_in_flight = max_in_flight
+        self.owns = owns
+        self.idle_delay = idle_delay
+        self.inline = inline
+        self.lag = 0.0
+        self._executor = None
+        self._semaphore = None
+        self._stopped = None
+        self._wake = None
+
+    async def run(self):
+        """Запускает опрос всех аккаунтов до вызова stop()."""
+        if not self.inline:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_in_flight)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._stopped = asyncio.Event()
+        self._wake = asyncio.Event()
+        step = self.policy.base_delay / max(len(self.accounts), 1)
+        try:
+            if isinstance(self.accounts, AccountTable):
+                await self._dispatch(self.accounts, step)
+            else:
+                await asyncio.gather(*(
+                    self._account_loop(account, index * step)
+                    for index, account in enumerate(self.accounts)
+                ))
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+
+    def add(self, account):
+        """
+        Добавляет аккаунт в таблицу работающего движка.
+        Аккаунт опрашивается сразу. Метод вызывается из цикла событий
+        и доступен, только если accounts — таблица AccountTable.
+        """
+        self.accounts.append(account.token, account.chat_id,
+                             account.current_timestamp, account.subscribers)
+        if self._wake is not None:
+            self._wake.set()
+
+    def stop(self):
+        """Останавливает опрос после завершения текущих запросов."""
+        if self._stopped is not None:
+            self._stopped.set()
+            self._wake.set()
+
+    async def poll_account(self, account, due=None):
+        """
+        Выполняет один опрос аккаунта в пуле потоков.
+        due — запланированное время опроса по часам цикла событий.
+        """
+        async with self._semaphore:
+            return await self._poll(account, due)
+
+    async def _poll(self, account, due):
+        loop = asyncio.get_running_loop()
+        if due is not None:
+            self.lag = max(loop.time() - due, 0.0)
+        if self.inline:
+            return self.poll(account)
+        return await loop.run_in_executor(self._executor, self.poll,
+                                          account)
+
+    async def _sleep(self, delay):
+        """Ждет delay секунд или сигнала остановки."""
+        try:
+            await asyncio.wait_for(self._stopped.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _account_loop(self, account, offset):
+        """
+        Цикл опроса одного аккаунта.
+        Первый опрос сдвигается на offset секунд, чтобы запросы
+        аккаунтов распределялись по базовому интервалу политики.
+        """
+        loop = asyncio.get_running_loop()
+        due = loop.time() + offset
+        await self._sleep(offset)
+        while not self._stopped.is_set():
+            if self.owns is not None and not self.owns(account):
+                due = loop.time() + self.idle_delay
+                await self._sleep(self.idle_delay)
+                continue
+            try:
+                outcome = await self.poll_account(account, due)
+                delay = self.policy.next_delay(account, outcome)
+            except Exception as error:
+                logger.error('Сбой опроса аккаунта %s: %s',
+                             account.chat_id, error, exc_info=True)
+                delay = self.policy.base_delay
+            due = loop.time() + delay
+            await self._sleep(delay)
+
+    async def _dispatch(self, table, step):
+        """
+        Цикл диспетчера опроса аккаунтов из таблицы.
+        Аккаунт, опрос которого запущен, получает бесконечное время
+        следующего опроса, а после опроса — время по политике.
+        Диспетчер ждет наступления ближайшего опроса или возвращения
+        в кучу аккаунта с более ранним временем, а также свободного места,
+        если выполняются max_in_flight опросов.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for index in range(len(table)):
+            table.schedule(index, start + index * step)
+        tasks = set()
+        while not self._stopped.is_set():
+            index = table.peek()
+            delay = math.inf if index is None else (
+                table.next_due[index] - loop.time())
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wake.wait(),
+                        timeout=None if delay == math.inf else delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            account = table[index]
+            if self.owns is not None and not self.owns(account):
+                table.schedule(index, loop.time() + self.idle_delay)
+                continue
+            due = table.next_due[index]
+            table.schedule(index, math.inf)
+            await self._semaphore.acquire()
+            if self._stopped.is_set():
+                self._semaphore.release()
+                break
+            task = loop.create_task(self._table_poll(table, account, due))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _table_poll(self, table, account, due):
+        """Опрашивает аккаунт из таблицы и возвращает его в кучу."""
+        loop = asyncio.get_running_loop()
+        try:
+            outcome = await self._poll(account, due)
+            delay = self.policy.next_delay(account, outcome)
+        except Exception as error:
+            logger.error('Сбой опроса аккаунта %s: %s',
+                         account.chat_id, error, exc_info=True)
+            delay = self.policy.base_delay
+        finally:
+            self._semaphore.release()
+        table.schedule(account.index, loop.time() + delay)
+        if table.peek() == account.index:
+            self._wake.set()
@@ -1,7 +1,9 @@
 class ApiError(Exception):
     """Ошибка при работе с API."""
 
-    pass
+    def __init__(self, message='', status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class UnexpectedResponse(Exception):
@@ -14,3 +16,18 @@ class UnexpectedHomeworkStatus(Exception):
     """Недокументированный статус домашней работы."""
 
     pass
+
+
+class CircuitOpenError(ApiError):
+    """Запросы к эндпоинту временно приостановлены после серии сбоев."""
+
+    def __init__(self, message, retry_after=0, endpoint=''):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.endpoint = endpoint
+
+
+class InvalidCredentials(Exception):
+    """Токен или чат отклонены API как недействительные."""
+
+    pass
@@ -1,15 +1,34 @@
+import functools
+import hashlib
 import logging
 import os
+import socket
 import sys
+import threading
 import time
-from asyncio.log import logger
 from http import HTTPStatus
 
-import requests
-import telegram
 from dotenv import load_dotenv
 
-from exceptions import ApiError, UnexpectedHomeworkStatus, UnexpectedResponse
+from accounts import Account, AccountTable, account_key, load_accounts
+from alerts import AlertSuppressor
+from circuit_breaker import CircuitBreaker
+from clock import SystemClock
+from exceptions import ApiError, InvalidCredentials, UnexpectedResponse
+from logging_config import parse_sampling, setup_logging
+from metrics import (API_LATENCY, DUPLICATES, ERRORS, MISSED_TRANSITIONS,
+                     PREFLIGHT_CHECKS,
+                     POLL_LATENCY, QUARANTINED, RECONCILIATIONS, REGISTRY,
+                     Gauge, MetricsServer)
+from preflight import PreflightCheck
+from profiling import Profiler
+from reconcile import ReconcileSchedule, snapshot_digest
+from records import HomeworkDecoder
+from scheduler import AdaptivePollPolicy, PollOutcome
+from sharding import LeaseCoordinator, partition_of
+from storage import StateStore
+from streaming import HomeworkStream
+from traces import TraceRecorder
 
 load_dotenv()
 
@@ -17,21 +36,128 @@ load_dotenv()
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_SUBSCRIBERS = tuple(
+    chat_id.strip()
+    for chat_id in os.getenv('TELEGRAM_SUBSCRIBERS', '').split(',')
+    if chat_id.strip())
+ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE')
+ADMIN_CHAT_ID = os.getenv('ADMIN_CHAT_ID')
+STATE_DB = os.getenv('STATE_DB', 'homework_bot.sqlite3')
+DURABLE_OUTBOX = os.getenv('DURABLE_OUTBOX', '1') == '1'
+OUTBOX_DRAIN_INTERVAL = float(os.getenv('OUTBOX_DRAIN_INTERVAL', 1))
+OUTBOX_DRAIN_BATCH = int(os.getenv('OUTBOX_DRAIN_BATCH', 500))
+OUTBOX_RETENTION = float(os.getenv('OUTBOX_RETENTION', 24 * 60 * 60))
+QUARANTINE_RETENTION = float(os.getenv('QUARANTINE_RETENTION',
+                                       7 * 24 * 60 * 60))
+OUTBOX_CLAIM_TTL = float(os.getenv('OUTBOX_CLAIM_TTL', 300))
+DEDUP_CACHE_SIZE = int(os.getenv('DEDUP_CACHE_SIZE', 10000))
+DEDUP_CACHE_TTL = float(os.getenv('DEDUP_CACHE_TTL', 3600))
+PREFLIGHT = os.getenv('PREFLIGHT', '1') == '1'
+PREFLIGHT_WORKERS = int(os.getenv('PREFLIGHT_WORKERS', 16))
+PREFLIGHT_TTL = float(os.getenv('PREFLIGHT_TTL', 6 * 60 * 60))
+PREFLIGHT_CHAT_RATE = float(os.getenv('PREFLIGHT_CHAT_RATE', 20))
+PREFLIGHT_BATCH_SIZE = 1000
 
 RETRY_TIME = 600
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_WORKERS = int(os.getenv('TELEGRAM_WORKERS', 4))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+FAST_RETRY_TIME = int(os.getenv('FAST_RETRY_TIME', 120))
+SLOW_RETRY_TIME = int(os.getenv('SLOW_RETRY_TIME', 1800))
+MAX_BACKOFF_TIME = int(os.getenv('MAX_BACKOFF_TIME', 3600))
+MAX_POLLS_IN_FLIGHT = int(os.getenv('MAX_POLLS_IN_FLIGHT', 64))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', MAX_POLLS_IN_FLIGHT))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_GZIP = os.getenv('HTTP_GZIP', '1') == '1'
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', '0') == '1'
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 16384))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RECOVERY_TIME = float(os.getenv('BREAKER_RECOVERY_TIME', 30))
+BREAKER_PROBES = int(os.getenv('BREAKER_PROBES', 1))
+SHARD_DB = os.getenv('SHARD_DB')
+SHARD_PARTITIONS = int(os.getenv('SHARD_PARTITIONS', 256))
+SHARD_LEASE_TTL = float(os.getenv('SHARD_LEASE_TTL', 30))
+WORKER_ID = os.getenv('WORKER_ID', f'{socket.gethostname()}-{os.getpid()}')
+RECONCILE_INTERVAL = float(os.getenv('RECONCILE_INTERVAL', 6 * 60 * 60))
+ALERT_WINDOW = float(os.getenv('ALERT_WINDOW', 600))
+ALERT_MAX_PER_WINDOW = int(os.getenv('ALERT_MAX_PER_WINDOW', 50))
+TRACE_FILE = os.getenv('TRACE_FILE')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SECONDS = float(os.getenv('PROFILE_SECONDS', 30))
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sampling')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s [%(levelname)s] %(message)s')
-logging.StreamHandler(sys.stdout)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_SAMPLING = parse_sampling(os.getenv('LOG_SAMPLING', ''))
 
+logger = logging.getLogger('homework')
+
+# Часы цикла опроса; при моделировании заменяются на clock.VirtualClock.
+CLOCK = SystemClock()
+# Клиенты requests и telegram тянут много зависимостей, поэтому
+# импортируются при первом использовании, а не при загрузке модуля.
+HTTP_SESSION = None
+HTTP_SESSION_LOCK = threading.Lock()
+PREFLIGHT_PROBE_LOCK = threading.Lock()
+
+
+def clock_time():
+    """Функция возвращает время часов CLOCK, в том числе подмененных."""
+    return CLOCK.time()
+
+
+def make_clock_state():
+    """
+    Функция создает компоненты, отсчитывающие время по CLOCK.
+    Это выключатель API, подавление повторных ошибок и расписание сверок.
+    После замены CLOCK (например, на clock.VirtualClock) их нужно
+    создать заново, чтобы отсчет начался на новых часах.
+    """
+    breaker = CircuitBreaker(ENDPOINT,
+                             failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                             recovery_timeout=BREAKER_RECOVERY_TIME,
+                             half_open_probes=BREAKER_PROBES, now=clock_time)
+    alerts = AlertSuppressor(window=ALERT_WINDOW,
+                             max_alerts=ALERT_MAX_PER_WINDOW, now=clock_time)
+    reconciler = ReconcileSchedule(RECONCILE_INTERVAL, now=clock_time)
+    return breaker, alerts, reconciler
+
+
+API_BREAKER, ALERTS, RECONCILER = make_clock_state()
+PROFILER = Profiler(PROFILE_DIR, seconds=PROFILE_SECONDS, mode=PROFILE_MODE)
+# Создается в main(), если задан TRACE_FILE.
+TRACE_RECORDER = None
 
 HOMEWORK_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+HOMEWORK_DECODER = HomeworkDecoder(HOMEWORK_STATUSES)
+
+
+def get_http_session():
+    """
+    Функция возвращает общий пул HTTP-соединений процесса.
+    Пул и библиотека requests создаются при первом вызове.
+    """
+    global HTTP_SESSION
+    if HTTP_SESSION is None:
+        with HTTP_SESSION_LOCK:
+            if HTTP_SESSION is None:
+                from http_session import SessionPool
+                HTTP_SESSION = SessionPool(
+                    pool_size=HTTP_POOL_SIZE,
+                    connect_timeout=HTTP_CONNECT_TIMEOUT,
+                    read_timeout=HTTP_READ_TIMEOUT,
+                    gzip=HTTP_GZIP)
+    return HTTP_SESSION
 
 
 def get_api_answer(current_timestamp):
@@ -41,20 +167,90 @@ def get_api_answer(current_timestamp):
     В случае успешного запроса возвращает ответ API,
     преобразовав его из формата JSON к типам данных Python.
     """
-    timestamp = current_timestamp or int(time.time())
+    return get_account_api_answer(PRACTICUM_TOKEN, current_timestamp)
+
+
+def get_account_api_answer(token, current_timestamp):
+    """
+    Функция делает запрос к API от имени конкретного аккаунта.
+    Принимает на вход токен Практикума и временную метку.
+    Запрос выполняется через общий пул соединений get_http_session().
+    Возвращает ответ API, преобразованный к типам данных Python.
+    """
+    return request_homework_statuses(token, current_timestamp).json()
+
+
+def get_account_snapshot(token):
+    """
+    Функция запрашивает полный снимок работ аккаунта (from_date=0).
+    Возвращает ответ API, преобразованный к типам данных Python.
+    """
+    return request_homework_statuses(token, 0, snapshot=True).json()
+
+
+def stream_account_api_answer(token, current_timestamp):
+    """
+    Функция делает запрос к API и читает ответ по частям.
+    Возвращает HomeworkStream, который выдает работы по одной,
+    поэтому пиковая память не зависит от размера ответа.
+    """
+    response = request_homework_statuses(token, current_timestamp,
+                                         stream=True)
+    return HomeworkStream(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+
+def request_homework_statuses(token, current_timestamp, stream=False,
+                              snapshot=False):
+    """
+    Функция выполняет запрос статусов работ и проверяет код ответа.
+    При snapshot=True запрашиваются все работы аккаунта (from_date=0),
+    иначе пустая временная метка заменяется текущим временем.
+    Если включена запись трассы, ответ (кроме потокового)
+    сохраняется в TRACE_RECORDER.
+    Запрос проходит через выключатель API_BREAKER: недоступность
+    эндпоинта и ответы 5xx считаются сбоями, при разомкнутом выключателе
+    запрос не выполняется и выбрасывается CircuitOpenError. Прочие
+    исключения запроса возвращают выключателю слот пробного запроса.
+    Возвращает объект ответа requests.
+    """
+    import requests
+
+    session = get_http_session()
+    timestamp = 0 if snapshot else current_timestamp or int(CLOCK.time())
     params = {'from_date': timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    API_BREAKER.before_call()
+    started = time.perf_counter()
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        response = session.get(ENDPOINT, headers=headers, params=params,
+                               stream=stream)
     except requests.RequestException:
+        API_BREAKER.record_failure()
         raise ApiError(f'Эндпоинт недоступен {ENDPOINT}')
+    except BaseException:
+        API_BREAKER.release_probe()
+        raise
     else:
+        latency = time.perf_counter() - started
+        API_LATENCY.observe(latency)
+        logger.debug('API вернул %s', response.status_code,
+                     extra={'endpoint': ENDPOINT, 'latency': latency,
+                            'category': 'api'})
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            API_BREAKER.record_failure()
+        else:
+            API_BREAKER.record_success()
+        if TRACE_RECORDER is not None and not stream:
+            TRACE_RECORDER.record(account_key(token), timestamp,
+                                  response.status_code, response.text)
         if response.status_code != HTTPStatus.OK:
             raise ApiError(f'Сбой при работе с эндпоинт.'
                            f'{response.reason}'
                            f'API вернул {response.status_code}'
                            f'Содержание ответа: {response.text}'
-                           f'Параметры запроса: {params}')
-        return response.json()
+                           f'Параметры запроса: {params}',
+                           status_code=response.status_code)
+        return response
 
 
 def send_message(bot, message):
@@ -63,13 +259,34 @@ def send_message(bot, message):
     Принимает на вход экземпляр класса Bot и строку с текстом сообщения.
     Чат определяется переменной окружения TELEGRAM_CHAT_ID.
     """
+    send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_chat_message(bot, chat_id, message):
+    """
+    Функция отправляет сообщение в указанный Telegram чат.
+    Принимает на вход экземпляр класса Bot, идентификатор чата
+    и строку с текстом сообщения. Если bot — очередь TelegramOutbox,
+    сообщение только ставится в очередь: о доставке пишет сама очередь.
+    """
+    import telegram
+
+    from outbox import TelegramOutbox
+
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(chat_id, message)
     except telegram.error.TelegramError as e:
-        logger.error(f'При отправке сообщения возникла ошибка {e}',
-                     exc_info=True)
+        logger.error('При отправке сообщения возникла ошибка %s', e,
+                     exc_info=True,
+                     extra={'chat_id': chat_id, 'category': 'telegram'})
     else:
-        logger.info(f'Сообщение удачно отправлено: {message}')
+        if isinstance(bot, TelegramOutbox):
+            logger.info('Сообщение поставлено в очередь отправки: %s',
+                        message,
+                        extra={'chat_id': chat_id, 'category': 'telegram'})
+        else:
+            logger.info('Сообщение удачно отправлено: %s', message,
+                        extra={'chat_id': chat_id, 'category': 'telegram'})
 
 
 def check_response(response):
@@ -99,16 +316,7 @@ def parse_status(homework):
     В случае успеха, функция возвращает строку для отправки в Telegram,
     содержащую один из вердиктов словаря HOMEWORK_STATUSES
     """
-    if 'homework_name' not in homework or 'status' not in homework:
-        raise KeyError(f'Отсутствуют ожидаемые ключи в homework. '
-                       f'Homework: {homework}')
-    homework_name = homework.get('homework_name')
-    homework_status = homework.get('status')
-    if homework_status not in HOMEWORK_STATUSES:
-        raise UnexpectedHomeworkStatus(f'Недокументированный статус '
-                                       f'домашней работы: {homework_status}')
-    verdict = HOMEWORK_STATUSES.get(homework_status)
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return HOMEWORK_DECODER.message(HOMEWORK_DECODER.decode(homework))
 
 
 def check_tokens():
@@ -116,39 +324,820 @@ def check_tokens():
     Функция проверяет доступность переменных окружения.
     Если отсутствует хотя бы одна переменная окружения,
     необходимая для работы программы — функция возвращает False, иначе — True.
+    При заданном ACCOUNTS_FILE токен Практикума и чат берутся из файла.
     """
+    if ACCOUNTS_FILE:
+        return all((TELEGRAM_TOKEN, ACCOUNTS_FILE))
     tokens = (PRACTICUM_TOKEN,
               TELEGRAM_TOKEN,
               TELEGRAM_CHAT_ID)
     return all(tokens)
 
 
+def get_accounts():
+    """
+    Функция возвращает список аккаунтов для опроса.
+    Аккаунты читаются из файла ACCOUNTS_FILE, если он задан,
+    иначе используется единственный аккаунт из переменных окружения,
+    подписчики которого перечислены в TELEGRAM_SUBSCRIBERS через запятую.
+    """
+    if ACCOUNTS_FILE:
+        return load_accounts(ACCOUNTS_FILE)
+    return [Account(token=PRACTICUM_TOKEN, chat_id=TELEGRAM_CHAT_ID,
+                    subscribers=TELEGRAM_SUBSCRIBERS)]
+
+
+def restore_cursors(accounts, store):
+    """
+    Функция восстанавливает временные метки аккаунтов из хранилища.
+    Курсоры всех аккаунтов читаются одним запросом, поэтому первый опрос
+    после перезапуска получает изменения, пропущенные во время простоя.
+    """
+    cursors = store.load_cursors()
+    for account in accounts:
+        if account.key in cursors:
+            account.current_timestamp = cursors[account.key]
+
+
+def probe_practicum_token(token):
+    """
+    Функция проверяет токен Практикума дешевым запросом.
+    Запрашиваются изменения с текущего момента, поэтому ответ пустой.
+    Если API отклоняет токен, выбрасывается InvalidCredentials.
+    """
+    try:
+        request_homework_statuses(token, int(CLOCK.time()))
+    except ApiError as error:
+        if error.status_code in (HTTPStatus.UNAUTHORIZED,
+                                 HTTPStatus.FORBIDDEN):
+            raise InvalidCredentials(f'Токен Практикума отклонен: API '
+                                     f'вернул {error.status_code}') from error
+        raise
+
+
+def probe_bot(bot):
+    """
+    Функция проверяет токен бота запросом getMe.
+    Если Telegram отклоняет токен, выбрасывается InvalidCredentials.
+    Прочие сбои (сеть, таймаут) не говорят о токене: результат
+    считается неизвестным, об этом пишется в лог, запуск продолжается.
+    """
+    import telegram
+
+    try:
+        bot.get_me()
+    except telegram.error.Unauthorized as error:
+        raise InvalidCredentials(f'Токен бота отклонен: {error}') from error
+    except telegram.error.TelegramError as error:
+        logger.warning('Не удалось проверить токен бота: %s', error,
+                       extra={'category': 'preflight'})
+
+
+def wait_probe_turn(bucket, workers=None):
+    """
+    Функция ждет, пока bucket разрешит очередной запрос к Telegram.
+    Токены забираются под блокировкой: проверки идут из пула потоков.
+    Если передана функция workers, лимит PREFLIGHT_CHAT_RATE делится
+    на число живых воркеров: токен бота у них общий.
+    """
+    with PREFLIGHT_PROBE_LOCK:
+        if workers is not None:
+            bucket.rate = PREFLIGHT_CHAT_RATE / max(workers(), 1)
+            bucket.capacity = max(bucket.rate, 1)
+        wait = bucket.reserve()
+    if wait > 0:
+        CLOCK.sleep(wait)
+
+
+def probe_chat(bot, chat_id, bucket=None, workers=None):
+    """
+    Функция проверяет запросом getChat, что бот может писать в чат.
+    Если чат не найден или бот удален из него,
+    выбрасывается InvalidCredentials. Если передан bucket
+    (outbox.TokenBucket), частота запросов ограничивается им
+    (с долей воркера, см. wait_probe_turn), а при RetryAfter запросы
+    приостанавливаются на указанное время.
+    """
+    import telegram
+
+    if bucket is not None:
+        wait_probe_turn(bucket, workers)
+    try:
+        bot.get_chat(chat_id)
+    except (telegram.error.BadRequest, telegram.error.Unauthorized,
+            telegram.error.ChatMigrated) as error:
+        raise InvalidCredentials(f'Чат {chat_id} недоступен боту: '
+                                 f'{error}') from error
+    except telegram.error.RetryAfter as error:
+        if bucket is not None:
+            with PREFLIGHT_PROBE_LOCK:
+                bucket.pause(error.retry_after)
+        raise
+
+
+def make_preflight(bot, store=None, workers=None):
+    """
+    Функция создает проверку учетных данных аккаунтов.
+    Токены Практикума и чаты проверяются в PREFLIGHT_WORKERS потоках,
+    результаты кешируются в хранилище на PREFLIGHT_TTL секунд.
+    Запросы getChat всех воркеров вместе идут не чаще
+    PREFLIGHT_CHAT_RATE в секунду, чтобы Telegram не ограничил
+    токен бота; workers() возвращает число живых воркеров.
+    """
+    from outbox import TokenBucket
+
+    bucket = TokenBucket(PREFLIGHT_CHAT_RATE, now=clock_time)
+    return PreflightCheck(probe_practicum_token,
+                          functools.partial(probe_chat, bot, bucket=bucket,
+                                            workers=workers),
+                          workers=PREFLIGHT_WORKERS, ttl=PREFLIGHT_TTL,
+                          store=store, observe=PREFLIGHT_CHECKS.inc)
+
+
+def admit_accounts(preflight, bot, accounts):
+    """
+    Функция отбирает аккаунты с действительными учетными данными.
+    Об отклоненных аккаунтах пишет в лог и сообщает в ADMIN_CHAT_ID,
+    если он задан.
+    Возвращает допущенные аккаунты и пары (аккаунт, проблема).
+    """
+    started = time.perf_counter()
+    accepted, rejected = preflight.run(accounts)
+    logger.info('Проверка учетных данных за %.1f с: допущено %s, '
+                'отклонено %s', time.perf_counter() - started,
+                len(accepted), len(rejected),
+                extra={'category': 'preflight'})
+    for account, problem in rejected:
+        logger.error('Аккаунт исключен из опроса: %s', problem,
+                     extra={'account': account.key,
+                            'category': 'preflight'})
+    if rejected and ADMIN_CHAT_ID:
+        send_chat_message(bot, ADMIN_CHAT_ID,
+                          f'Исключено из опроса аккаунтов с недействительными '
+                          f'токенами или чатами: {len(rejected)}')
+    return accepted, rejected
+
+
+def collapse_homeworks(records):
+    """
+    Функция оставляет по одной записи Homework на каждую работу.
+    API возвращает работы от новых к старым,
+    поэтому выдается первая, самая свежая запись.
+    Работает как генератор и хранит только ключи просмотренных работ.
+    """
+    seen = set()
+    for record in records:
+        key = record.key
+        if key not in seen:
+            seen.add(key)
+            yield record
+
+
+def render_batches(items, render, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Функция объединяет строки render(item) в сообщения для Telegram.
+    Строки разделяются переводом строки, длина каждого сообщения
+    не превышает limit символов. По мере заполнения выдаются пары
+    (сообщение, элементы), поэтому в памяти одно сообщение.
+    """
+    current = ''
+    batch = []
+    for item in items:
+        line = render(item)
+        if current and len(current) + len(line) + 1 > limit:
+            yield current, batch
+            current = ''
+            batch = []
+        current = f'{current}\n{line}' if current else line
+        batch.append(item)
+    if current:
+        yield current, batch
+
+
+def render_messages(lines, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Функция объединяет строки в сообщения для Telegram.
+    Строки разделяются переводом строки, длина каждого сообщения
+    не превышает limit символов. Сообщения выдаются по мере заполнения.
+    """
+    for message, _ in render_batches(lines, str, limit):
+        yield message
+
+
+def quarantine_homework(account, homework, error, store=None):
+    """
+    Функция откладывает некорректную работу из ответа API в карантин.
+    Работа с причиной пишется в лог и в хранилище, если оно передано,
+    и учитывается в метрике homework_quarantined_total. Работа, которая
+    уже лежит в карантине хранилища, повторно не учитывается.
+    """
+    if store is not None and not store.save_quarantined(
+            account.key, homework, str(error)):
+        logger.debug('Работа уже в карантине: %s', error,
+                     extra={'account': account.key,
+                            'category': 'quarantine'})
+        return
+    QUARANTINED.inc(type(error).__name__)
+    logger.warning('Работа отложена в карантин: %s. Homework: %s',
+                   error, homework,
+                   extra={'account': account.key, 'category': 'quarantine'})
+
+
+def skip_homework(account, homework, error):
+    """Функция пропускает некорректную работу снимка без карантина."""
+    logger.debug('Некорректная работа снимка пропущена: %s', error,
+                 extra={'account': account.key, 'category': 'reconcile'})
+
+
+def diff_statuses(account, homeworks, store=None, statuses=None,
+                  reconcile=False):
+    """
+    Функция находит работы, статус которых изменился.
+    Работает как генератор: изменившиеся записи Homework выдаются
+    по мере разбора ответа, поэтому потоковый ответ не собирается
+    в памяти целиком. Работы сворачиваются по ключу, некорректные
+    откладываются в карантин. Статусы, уже сохраненные в хранилище,
+    изменением не считаются и учитываются в метрике
+    homework_duplicates_dropped_total. В список statuses, если он
+    передан, добавляются последние статусы всех корректных работ.
+    При reconcile=True (сверка снимка) некорректные работы не попадают
+    в карантин повторно, а совпавшие статусы не считаются дублями.
+    """
+    if reconcile:
+        def rejected(item, error):
+            skip_homework(account, item, error)
+    else:
+        def rejected(item, error):
+            quarantine_homework(account, item, error, store)
+    records = HOMEWORK_DECODER.decode_isolated(homeworks, rejected)
+    for record in collapse_homeworks(records):
+        status = HOMEWORK_DECODER.status_name(record)
+        if statuses is not None:
+            statuses.append(status)
+        if store is not None and store.last_status(
+                account.key, record.key) == status:
+            if not reconcile:
+                DUPLICATES.inc()
+                logger.debug('Статус %s работы %s уже отправлен',
+                             status, record.key,
+                             extra={'account': account.key,
+                                    'category': 'dedup'})
+            continue
+        yield record
+
+
+def save_statuses(account, records, store=None):
+    """Функция сохраняет статусы записей Homework в хранилище."""
+    if store is None:
+        return
+    for record in records:
+        store.save_status(account.key, record.key,
+                          HOMEWORK_DECODER.status_name(record))
+
+
+def message_batch_key(account, records):
+    """
+    Функция возвращает ключ идемпотентности для уведомлений о записях.
+    Ключ зависит от аккаунта, чата, работ, их статусов и времени
+    обновления, поэтому одно и то же изменение дает один ключ,
+    а повторная проверка той же работы — другой.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{account.key}\0{account.chat_id}'.encode())
+    for record in records:
+        digest.update(f'\0{record.key}:{record.status}:'
+                      f'{record.date_updated}'.encode())
+    return digest.hexdigest()
+
+
+def send_statuses(bot, account, records, store=None):
+    """
+    Функция отправляет статусы записей Homework получателям аккаунта.
+    Получатели — чат аккаунта и его подписчики (account.destinations).
+    Записи читаются лениво и объединяются в сообщения с учетом лимита
+    длины Telegram; каждое сообщение собирается один раз для всех
+    получателей, после его отправки статусы его записей сохраняются
+    в хранилище. Если хранилище ведет очередь отправки (durable_outbox),
+    сообщение с ключом идемпотентности записывается в него раньше
+    статусов, а отправляет его drain_outbox.
+    Возвращает число отправленных записей.
+    """
+    destinations = account.destinations
+    durable = store is not None and store.durable_outbox
+    sent = 0
+    for message, batch in render_batches(records, HOMEWORK_DECODER.message):
+        with PROFILER.phase('send_message'):
+            if durable:
+                key = message_batch_key(account, batch)
+                for chat_id in destinations:
+                    store.enqueue_message(f'{key}:{chat_id}', chat_id,
+                                          message)
+            else:
+                for chat_id in destinations:
+                    send_chat_message(bot, chat_id, message)
+            save_statuses(account, batch, store)
+        sent += len(batch)
+    return sent
+
+
+def notify_statuses(bot, account, homeworks, store=None):
+    """
+    Функция отправляет в чат аккаунта статусы всех изменившихся работ.
+    Изменения сворачиваются по работам и объединяются в одно сообщение.
+    Статусы, уже сохраненные в хранилище, повторно не отправляются.
+    Некорректные работы откладываются в карантин и не мешают
+    уведомить об остальных. Разбор и отправка идут потоком, поэтому
+    этап send_message вложен в этап parse_status.
+    Возвращает список последних статусов всех корректных работ из ответа.
+    """
+    statuses = []
+    with PROFILER.phase('parse_status'):
+        send_statuses(bot, account,
+                      diff_statuses(account, homeworks, store, statuses),
+                      store)
+    return statuses
+
+
+def reconcile_account(bot, account, store):
+    """
+    Функция сверяет полный снимок работ аккаунта с хранилищем.
+    Снимок запрашивается с from_date=0. Если его хеш совпадает
+    с сохраненным, снимок отбрасывается без разбора отдельных работ.
+    Иначе в чат отправляются только изменения статуса, пропущенные
+    инкрементальным опросом. Первый снимок аккаунта запоминается
+    как исходное состояние без уведомлений.
+    Возвращает число пропущенных изменений статуса.
+    """
+    try:
+        homeworks = check_response(get_account_snapshot(account.token))
+        digest = snapshot_digest(homeworks)
+        previous = store.snapshot_digest(account.key)
+        if digest == previous:
+            RECONCILIATIONS.inc('unchanged')
+            return 0
+        changed = diff_statuses(account, homeworks, store, reconcile=True)
+        if previous is None:
+            save_statuses(account, changed, store)
+            RECONCILIATIONS.inc('baseline')
+            missed = 0
+        else:
+            missed = send_statuses(bot, account, changed, store)
+            RECONCILIATIONS.inc('changed')
+            MISSED_TRANSITIONS.inc(amount=missed)
+        store.save_snapshot_digest(account.key, digest)
+    except Exception as error:
+        ERRORS.inc(type(error).__name__)
+        RECONCILIATIONS.inc('error')
+        logger.warning('Сверка снимка не удалась: %s', error,
+                       extra={'account': account.key,
+                              'category': 'reconcile'})
+        return 0
+    if missed:
+        logger.warning('Сверка нашла пропущенные изменения: %s',
+                       missed, extra={'account': account.key,
+                                      'category': 'reconcile'})
+    return missed
+
+
+def report_error(bot, account, error):
+    """
+    Функция сообщает об ошибке опроса в чат аккаунта.
+    Повторы ошибки с тем же отпечатком в пределах ALERT_WINDOW
+    не отправляются и не пишутся в лог целиком, а учитываются в сводке.
+    """
+    key, notify = ALERTS.record(account.key, error)
+    account.current_error = key
+    if notify:
+        logger.error('%s', error, extra={'account': account.key,
+                                         'category': 'poll'})
+        send_chat_message(bot, account.chat_id, str(error))
+    else:
+        logger.debug('Повтор ошибки %s подавлен', key,
+                     extra={'account': account.key, 'category': 'alerts'})
+
+
+def report_digest(bot):
+    """
+    Функция раз в ALERT_WINDOW пишет в лог сводку подавленных ошибок.
+    Если задан ADMIN_CHAT_ID, сводка отправляется и в этот чат.
+    """
+    digest = ALERTS.digest()
+    if digest is None:
+        return
+    logger.warning('Сводка ошибок:\n%s', digest,
+                   extra={'category': 'alerts'})
+    if ADMIN_CHAT_ID:
+        send_chat_message(bot, ADMIN_CHAT_ID, digest)
+
+
+def poll_account(bot, account, store=None):
+    """
+    Функция выполняет один цикл опроса API для аккаунта.
+    Отправляет новый статус работы или ошибку в чат аккаунта
+    и обновляет временную метку и последнюю ошибку в его состоянии.
+    Если передано хранилище, временная метка сохраняется в нем.
+    При STREAM_RESPONSES ответ API разбирается по частям.
+    Раз в RECONCILE_INTERVAL после успешного опроса полный снимок работ
+    сверяется с хранилищем, чтобы найти пропущенные изменения.
+    Возвращает PollOutcome с полученными статусами или ошибкой.
+    """
+    with POLL_LATENCY.time():
+        outcome = poll_account_once(bot, account, store)
+    if (store is not None and outcome.error is None
+            and RECONCILER.due(account.key)):
+        reconcile_account(bot, account, store)
+    report_digest(bot)
+    return outcome
+
+
+def next_cursor(account, response):
+    """
+    Функция возвращает курсор для следующего запроса аккаунта.
+    Берет current_date из ответа API, дробную метку округляет вниз.
+    Если метки нет или она не число, оставляет прежний курсор:
+    столбец курсоров таблицы аккаунтов хранит только целые числа.
+    """
+    value = response.get('current_date')
+    if value is None:
+        return account.current_timestamp
+    if (isinstance(value, bool) or not isinstance(value, (int, float))
+            or not 0 <= value < 2 ** 63):
+        logger.warning('Некорректная метка current_date в ответе API: %r',
+                       value, extra={'account': account.key,
+                                     'category': 'poll'})
+        return account.current_timestamp
+    return int(value)
+
+
+def poll_account_once(bot, account, store=None):
+    """Функция выполняет тело цикла опроса для poll_account."""
+    try:
+        if STREAM_RESPONSES:
+            with PROFILER.phase('get_api_answer'):
+                response = stream_account_api_answer(
+                    account.token, account.current_timestamp)
+            homeworks = response
+        else:
+            with PROFILER.phase('get_api_answer'):
+                response = get_account_api_answer(account.token,
+                                                  account.current_timestamp)
+            with PROFILER.phase('check_response'):
+                homeworks = check_response(response)
+        statuses = notify_statuses(bot, account, homeworks, store)
+        if not statuses:
+            logger.debug('Новые статусы отсутствуют',
+                         extra={'account': account.key, 'category': 'poll'})
+        account.current_error = ''
+        account.current_timestamp = next_cursor(account, response)
+        if store is not None:
+            store.save_cursor(account.key, account.current_timestamp)
+    except Exception as error:
+        ERRORS.inc(type(error).__name__)
+        report_error(bot, account, error)
+        return PollOutcome(statuses=[], error=error)
+    return PollOutcome(statuses=statuses, error=None)
+
+
+async def keep_leases(coordinator, accounts, store):
+    """
+    Функция периодически продлевает аренду разделов воркера.
+    Перед продлением фиксирует буфер хранилища, чтобы отданные разделы
+    продолжили опрашиваться с актуальных курсоров. Для аккаунтов
+    из полученных разделов перечитывает курсоры из хранилища и сбрасывает
+    кеш отправленных статусов: их мог обновить другой воркер.
+    Сбой продления пишется в лог и не останавливает цикл: пока аренда
+    не продлена, coordinator.owns не отдает разделы воркеру.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, store.flush)
+            acquired = await loop.run_in_executor(None,
+                                                  coordinator.heartbeat)
+        except Exception as error:
+            logger.error('Не удалось продлить аренду разделов: %s', error,
+                         exc_info=True, extra={'category': 'sharding'})
+        else:
+            if acquired:
+                owned = [account for account in accounts
+                         if partition_of(account.key, SHARD_PARTITIONS)
+                         in acquired]
+                restore_cursors(owned, store)
+                store.forget_accounts(account.key for account in owned)
+        await asyncio.sleep(SHARD_LEASE_TTL / 3)
+
+
+def preflight_bot():
+    """
+    Функция создает клиент Telegram для проверки учетных данных.
+    Клиент получает пул соединений на PREFLIGHT_WORKERS потоков.
+    Токен бота проверяется запросом getMe: если он отклонен,
+    выбрасывается InvalidCredentials, сетевой сбой только пишется в лог.
+    Возвращает клиент или None при PREFLIGHT=0.
+    """
+    if not PREFLIGHT:
+        return None
+    import telegram
+    from telegram.utils.request import Request
+
+    probe = telegram.Bot(token=TELEGRAM_TOKEN,
+                         request=Request(con_pool_size=PREFLIGHT_WORKERS))
+    probe_bot(probe)
+    return probe
+
+
+async def check_accounts(preflight, bot, accounts, excluded, owns=None,
+                         interval=PREFLIGHT_TTL):
+    """
+    Функция проверяет учетные данные аккаунтов, пока идет опрос.
+    Опрос не ждет проверки: аккаунт опрашивается, пока admit_accounts
+    его не отклонит, после чего номер его строки попадает в excluded
+    и движок перестает его опрашивать. Проверяются только аккаунты,
+    для которых owns(account) возвращает True (разделы воркера
+    при SHARD_DB), порциями по PREFLIGHT_BATCH_SIZE. Раз в interval
+    секунд проверяются аккаунты полученных с тех пор разделов,
+    а раз в PREFLIGHT_TTL — отклоненные: если их учетные данные
+    стали действительными, они возвращаются в опрос.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    checked = set()
+    rechecked_at = CLOCK.time()
+    while True:
+        recheck = CLOCK.time() - rechecked_at >= PREFLIGHT_TTL
+        if recheck:
+            rechecked_at = CLOCK.time()
+        pending = [account for account in accounts
+                   if (account.index not in checked
+                       or recheck and account.index in excluded)
+                   and (owns is None or owns(account))]
+        for start in range(0, len(pending), PREFLIGHT_BATCH_SIZE):
+            batch = pending[start:start + PREFLIGHT_BATCH_SIZE]
+            try:
+                accepted, rejected = await loop.run_in_executor(
+                    None, admit_accounts, preflight, bot, batch)
+            except Exception as error:
+                logger.error('Сбой проверки учетных данных: %s', error,
+                             exc_info=True, extra={'category': 'preflight'})
+                break
+            checked.update(account.index for account in batch)
+            excluded.difference_update(account.index for account in accepted)
+            excluded.update(account.index for account, _ in rejected)
+        await asyncio.sleep(interval)
+
+
+async def drain_outbox(store, outbox):
+    """
+    Функция отправляет сообщения из очереди отправки в хранилище.
+    Сохраненные сообщения передаются в TelegramOutbox, результат
+    отправки отмечается в хранилище. Сообщения, которые не удалось
+    отправить, остаются в очереди и отправляются повторно, поэтому
+    доставка гарантируется хотя бы один раз. Раз в OUTBOX_RETENTION
+    удаляются давно отправленные сообщения. Воркеры с общей базой
+    отправляют только захваченные ими сообщения (StateStore с WORKER_ID),
+    поэтому каждое сообщение отправляет один воркер. Сбой чтения
+    хранилища пишется в лог и не останавливает отправку.
+    """
+    import asyncio
+
+    from outbox import DEFERRED
+
+    loop = asyncio.get_running_loop()
+    in_flight = set()
+    pruned_at = CLOCK.time()
+
+    def finish(message_id, result):
+        in_flight.discard(message_id)
+        if result != DEFERRED:
+            store.finish_message(message_id, result)
+
+    while True:
+        try:
+            messages = await loop.run_in_executor(
+                None, store.pending_messages, OUTBOX_DRAIN_BATCH)
+            for message_id, chat_id, text in messages:
+                if message_id in in_flight:
+                    continue
+                in_flight.add(message_id)
+                outbox.send_message(chat_id, text,
+                                    callback=functools.partial(
+                                        finish, message_id))
+            if CLOCK.time() - pruned_at >= OUTBOX_RETENTION:
+                pruned_at = CLOCK.time()
+                await loop.run_in_executor(None, store.prune_messages,
+                                           pruned_at - OUTBOX_RETENTION)
+        except Exception as error:
+            logger.error('Сбой отправки сообщений из хранилища: %s', error,
+                         exc_info=True, extra={'category': 'outbox'})
+        await asyncio.sleep(OUTBOX_DRAIN_INTERVAL)
+
+
+async def prune_quarantine(store):
+    """
+    Функция раз в час очищает карантин хранилища.
+    Удаляются работы, отложенные в карантин раньше
+    QUARANTINE_RETENTION секунд назад. Если работа все еще приходит
+    некорректной, она снова попадает в карантин и в лог.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, store.prune_quarantined,
+                                       CLOCK.time() - QUARANTINE_RETENTION)
+        except Exception as error:
+            logger.error('Не удалось очистить карантин: %s', error,
+                         exc_info=True, extra={'category': 'quarantine'})
+        await asyncio.sleep(60 * 60)
+
+
+async def run_bot(engine, outbox, background=()):
+    """
+    Функция запускает очередь отправки в Telegram и движок опроса.
+    background — корутины, работающие вместе с движком.
+    При остановке движка дожидается отправки оставшихся сообщений.
+    Сигнал записи профиля обрабатывается в цикле событий.
+    """
+    import asyncio
+
+    PROFILER.loop = asyncio.get_running_loop()
+    PROFILER.install_signal(loop=PROFILER.loop)
+    await outbox.start()
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in background]
+    try:
+        await engine.run()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await outbox.stop()
+        logger.info('Статистика отправки в Telegram: %s', outbox.stats())
+
+
+def profile_command(query):
+    """
+    Функция выполняет админскую команду /debug/profile сервера метрик.
+    Параметры seconds и mode (sampling или cprofile) необязательны.
+    Возвращает код ответа и текст.
+    """
+    try:
+        seconds = float(query.get('seconds', [PROFILE_SECONDS])[0])
+        prefix = PROFILER.trigger(seconds, query.get('mode', [None])[0])
+    except ValueError as error:
+        return HTTPStatus.BAD_REQUEST, f'{error}\n'
+    if prefix is None:
+        return HTTPStatus.CONFLICT, 'Запись профиля уже идет\n'
+    return HTTPStatus.ACCEPTED, f'Запись профиля запущена: {prefix}\n'
+
+
+def start_metrics_server(engine, outbox, store=None):
+    """
+    Функция запускает HTTP-сервер метрик на METRICS_PORT.
+    Перед запуском регистрирует показатели планировщика, очереди отправки
+    и, если передано хранилище, кеша отправленных статусов.
+    """
+    REGISTRY.register(Gauge('homework_scheduler_lag_seconds',
+                            'Отставание опроса от расписания.',
+                            lambda: engine.lag))
+    REGISTRY.register(Gauge('homework_outbox_depth',
+                            'Число сообщений в очереди Telegram.',
+                            lambda: outbox.stats()['queue_depth']))
+    REGISTRY.register(Gauge('homework_api_circuit_state',
+                            'Состояние выключателя API: 0 — замкнут, '
+                            '1 — пробные запросы, 2 — разомкнут.',
+                            lambda: API_BREAKER.state_code))
+    if store is not None:
+        REGISTRY.register(Gauge('homework_dedup_cache_hit_ratio',
+                                'Доля попаданий в кеш отправленных статусов.',
+                                lambda: store.cache.stats()['hit_rate']))
+    server = MetricsServer(REGISTRY, host=METRICS_HOST, port=METRICS_PORT,
+                           routes={'/debug/profile': profile_command})
+    server.start()
+    logger.info('Метрики доступны на http://%s:%s/metrics',
+                METRICS_HOST, server.port)
+    return server
+
+
+def check_config():
+    """
+    Функция проверяет конфигурацию без загрузки клиентов API.
+    Возвращает список найденных проблем.
+    """
+    problems = []
+    if not check_tokens():
+        problems.append('Отсутствует обязательная переменная окружения')
+    if ACCOUNTS_FILE:
+        try:
+            load_accounts(ACCOUNTS_FILE)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            problems.append(f'Некорректный файл аккаунтов '
+                            f'{ACCOUNTS_FILE}: {error!r}')
+    return problems
+
+
+def run_check():
+    """
+    Функция выполняет быструю проверку конфигурации для --check.
+    Печатает найденные проблемы и возвращает код выхода.
+    """
+    problems = check_config()
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if not problems:
+        print('Конфигурация корректна')
+    return 1 if problems else 0
+
+
 def main():
     """Основная логика работы бота."""
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    current_error = ''
+    global TRACE_RECORDER
+    import telegram
+
+    from engine import PollingEngine
+    from outbox import TelegramOutbox
+
+    listener = setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLING)
     if not check_tokens():
         logger.critical('Отсутствует обязательная переменная')
+        listener.stop()
         sys.exit()
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                send_message(bot, parse_status(homeworks[0]))
-            else:
-                logger.debug('Новые статусы отсутствуют')
-            current_error = ''
-            current_timestamp = response.get('current_date', current_timestamp)
-        except Exception as error:
-            logger.error(error)
-            if str(error) != current_error:
-                current_error = str(error)
-                send_message(bot, str(error))
-        finally:
-            time.sleep(RETRY_TIME)
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    outbox = TelegramOutbox(bot, workers=TELEGRAM_WORKERS,
+                            global_rate=TELEGRAM_GLOBAL_RATE,
+                            chat_rate=TELEGRAM_CHAT_RATE)
+    store = StateStore(STATE_DB, cache_size=DEDUP_CACHE_SIZE,
+                       cache_ttl=DEDUP_CACHE_TTL,
+                       durable_outbox=DURABLE_OUTBOX, worker_id=WORKER_ID,
+                       claim_ttl=OUTBOX_CLAIM_TTL, now=clock_time)
+    try:
+        probe = preflight_bot()
+    except InvalidCredentials as error:
+        logger.critical('%s', error)
+        store.close()
+        listener.stop()
+        sys.exit()
+    accounts = AccountTable(get_accounts())
+    restore_cursors(accounts, store)
+    policy = AdaptivePollPolicy(base_delay=RETRY_TIME,
+                                fast_delay=FAST_RETRY_TIME,
+                                slow_delay=SLOW_RETRY_TIME,
+                                max_backoff=MAX_BACKOFF_TIME,
+                                now=CLOCK.time)
+    coordinator = None
+    background = [prune_quarantine(store)]
+    if DURABLE_OUTBOX:
+        background.append(drain_outbox(store, outbox))
+    if SHARD_DB:
+        coordinator = LeaseCoordinator(SHARD_DB, WORKER_ID,
+                                       partitions=SHARD_PARTITIONS,
+                                       lease_ttl=SHARD_LEASE_TTL)
+        background.append(keep_leases(coordinator, accounts, store))
+    owns = coordinator and (lambda account: coordinator.owns(account.key))
+    excluded = set()
+    if probe is not None:
+        preflight = make_preflight(
+            probe, store,
+            workers=coordinator and (lambda: coordinator.worker_count))
+        background.append(check_accounts(
+            preflight, outbox, accounts, excluded, owns=owns,
+            interval=SHARD_LEASE_TTL / 3 if coordinator else PREFLIGHT_TTL))
+    engine = PollingEngine(
+        accounts,
+        lambda account: poll_account(outbox, account, store),
+        policy,
+        max_in_flight=MAX_POLLS_IN_FLIGHT,
+        owns=lambda account: account.index not in excluded and (
+            owns is None or owns(account)),
+        idle_delay=SHARD_LEASE_TTL / 3,
+    )
+    if METRICS_PORT:
+        start_metrics_server(engine, outbox, store)
+    if TRACE_FILE:
+        TRACE_RECORDER = TraceRecorder(TRACE_FILE)
+    try:
+        CLOCK.run(run_bot(engine, outbox, background))
+    finally:
+        if HTTP_SESSION is not None:
+            logger.info('Статистика пула HTTP-соединений: %s',
+                        HTTP_SESSION.stats())
+            HTTP_SESSION.close()
+        logger.info('Статистика кеша отправленных статусов: %s',
+                    store.cache.stats())
+        store.close()
+        if coordinator is not None:
+            coordinator.release()
+        if TRACE_RECORDER is not None:
+            logger.info('Записано ответов в трассу: %s',
+                        TRACE_RECORDER.recorded)
+            TRACE_RECORDER.close()
+        listener.stop()
 
 
 if __name__ == '__main__':
+    if '--check' in sys.argv[1:]:
+        sys.exit(run_check())
     main()
@@ -0,0 +1,59 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+
+
+class SessionPool:
+    """
+    Класс управляет общей HTTP-сессией с пулом keep-alive соединений.
+    Одна сессия используется всеми опросами процесса,
+    поэтому TCP и TLS соединения с хостом переиспользуются.
+    Размер пула задается на хост, к каждому запросу добавляются
+    таймауты соединения и чтения.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, gzip=True):
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(pool_connections=pool_size,
+                                   pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers['Connection'] = 'keep-alive'
+        self.session.headers['Accept-Encoding'] = (
+            'gzip, deflate' if gzip else 'identity'
+        )
+
+    def get(self, url, **kwargs):
+        """Выполняет GET-запрос через общую сессию с таймаутами пула."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def stats(self):
+        """
+        Возвращает статистику пула соединений.
+        requests — число запросов, misses — число открытых соединений,
+        hits — число запросов, переиспользовавших открытое соединение.
+        """
+        pools = self.adapter.poolmanager.pools
+        requests_count = connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+        return {
+            'requests': requests_count,
+            'hits': requests_count - connections,
+            'misses': connections,
+        }
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        self.session.close()
@@ -0,0 +1,114 @@
+import json
+import logging
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+STRUCTURED_FIELDS = ('account', 'chat_id', 'endpoint', 'latency', 'category')
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Класс передает записи лога в очередь без форматирования.
+    Стандартный QueueHandler форматирует сообщение в вызывающем потоке,
+    здесь подстановка аргументов выполняется фоновым потоком записи.
+    """
+
+    def prepare(self, record):
+        """Возвращает запись без изменений."""
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Класс форматирует запись лога как однострочный JSON."""
+
+    def format(self, record):
+        """Возвращает JSON с временем, уровнем, сообщением и полями."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Класс прореживает отладочные записи по категориям.
+    rates сопоставляет категории (атрибут category записи) долю
+    сохраняемых записей: при 0.01 остается каждая сотая.
+    Записи уровня INFO и выше не прореживаются.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.periods = {category: max(int(round(1 / rate)), 1)
+                        for category, rate in rates.items() if rate > 0}
+        self.muted = {category for category, rate in rates.items()
+                      if rate <= 0}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Возвращает False для отброшенных записей."""
+        if record.levelno > logging.DEBUG:
+            return True
+        category = getattr(record, 'category', None)
+        if category in self.muted:
+            return False
+        period = self.periods.get(category)
+        if period is None or period == 1:
+            return True
+        with self._lock:
+            count = self.counters.get(category, 0)
+            self.counters[category] = count + 1
+        return count % period == 0
+
+
+def parse_sampling(value):
+    """
+    Функция разбирает настройку прореживания вида "api=0.01,poll=0.1".
+    Возвращает словарь категория -> доля.
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        category, _, rate = item.partition('=')
+        rates[category.strip()] = float(rate)
+    return rates
+
+
+def setup_logging(level='DEBUG', log_format='json', sampling=None,
+                  stream=None):
+    """
+    Функция настраивает неблокирующее логирование.
+    Корневой логгер пишет записи в очередь, фоновый поток
+    форматирует их (JSON или текст) и выводит в stream.
+    Возвращает запущенный QueueListener, его нужно остановить
+    при завершении работы, чтобы дописать очередь.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if log_format == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
@@ -0,0 +1,253 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_value(value):
+    """Функция форматирует число для текстового формата Prometheus."""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels):
+    """Функция форматирует словарь меток в виде {name="value"}."""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Класс счетчика с необязательной меткой."""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, label=None):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value=None, amount=1):
+        """Увеличивает счетчик для значения метки."""
+        with self._lock:
+            self._values[label_value] = (
+                self._values.get(label_value, 0) + amount
+            )
+
+    def value(self, label_value=None):
+        """Возвращает текущее значение счетчика."""
+        return self._values.get(label_value, 0)
+
+    def samples(self):
+        """Возвращает строки значений в текстовом формате."""
+        with self._lock:
+            values = sorted(self._values.items(),
+                            key=lambda item: str(item[0]))
+        for label_value, value in values:
+            labels = {} if self.label is None else {self.label: label_value}
+            yield f'{self.name}{format_labels(labels)} {format_value(value)}'
+
+
+class Gauge:
+    """Класс показателя, значение которого вычисляет функция."""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def samples(self):
+        """Возвращает строку с текущим значением показателя."""
+        yield f'{self.name} {format_value(self.function())}'
+
+
+class Histogram:
+    """Класс гистограммы длительностей с фиксированными границами."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Учитывает одно измерение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Измеряет длительность выполнения блока with."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    @property
+    def count(self):
+        """Возвращает число измерений."""
+        return sum(self._counts)
+
+    def samples(self):
+        """Возвращает строки корзин, суммы и количества."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = format_labels({'le': format_value(bound)})
+            yield f'{self.name}_bucket{labels} {cumulative}'
+        yield f'{self.name}_sum {format_value(total)}'
+        yield f'{self.name}_count {cumulative}'
+
+
+class Registry:
+    """Класс собирает метрики и выводит их в формате Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Регистрирует метрику и возвращает её."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+def make_handler(registry, routes=None):
+    """
+    Функция создает обработчик запросов к /metrics для реестра.
+    routes сопоставляет дополнительным путям функции, которые получают
+    параметры запроса и возвращают код ответа и текст.
+    http.server импортируется здесь, чтобы не замедлять загрузку модуля.
+    """
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qs, urlsplit
+
+    routes = routes or {}
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Класс обрабатывает запросы к /metrics."""
+
+        def do_GET(self):
+            """Отдает содержимое реестра метрик или выполняет команду."""
+            url = urlsplit(self.path)
+            if url.path == '/metrics':
+                status, body = 200, registry.render()
+            elif url.path in routes:
+                status, body = routes[url.path](parse_qs(url.query))
+            else:
+                self.send_error(404)
+                return
+            body = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            """Не пишет в лог каждый запрос метрик."""
+            pass
+
+    return MetricsHandler
+
+
+class MetricsServer:
+    """
+    Класс отдает метрики по HTTP на адресе /metrics.
+    Сервер работает в фоновом потоке и не блокирует опрос API.
+    routes — дополнительные служебные команды, см. make_handler.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=0, routes=None):
+        from http.server import ThreadingHTTPServer
+
+        self.server = ThreadingHTTPServer((host, port),
+                                          make_handler(registry, routes))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        """Возвращает порт, на котором работает сервер."""
+        return self.server.server_port
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает сервер."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+REGISTRY = Registry()
+API_LATENCY = REGISTRY.register(Histogram(
+    'homework_api_request_seconds',
+    'Длительность запроса get_api_answer к API Практикума.'))
+SEND_LATENCY = REGISTRY.register(Histogram(
+    'homework_telegram_send_seconds',
+    'Длительность отправки send_message в Telegram.'))
+POLL_LATENCY = REGISTRY.register(Histogram(
+    'homework_poll_cycle_seconds',
+    'Длительность полного цикла опроса аккаунта.'))
+ERRORS = REGISTRY.register(Counter(
+    'homework_errors_total',
+    'Количество ошибок цикла опроса по классу исключения.',
+    label='exception'))
+QUARANTINED = REGISTRY.register(Counter(
+    'homework_quarantined_total',
+    'Количество работ из ответа API, отложенных в карантин.',
+    label='reason'))
+RECONCILIATIONS = REGISTRY.register(Counter(
+    'homework_reconciliations_total',
+    'Количество сверок полных снимков по результату.',
+    label='result'))
+MISSED_TRANSITIONS = REGISTRY.register(Counter(
+    'homework_missed_transitions_total',
+    'Количество пропущенных изменений статуса, найденных сверкой.'))
+DUPLICATES = REGISTRY.register(Counter(
+    'homework_duplicates_dropped_total',
+    'Количество повторных уведомлений, отброшенных до отправки.'))
+PREFLIGHT_CHECKS = REGISTRY.register(Counter(
+    'homework_preflight_checks_total',
+    'Количество проверок токенов и чатов при запуске по результату.',
+    label='result'))
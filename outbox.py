@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import telegram
+
+from metrics import SEND_LATENCY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_GLOBAL_RATE = 30
+DEFAULT_CHAT_RATE = 1
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1
+
+# Результаты доставки, которые получает callback сообщения.
+SENT = 'sent'
+DROPPED = 'dropped'
+DEFERRED = 'deferred'
+
+PERMANENT_ERRORS = (telegram.error.BadRequest, telegram.error.Unauthorized,
+                    telegram.error.ChatMigrated)
+
+
+class TokenBucket:
+    """
+    Класс ограничивает частоту отправки алгоритмом token bucket.
+    rate — число токенов в секунду, capacity — размер всплеска.
+    """
+
+    def __init__(self, rate, capacity=None, now=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.now = now
+        self.tokens = self.capacity
+        self.updated_at = now()
+        self.paused_until = 0
+
+    def reserve(self):
+        """
+        Забирает токен и возвращает время ожидания в секундах.
+        По истечении этого времени токен можно использовать.
+        """
+        current = self.now()
+        refill = (current - self.updated_at) * self.rate
+        self.tokens = min(self.capacity, self.tokens + refill)
+        self.updated_at = current
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        return max(wait, self.paused_until - current)
+
+    def pause(self, seconds):
+        """Запрещает отправку на seconds секунд."""
+        self.paused_until = max(self.paused_until, self.now() + seconds)
+
+
+class TelegramOutbox:
+    """
+    Класс отправляет сообщения в Telegram из асинхронной очереди.
+    Метод send_message совместим с telegram.Bot и только ставит
+    сообщение в очередь, поэтому опрос API не ждет ответа Telegram.
+    Пул воркеров соблюдает общий лимит и лимит на чат,
+    при RetryAfter ждет указанное время, при сетевых ошибках
+    повторяет отправку с экспоненциальной задержкой.
+    Если при постановке в очередь передан callback, он вызывается
+    в цикле событий с результатом доставки: SENT, DROPPED при
+    постоянной ошибке или DEFERRED, если сообщение не удалось отправить
+    за max_retries попыток или очередь переполнена.
+    """
+
+    def __init__(self, bot, workers=DEFAULT_WORKERS,
+                 global_rate=DEFAULT_GLOBAL_RATE, chat_rate=DEFAULT_CHAT_RATE,
+                 max_queue=DEFAULT_MAX_QUEUE, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF):
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets = {}
+        self.sent = 0
+        self.dropped = 0
+        self.retried = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+        self._executor = None
+
+    async def start(self):
+        """Запускает воркеры отправки в текущем цикле событий."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._tasks = [self._loop.create_task(self._worker())
+                       for _ in range(self.workers)]
+
+    async def stop(self, timeout=10):
+        """Дожидается отправки очереди не дольше timeout секунд."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning('В очереди Telegram остались сообщения: %s',
+                           self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    def send_message(self, chat_id, text, callback=None):
+        """
+        Ставит сообщение в очередь отправки.
+        Метод можно вызывать из любого потока.
+        """
+        item = (chat_id, text, 0, callback)
+        if self._loop is None:
+            raise RuntimeError('Очередь Telegram не запущена')
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._enqueue(item)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, item)
+
+    def stats(self):
+        """Возвращает глубину очереди, счетчики и задержки отправки."""
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'retried': self.retried,
+            'latency_avg': self.latency_total / self.sent if self.sent else 0,
+            'latency_max': self.latency_max,
+        }
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error('Очередь Telegram переполнена, сообщение в чат %s '
+                         'отброшено', item[0])
+            self._done(item[3], DEFERRED)
+
+    def _chat_bucket(self, chat_id):
+        """
+        Возвращает лимит чата.
+        Прямая отправка передает чат числом, очередь в хранилище —
+        строкой, поэтому ключом служит строка: у чата один лимит.
+        """
+        key = str(chat_id)
+        bucket = self.chat_buckets.get(key)
+        if bucket is None:
+            bucket = self.chat_buckets[key] = TokenBucket(self.chat_rate)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(*item)
+            finally:
+                self._queue.task_done()
+
+    def _done(self, callback, result):
+        if callback is None:
+            return
+        try:
+            callback(result)
+        except Exception as error:
+            logger.error('Сбой обработчика результата отправки: %s', error,
+                         exc_info=True)
+
+    async def _deliver(self, chat_id, text, attempt, callback):
+        chat_bucket = self._chat_bucket(chat_id)
+        await asyncio.sleep(max(self.global_bucket.reserve(),
+                                chat_bucket.reserve()))
+        started = time.monotonic()
+        try:
+            await self._loop.run_in_executor(
+                self._executor, self.bot.send_message, chat_id, text)
+        except telegram.error.RetryAfter as error:
+            logger.warning('Telegram просит подождать %s с', error.retry_after)
+            self.global_bucket.pause(error.retry_after)
+            chat_bucket.pause(error.retry_after)
+            self._retry(chat_id, text, attempt, callback, delay=0)
+        except PERMANENT_ERRORS as error:
+            self.dropped += 1
+            logger.error('Сообщение в чат %s отброшено: %s', chat_id, error)
+            self._done(callback, DROPPED)
+        except telegram.error.TelegramError as error:
+            logger.warning('Ошибка отправки в чат %s: %s', chat_id, error)
+            self._retry(chat_id, text, attempt, callback,
+                        delay=self.backoff * 2 ** attempt)
+        else:
+            latency = time.monotonic() - started
+            self.sent += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            SEND_LATENCY.observe(latency)
+            logger.info('Сообщение отправлено в чат %s за %.3f с',
+                        chat_id, latency)
+            self._done(callback, SENT)
+
+    def _retry(self, chat_id, text, attempt, callback, delay):
+        if attempt + 1 > self.max_retries:
+            self.dropped += 1
+            logger.error('Сообщение в чат %s отброшено после %s попыток',
+                         chat_id, attempt + 1)
+            self._done(callback, DEFERRED)
+            return
+        self.retried += 1
+        self._loop.call_later(delay, self._enqueue,
+                              (chat_id, text, attempt + 1, callback))
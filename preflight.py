@@ -0,0 +1,119 @@
+import dataclasses
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from exceptions import InvalidCredentials
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 16
+DEFAULT_TTL = 6 * 60 * 60
+VALID = 'valid'
+INVALID = 'invalid'
+UNKNOWN = 'unknown'
+CACHED = 'cached'
+
+
+class PreflightCheck:
+    """
+    Класс проверяет токены и чаты аккаунтов перед опросом.
+    probe_token(token) и probe_chat(chat_id) выполняют дешевый запрос
+    и выбрасывают InvalidCredentials, если API отклоняет токен или чат.
+    Каждый токен и чат проверяется один раз, проверки выполняются
+    параллельно не более чем в workers потоках. Результаты сохраняются
+    в хранилище store и не перепроверяются ttl секунд.
+    Другие ошибки проверки (сеть, лимиты) не исключают аккаунт
+    и не кешируются: при сбое API при запуске опрос не останавливается.
+    Если передана функция observe(result), она вызывается для каждой
+    проверки с результатом VALID, INVALID, UNKNOWN или CACHED.
+    """
+
+    def __init__(self, probe_token, probe_chat, workers=DEFAULT_WORKERS,
+                 ttl=DEFAULT_TTL, store=None, observe=None, now=time.time):
+        self.probe_token = probe_token
+        self.probe_chat = probe_chat
+        self.workers = workers
+        self.ttl = ttl
+        self.store = store
+        self.observe = observe
+        self.now = now
+
+    def run(self, accounts):
+        """
+        Проверяет учетные данные аккаунтов.
+        Возвращает список допущенных к опросу аккаунтов и список пар
+        (аккаунт, проблема) для отклоненных. Аккаунт отклоняется,
+        если недействителен его токен или его собственный чат;
+        недействительные чаты подписчиков убираются из аккаунта
+        (строка таблицы AccountTable изменяется на месте).
+        """
+        checks = {}
+        for account in accounts:
+            checks[f'token:{account.key}'] = (self.probe_token, account.token)
+            for chat_id in account.destinations:
+                checks[f'chat:{chat_id}'] = (self.probe_chat, chat_id)
+        problems = self._check_all(checks)
+        accepted, rejected = [], []
+        for account in accounts:
+            problem = (problems.get(f'token:{account.key}')
+                       or problems.get(f'chat:{account.chat_id}'))
+            if problem:
+                rejected.append((account, problem))
+                continue
+            subscribers = tuple(chat_id for chat_id in account.subscribers
+                                if not problems.get(f'chat:{chat_id}'))
+            if subscribers != account.subscribers:
+                if dataclasses.is_dataclass(account):
+                    account = dataclasses.replace(account,
+                                                  subscribers=subscribers)
+                else:
+                    account.subscribers = subscribers
+            accepted.append(account)
+        return accepted, rejected
+
+    def _check_all(self, checks):
+        """
+        Возвращает словарь субъект -> проблема.
+        Пустая строка означает, что учетные данные действительны,
+        None — что проверить их не удалось.
+        """
+        problems = {}
+        if self.store is not None:
+            cached = self.store.credential_checks(self.now() - self.ttl)
+            problems = {subject: cached[subject] for subject in checks
+                        if subject in cached}
+        for _ in problems:
+            self._observe(CACHED)
+        pending = [subject for subject in checks if subject not in problems]
+        if not pending:
+            return problems
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(pending)),
+                                thread_name_prefix='preflight') as executor:
+            results = executor.map(self._check,
+                                   (checks[subject] for subject in pending))
+            for subject, problem in zip(pending, results):
+                problems[subject] = problem
+                if problem is not None and self.store is not None:
+                    self.store.save_credential_check(subject, problem,
+                                                     self.now())
+        return problems
+
+    def _check(self, check):
+        probe, value = check
+        try:
+            probe(value)
+        except InvalidCredentials as error:
+            self._observe(INVALID)
+            return str(error) or type(error).__name__
+        except Exception as error:
+            self._observe(UNKNOWN)
+            logger.warning('Не удалось проверить учетные данные: %r', error,
+                           extra={'category': 'preflight'})
+            return None
+        self._observe(VALID)
+        return ''
+
+    def _observe(self, result):
+        if self.observe is not None:
+            self.observe(result)
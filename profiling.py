@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SECONDS = 30
+DEFAULT_MODE = 'sampling'
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 25
+MODES = ('sampling', 'cprofile')
+IDLE_PHASE = 'idle'
+
+
+class Phase:
+    """
+    Класс метки этапа конвейера для профилировщика.
+    Пока запись профиля не идет, вход и выход из метки
+    сводятся к проверке одного флага.
+    """
+
+    __slots__ = ('profiler', 'name', 'enabled', 'state')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.enabled = self.profiler.capturing
+        if self.enabled:
+            self.state = self.profiler.enter_phase(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.enabled:
+            self.profiler.exit_phase(self.name, *self.state)
+
+
+class Profiler:
+    """
+    Класс записывает профиль работающего процесса по запросу.
+    Запись на seconds секунд запускается методом trigger из обработчика
+    сигнала или админской команды и выполняется в фоновом потоке.
+    В каталог directory сохраняются стеки всех потоков и задач asyncio,
+    профиль (mode='sampling' — сэмплы стеков всех потоков в формате
+    folded, mode='cprofile' — pstats потоков, выполнявших этапы),
+    время этапов конвейера и топ выделений памяти tracemalloc.
+    Сэмплы и профиль привязываются к этапам, отмеченным методом phase.
+    """
+
+    def __init__(self, directory, seconds=DEFAULT_SECONDS, mode=DEFAULT_MODE,
+                 interval=DEFAULT_INTERVAL, top=DEFAULT_TOP):
+        self.directory = directory
+        self.seconds = seconds
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+        self.loop = None
+        self.capturing = False
+        self._cprofile = False
+        self._phases = {}
+        self._phase_stats = {}
+        self._profilers = {}
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        """Возвращает контекстный менеджер метки этапа name."""
+        return Phase(self, name)
+
+    def enter_phase(self, name):
+        """
+        Отмечает вход текущего потока в этап.
+        В режиме cprofile на время внешнего этапа включает профиль потока.
+        Возвращает состояние, которое нужно передать в exit_phase.
+        """
+        thread_id = threading.get_ident()
+        previous = self._phases.get(thread_id)
+        self._phases[thread_id] = name
+        profile = None
+        if self._cprofile and previous is None:
+            with self._lock:
+                profile = self._profilers.get(thread_id)
+                if profile is None:
+                    import cProfile
+
+                    profile = self._profilers[thread_id] = cProfile.Profile()
+            profile.enable()
+        return previous, time.perf_counter(), profile
+
+    def exit_phase(self, name, previous, started, profile):
+        """Отмечает выход текущего потока из этапа и учитывает его время."""
+        elapsed = time.perf_counter() - started
+        if profile is not None:
+            profile.disable()
+        thread_id = threading.get_ident()
+        if previous is None:
+            self._phases.pop(thread_id, None)
+        else:
+            self._phases[thread_id] = previous
+        with self._lock:
+            calls, total, longest = self._phase_stats.get(name, (0, 0.0, 0))
+            self._phase_stats[name] = (calls + 1, total + elapsed,
+                                       max(longest, elapsed))
+
+    def trigger(self, seconds=None, mode=None):
+        """
+        Запускает запись профиля в фоновом потоке.
+        Возвращает префикс файлов записи или None,
+        если запись уже идет.
+        """
+        mode = mode or self.mode
+        if mode not in MODES:
+            raise ValueError(f'Неизвестный режим профилирования: {mode}')
+        with self._lock:
+            if self.capturing:
+                return None
+            self.capturing = True
+        prefix = os.path.join(
+            self.directory,
+            time.strftime('profile-%Y%m%d-%H%M%S') + f'-{os.getpid()}')
+        threading.Thread(target=self.capture,
+                         args=(prefix, seconds or self.seconds, mode),
+                         name='profiler', daemon=True).start()
+        return prefix
+
+    def capture(self, prefix, seconds, mode):
+        """
+        Выполняет запись профиля и сохраняет файлы с префиксом prefix.
+        Возвращает список путей записанных файлов. Сбой записи
+        (например, недоступный каталог) пишется в лог; флаг записи
+        сбрасывается, а запущенный для записи tracemalloc — останавливается,
+        поэтому следующий trigger снова работает.
+        """
+        import tracemalloc
+
+        self.capturing = True
+        started_tracing = False
+        paths = []
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._cprofile = mode == 'cprofile'
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(25)
+            paths.append(self.dump_stacks(prefix + '-stacks.txt'))
+            logger.warning('Запись профиля (%s) на %s с: %s',
+                           mode, seconds, prefix)
+            try:
+                if mode == 'sampling':
+                    paths.append(self._sample(prefix + '-samples.folded',
+                                              seconds))
+                else:
+                    time.sleep(seconds)
+            finally:
+                self.capturing = False
+                self._cprofile = False
+            if mode == 'cprofile':
+                paths.append(self._dump_cprofile(prefix + '-profile.pstats'))
+            paths.append(self._dump_phases(prefix + '-phases.json', seconds))
+            paths.append(self._dump_allocations(prefix + '-tracemalloc.txt'))
+            logger.warning('Профиль записан: %s', ', '.join(paths))
+        except Exception:
+            logger.exception('Не удалось записать профиль: %s', prefix)
+        finally:
+            self.capturing = False
+            self._cprofile = False
+            if started_tracing:
+                tracemalloc.stop()
+        return paths
+
+    def dump_stacks(self, path):
+        """Сохраняет стеки всех потоков и задач asyncio в файл."""
+        import asyncio
+
+        names = {thread.ident: thread.name
+                 for thread in threading.enumerate()}
+        lines = []
+        for thread_id, frame in sys._current_frames().items():
+            phase = self._phases.get(thread_id, IDLE_PHASE)
+            lines.append(f'Поток {names.get(thread_id, thread_id)} '
+                         f'(этап {phase}):\n')
+            lines.extend(traceback.format_stack(frame))
+            lines.append('\n')
+        if self.loop is not None and not self.loop.is_closed():
+            for task in asyncio.all_tasks(self.loop):
+                lines.append(f'Задача {task.get_name()}:\n')
+                for frame in task.get_stack():
+                    lines.extend(traceback.format_stack(frame, limit=1))
+                lines.append('\n')
+        with open(path, 'w', encoding='utf-8') as stacks_file:
+            stacks_file.writelines(lines)
+        return path
+
+    def _sample(self, path, seconds):
+        """
+        Сэмплирует стеки всех потоков каждые interval секунд.
+        Корнем каждого стека служит текущий этап потока.
+        """
+        samples = Counter()
+        own = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} '
+                                 f'({os.path.basename(code.co_filename)}'
+                                 f':{frame.f_lineno})')
+                    frame = frame.f_back
+                stack.append(self._phases.get(thread_id, IDLE_PHASE))
+                samples[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+        with open(path, 'w', encoding='utf-8') as samples_file:
+            for stack, count in samples.most_common():
+                samples_file.write(f'{stack} {count}\n')
+        return path
+
+    def _dump_cprofile(self, path):
+        """Объединяет профили потоков и сохраняет их в формате pstats."""
+        import pstats
+
+        with self._lock:
+            profilers = list(self._profilers.values())
+        stats = None
+        for profile in profilers:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is None:
+            open(path, 'wb').close()
+        else:
+            stats.dump_stats(path)
+        return path
+
+    def _dump_phases(self, path, seconds):
+        """Сохраняет число вызовов и время этапов и обнуляет статистику."""
+        with self._lock:
+            phase_stats, self._phase_stats = self._phase_stats, {}
+            self._profilers = {}
+        report = {
+            name: {'calls': calls, 'total_s': round(total, 6),
+                   'max_s': round(longest, 6),
+                   'share': round(total / seconds, 4) if seconds else 0}
+            for name, (calls, total, longest) in sorted(
+                phase_stats.items(), key=lambda item: -item[1][1])
+        }
+        with open(path, 'w', encoding='utf-8') as phases_file:
+            json.dump(report, phases_file, ensure_ascii=False, indent=2)
+        return path
+
+    def _dump_allocations(self, path):
+        """Сохраняет топ мест выделения памяти по данным tracemalloc."""
+        import tracemalloc
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+        with open(path, 'w', encoding='utf-8') as allocations_file:
+            for statistic in snapshot.statistics('lineno')[:self.top]:
+                allocations_file.write(f'{statistic}\n')
+        return path
+
+    def install_signal(self, signum=None, loop=None):
+        """
+        Запускает запись профиля по сигналу (по умолчанию SIGUSR1).
+        Обработчик не вызывает trigger сам: сигнал может прийти, пока
+        прерванный поток держит блокировку профилировщика, и процесс
+        бы завис. Если передан цикл событий loop, запись запускается
+        из него (loop.add_signal_handler), иначе — из нового потока.
+        Возвращает False, если сигнал недоступен на этой платформе.
+        """
+        import signal
+
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is None:
+            return False
+        if loop is not None:
+            try:
+                loop.add_signal_handler(signum, self.trigger)
+                return True
+            except (NotImplementedError, RuntimeError):
+                pass
+        signal.signal(signum, lambda *args: threading.Thread(
+            target=self.trigger, name='profiler-signal', daemon=True).start())
+        return True
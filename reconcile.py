@@ -0,0 +1,61 @@
+import hashlib
+import json
+import threading
+import time
+
+from sharding import stable_hash
+
+DEFAULT_INTERVAL = 6 * 60 * 60
+STAGGER_RESOLUTION = 10 ** 6
+
+
+def snapshot_digest(homeworks):
+    """
+    Функция возвращает хеш полного списка работ из ответа API.
+    Список сериализуется целиком с сортировкой ключей, поэтому
+    неизмененный снимок дает тот же хеш без разбора отдельных работ.
+    """
+    payload = json.dumps(homeworks, sort_keys=True, ensure_ascii=False,
+                         separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class ReconcileSchedule:
+    """
+    Класс планирует сверку полных снимков для аккаунтов.
+    Каждый аккаунт сверяется раз в interval секунд. Первая сверка
+    сдвигается на долю интервала, вычисленную по хешу ключа аккаунта,
+    поэтому полные запросы распределяются по интервалу равномерно
+    и не совпадают после перезапуска всех воркеров.
+    При interval, равном 0, сверка отключена.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, now=time.monotonic):
+        self.interval = interval
+        self.now = now
+        self._started = now()
+        self._next_at = {}
+        self._lock = threading.Lock()
+
+    def offset(self, account_key):
+        """Возвращает сдвиг первой сверки аккаунта в секундах."""
+        share = stable_hash(account_key) % STAGGER_RESOLUTION
+        return self.interval * share / STAGGER_RESOLUTION
+
+    def due(self, account_key):
+        """
+        Возвращает True, если аккаунту пора выполнить сверку.
+        Следующая сверка при этом переносится на interval секунд.
+        """
+        if not self.interval:
+            return False
+        current = self.now()
+        with self._lock:
+            next_at = self._next_at.get(account_key)
+            if next_at is None:
+                next_at = self._started + self.offset(account_key)
+                self._next_at[account_key] = next_at
+            if current < next_at:
+                return False
+            self._next_at[account_key] = current + self.interval
+        return True
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+from exceptions import UnexpectedHomeworkStatus
+
+MESSAGE_PREFIX = 'Изменился статус проверки работы "'
+
+
+class Homework:
+    """
+    Класс компактно хранит одну домашнюю работу.
+    Статус хранится как индекс в кортеже статусов декодера,
+    время обновления — как целая временная метка.
+    """
+
+    __slots__ = ('id', 'name', 'status', 'date_updated')
+
+    def __init__(self, id, name, status, date_updated=0):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.date_updated = date_updated
+
+    @property
+    def key(self):
+        """Возвращает ключ работы: её id или название."""
+        return str(self.name if self.id is None else self.id)
+
+    def __eq__(self, other):
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot)
+                   for slot in self.__slots__)
+
+    def __repr__(self):
+        return (f'Homework(id={self.id!r}, name={self.name!r}, '
+                f'status={self.status!r}, '
+                f'date_updated={self.date_updated!r})')
+
+
+def parse_timestamp(value):
+    """
+    Функция переводит дату в формате ISO 8601 во временную метку.
+    Для пустого или некорректного значения возвращает 0.
+    """
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value.replace('Z', '+00:00'))
+                   .timestamp())
+    except (AttributeError, ValueError):
+        return 0
+
+
+class HomeworkDecoder:
+    """
+    Класс превращает словари работ из ответа API в записи Homework.
+    Статусы нумеруются один раз при создании декодера,
+    для каждого статуса заранее собирается окончание сообщения,
+    поэтому на каждую работу приходится один поиск в словаре
+    и одна конкатенация строк.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = tuple(statuses)
+        self.codes = {status: code for code, status in enumerate(statuses)}
+        self.suffixes = tuple(f'". {verdict}'
+                              for verdict in statuses.values())
+
+    def decode(self, homework):
+        """
+        Возвращает запись Homework для словаря работы.
+        При отсутствии ключей выбрасывает KeyError,
+        при неизвестном статусе — UnexpectedHomeworkStatus.
+        """
+        try:
+            name = homework['homework_name']
+            status = homework['status']
+        except (KeyError, TypeError):
+            raise KeyError(f'Отсутствуют ожидаемые ключи в homework. '
+                           f'Homework: {homework}')
+        code = self.codes.get(status)
+        if code is None:
+            raise UnexpectedHomeworkStatus(f'Недокументированный статус '
+                                           f'домашней работы: {status}')
+        if not isinstance(name, str):
+            name = str(name)
+        return Homework(homework.get('id'), name, code,
+                        parse_timestamp(homework.get('date_updated')))
+
+    def decode_iter(self, homeworks):
+        """Лениво декодирует работы по одной."""
+        decode = self.decode
+        for homework in homeworks:
+            yield decode(homework)
+
+    def decode_isolated(self, homeworks, quarantine):
+        """
+        Лениво декодирует работы, изолируя некорректные.
+        Для работы, которую не удалось декодировать, вызывается
+        quarantine(homework, error), и разбор продолжается со следующей.
+        """
+        decode = self.decode
+        for homework in homeworks:
+            try:
+                record = decode(homework)
+            except (KeyError, TypeError, UnexpectedHomeworkStatus) as error:
+                quarantine(homework, error)
+                continue
+            yield record
+
+    def decode_batch(self, homeworks):
+        """Декодирует список работ за один проход."""
+        return list(self.decode_iter(homeworks))
+
+    def status_name(self, record):
+        """Возвращает название статуса записи."""
+        return self.statuses[record.status]
+
+    def message(self, record):
+        """Возвращает текст сообщения об изменении статуса работы."""
+        return MESSAGE_PREFIX + record.name + self.suffixes[record.status]
@@ -0,0 +1,139 @@
+import random
+import time
+from collections import deque, namedtuple
+
+from exceptions import ApiError, CircuitOpenError
+
+PollOutcome = namedtuple('PollOutcome', ['statuses', 'error'])
+
+PENDING_STATUSES = frozenset(('reviewing',))
+VERDICT_STATUSES = frozenset(('approved', 'rejected'))
+PENDING = 'pending'
+IDLE = 'idle'
+DEFAULT_QUIET_QUANTILE = 0.01
+DEFAULT_REVIEW_RAMP = 0.2
+MIN_SAMPLES = 10
+MAX_SAMPLES = 500
+
+
+class FixedPollPolicy:
+    """Класс задает одинаковый интервал опроса для всех аккаунтов."""
+
+    def __init__(self, retry_time):
+        self.base_delay = retry_time
+
+    def next_delay(self, account, outcome):
+        """Возвращает фиксированный интервал до следующего опроса."""
+        return self.base_delay
+
+
+class AdaptivePollPolicy:
+    """
+    Класс вычисляет время следующего опроса аккаунта.
+    Политика запоминает, сколько длится каждый статус до следующего
+    перехода (проверка работы и пауза между вердиктом и новой отправкой),
+    и считает тихим окном первые quiet_quantile доли этих длительностей
+    (по умолчанию DEFAULT_QUIET_QUANTILE, 1 %): в тихом окне переход
+    маловероятен, и аккаунт опрашивается раз в slow_delay. После окна
+    работа на проверке опрашивается с интервалом от fast_delay,
+    который растет на долю review_ramp
+    от длительности проверки, но не выше base_delay; в остальных случаях
+    используется base_delay. В часы, когда вердикты приходят чаще
+    среднего, интервал сокращается, но не удлиняется в тихие часы.
+    После ApiError интервал растет экспоненциально со случайным
+    разбросом (jitter). Пока выключатель API разомкнут, опрос
+    откладывается до пробного запроса с разбросом в пределах fast_delay.
+    """
+
+    def __init__(self, base_delay, fast_delay, slow_delay, max_backoff,
+                 now=time.time, rng=random.random,
+                 quiet_quantile=DEFAULT_QUIET_QUANTILE,
+                 review_ramp=DEFAULT_REVIEW_RAMP):
+        self.base_delay = base_delay
+        self.fast_delay = fast_delay
+        self.slow_delay = slow_delay
+        self.max_backoff = max_backoff
+        self.now = now
+        self.rng = rng
+        self.quiet_quantile = quiet_quantile
+        self.review_ramp = review_ramp
+        self.verdicts_by_hour = [0] * 24
+        self.durations = {PENDING: deque(maxlen=MAX_SAMPLES),
+                          IDLE: deque(maxlen=MAX_SAMPLES)}
+        self.quiet = {PENDING: 0, IDLE: 0}
+
+    def next_delay(self, account, outcome):
+        """
+        Возвращает число секунд до следующего опроса аккаунта.
+        Обновляет уровень backoff, последний статус и время его смены
+        в состоянии аккаунта.
+        """
+        if isinstance(outcome.error, CircuitOpenError):
+            return outcome.error.retry_after + self.rng() * self.fast_delay
+        if outcome.error is not None:
+            if not isinstance(outcome.error, ApiError):
+                return self.base_delay
+            account.backoff_level += 1
+            return self.backoff_delay(account.backoff_level)
+        account.backoff_level = 0
+        current = self.now()
+        if outcome.statuses:
+            self.observe(outcome.statuses)
+            # API возвращает работы от новых к старым.
+            self.record_transition(account, outcome.statuses[0], current)
+        phase = (PENDING if account.last_status in PENDING_STATUSES
+                 else IDLE)
+        age = current - account.status_changed_at
+        if age < self.quiet[phase]:
+            return min(self.slow_delay, self.quiet[phase] - age)
+        if phase == PENDING:
+            delay = min(self.fast_delay + age * self.review_ramp,
+                        self.base_delay)
+        else:
+            delay = self.base_delay
+        return delay / self.hour_weight()
+
+    def record_transition(self, account, status, current):
+        """
+        Учитывает смену статуса аккаунта.
+        Длительность предыдущего статуса пополняет выборку его фазы,
+        по которой пересчитывается тихое окно.
+        """
+        if status == account.last_status:
+            return
+        if account.status_changed_at:
+            phase = (PENDING if account.last_status in PENDING_STATUSES
+                     else IDLE)
+            durations = self.durations[phase]
+            durations.append(current - account.status_changed_at)
+            if len(durations) >= MIN_SAMPLES:
+                ordered = sorted(durations)
+                self.quiet[phase] = ordered[
+                    int(self.quiet_quantile * len(ordered))]
+        account.last_status = status
+        account.status_changed_at = current
+
+    def backoff_delay(self, level):
+        """Возвращает интервал экспоненциального backoff с jitter."""
+        ceiling = min(self.max_backoff, self.base_delay * 2 ** (level - 1))
+        return ceiling / 2 + self.rng() * ceiling / 2
+
+    def observe(self, statuses):
+        """Учитывает вердикты в статистике по часам суток."""
+        hour = time.gmtime(self.now()).tm_hour
+        for status in statuses:
+            if status in VERDICT_STATUSES:
+                self.verdicts_by_hour[hour] += 1
+
+    def hour_weight(self):
+        """
+        Возвращает коэффициент активности ревьюеров в текущий час.
+        Коэффициент ограничен диапазоном от 1 до 2: в тихие часы
+        интервал не удлиняется, чтобы не задерживать уведомления.
+        """
+        total = sum(self.verdicts_by_hour)
+        if not total:
+            return 1
+        hour = time.gmtime(self.now()).tm_hour
+        weight = (self.verdicts_by_hour[hour] + 1) / (total / 24 + 1)
+        return min(max(weight, 1), 2)
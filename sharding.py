@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITIONS = 256
+DEFAULT_LEASE_TTL = 30
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS workers ('
+    ' worker TEXT PRIMARY KEY,'
+    ' seen_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS leases ('
+    ' partition INTEGER PRIMARY KEY,'
+    ' worker TEXT NOT NULL,'
+    ' expires_at REAL NOT NULL)',
+)
+
+
+def stable_hash(value):
+    """Функция возвращает хеш строки, одинаковый во всех процессах."""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def partition_of(account_key, partitions=DEFAULT_PARTITIONS):
+    """Функция возвращает номер раздела аккаунта."""
+    return stable_hash(account_key) % partitions
+
+
+def choose_worker(partition, workers):
+    """
+    Функция выбирает воркер для раздела хешированием рандеву.
+    При добавлении или удалении воркера меняют владельца
+    только разделы, доставшиеся этому воркеру.
+    """
+    return max(workers,
+               key=lambda worker: stable_hash(f'{worker}:{partition}'))
+
+
+class LeaseCoordinator:
+    """
+    Класс распределяет разделы аккаунтов между воркерами.
+    Воркеры регистрируются в общей базе SQLite и продлевают аренду
+    своих разделов методом heartbeat. Раздел захватывается, только
+    если он свободен или аренда истекла, поэтому два воркера
+    не опрашивают один аккаунт одновременно.
+    Если аренду не удалось продлить до ее истечения, воркер перестает
+    считать разделы своими, пока следующий heartbeat не пройдет успешно.
+    """
+
+    def __init__(self, path, worker_id, partitions=DEFAULT_PARTITIONS,
+                 lease_ttl=DEFAULT_LEASE_TTL, now=time.time):
+        self.worker_id = worker_id
+        self.partitions = partitions
+        self.lease_ttl = lease_ttl
+        self.now = now
+        self.owned = frozenset()
+        self.expires_at = 0
+        self.worker_count = 1
+        self.connection = sqlite3.connect(path, timeout=lease_ttl,
+                                          isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+    def owns(self, account_key):
+        """Возвращает True, если аккаунт воркера и аренда не истекла."""
+        if self.now() >= self.expires_at:
+            return False
+        return partition_of(account_key, self.partitions) in self.owned
+
+    def heartbeat(self):
+        """
+        Продлевает регистрацию воркера и аренду его разделов.
+        Освобождает разделы, которые теперь должны принадлежать другим,
+        и захватывает освободившиеся. Возвращает множество разделов,
+        полученных в этом вызове.
+        """
+        current = self.now()
+        expires_at = current + self.lease_ttl
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?)',
+                (self.worker_id, current))
+            connection.execute('DELETE FROM workers WHERE seen_at < ?',
+                               (current - self.lease_ttl,))
+            workers = [row[0] for row in connection.execute(
+                'SELECT worker FROM workers')]
+            desired = {partition for partition in range(self.partitions)
+                       if choose_worker(partition, workers) == self.worker_id}
+            leases = {partition: (worker, lease_expires)
+                      for partition, worker, lease_expires
+                      in connection.execute('SELECT * FROM leases')}
+            owned = set()
+            for partition in range(self.partitions):
+                worker, lease_expires = leases.get(partition, (None, 0))
+                if partition not in desired:
+                    if worker == self.worker_id:
+                        connection.execute(
+                            'DELETE FROM leases WHERE partition = ?',
+                            (partition,))
+                    continue
+                if worker in (None, self.worker_id) or (
+                        lease_expires < current):
+                    owned.add(partition)
+            connection.executemany(
+                'INSERT OR REPLACE INTO leases VALUES (?, ?, ?)',
+                ((partition, self.worker_id, expires_at)
+                 for partition in owned))
+        acquired = owned - self.owned
+        released = self.owned - owned
+        self.owned = frozenset(owned)
+        self.expires_at = expires_at
+        self.worker_count = len(workers)
+        if acquired or released:
+            logger.info('Воркер %s: разделов %s, получено %s, отдано %s',
+                        self.worker_id, len(owned), len(acquired),
+                        len(released))
+        return acquired
+
+    def release(self):
+        """Освобождает все разделы воркера и закрывает соединение."""
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM leases WHERE worker = ?',
+                               (self.worker_id,))
+            connection.execute('DELETE FROM workers WHERE worker = ?',
+                               (self.worker_id,))
+        self.owned = frozenset()
+        self.expires_at = 0
+        self.connection.close()
+
+    def _transaction(self):
+        return ImmediateTransaction(self.connection)
+
+
+class ImmediateTransaction:
+    """Класс открывает транзакцию BEGIN IMMEDIATE на время блока with."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
@@ -0,0 +1,367 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from cache import DEFAULT_MAX_SIZE, DEFAULT_TTL, LruTtlCache
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_CLAIM_TTL = 300
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cursors ('
+    ' account TEXT PRIMARY KEY,'
+    ' from_date INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS notified_statuses ('
+    ' account TEXT NOT NULL,'
+    ' homework TEXT NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' PRIMARY KEY (account, homework))',
+    'CREATE TABLE IF NOT EXISTS quarantine ('
+    ' account TEXT NOT NULL,'
+    ' payload TEXT NOT NULL,'
+    ' reason TEXT NOT NULL,'
+    ' quarantined_at REAL NOT NULL,'
+    ' digest TEXT)',
+    'CREATE TABLE IF NOT EXISTS snapshots ('
+    ' account TEXT PRIMARY KEY,'
+    ' digest TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS outbox ('
+    ' id INTEGER PRIMARY KEY,'
+    ' key TEXT NOT NULL UNIQUE,'
+    ' chat_id TEXT NOT NULL,'
+    ' text TEXT NOT NULL,'
+    ' created_at REAL NOT NULL,'
+    ' done_at REAL,'
+    ' result TEXT,'
+    ' claimed_by TEXT,'
+    ' claimed_until REAL)',
+    'CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (id)'
+    ' WHERE done_at IS NULL',
+    'CREATE TABLE IF NOT EXISTS credentials ('
+    ' subject TEXT PRIMARY KEY,'
+    ' problem TEXT NOT NULL,'
+    ' checked_at REAL NOT NULL)',
+)
+# Колонки, добавленные после создания таблиц; в новых базах уже есть.
+MIGRATIONS = (
+    'ALTER TABLE outbox ADD COLUMN claimed_by TEXT',
+    'ALTER TABLE outbox ADD COLUMN claimed_until REAL',
+    'ALTER TABLE quarantine ADD COLUMN digest TEXT',
+    'CREATE UNIQUE INDEX IF NOT EXISTS quarantine_item'
+    ' ON quarantine (account, digest)',
+)
+
+
+class StateStore:
+    """
+    Класс хранит состояние опроса в SQLite в режиме WAL.
+    Для каждого аккаунта сохраняется временная метка опроса (курсор),
+    для каждой работы — последний статус, о котором было отправлено
+    уведомление, а также работы, отложенные в карантин из-за
+    некорректных данных (каждая работа аккаунта — один раз, по хешу
+    ее содержимого), хеши последних полных снимков и результаты
+    предварительной проверки токенов и чатов.
+    Записи копятся в буфере и фиксируются одной транзакцией,
+    когда буфер заполнен или прошло flush_interval секунд.
+    Последние отправленные статусы работ кешируются в LruTtlCache
+    (cache_size записей, cache_ttl секунд по часам now), поэтому
+    повторная проверка статуса обычно не обращается к базе.
+    При durable_outbox=True уведомления не отправляются напрямую,
+    а пишутся в таблицу outbox тем же буфером: сообщения попадают
+    в буфер раньше статусов и курсора, а буфер фиксируется целиком,
+    поэтому курсор никогда не сохраняется без своих сообщений.
+    Если одну базу используют несколько воркеров, каждый отправляет
+    только сообщения, захваченные им на claim_ttl секунд под своим
+    worker_id; сообщения остановившегося воркера после истечения
+    захвата отправляют другие.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 cache_size=DEFAULT_MAX_SIZE, cache_ttl=DEFAULT_TTL,
+                 durable_outbox=False, worker_id='',
+                 claim_ttl=DEFAULT_CLAIM_TTL, now=time.monotonic):
+        self.batch_size = batch_size
+        self.durable_outbox = durable_outbox
+        self.worker_id = worker_id
+        self.claim_ttl = claim_ttl
+        self.flush_interval = flush_interval
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        for statement in MIGRATIONS:
+            try:
+                self.connection.execute(statement)
+            except sqlite3.OperationalError:
+                pass
+        self.connection.commit()
+        self._lock = threading.Lock()
+        self.cache = LruTtlCache(max_size=cache_size, ttl=cache_ttl,
+                                 now=now)
+        self._cursors = {}
+        self._statuses = {}
+        self._quarantine = {}
+        self._snapshots = {}
+        self._messages = []
+        self._finished = {}
+        self._credentials = {}
+        self._flushed_at = time.monotonic()
+
+    def load_cursors(self):
+        """Возвращает словарь курсоров всех аккаунтов одним запросом."""
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT account, from_date FROM cursors'
+            ).fetchall()
+            cursors = dict(rows)
+            cursors.update(self._cursors)
+        return cursors
+
+    def last_status(self, account, homework):
+        """Возвращает последний отправленный статус работы или None."""
+        key = (account, homework)
+        status = self.cache.get(key)
+        if status is not None:
+            return status
+        with self._lock:
+            status = self._statuses.get(key)
+            if status is None:
+                row = self.connection.execute(
+                    'SELECT status FROM notified_statuses '
+                    'WHERE account = ? AND homework = ?',
+                    (account, homework),
+                ).fetchone()
+                status = row[0] if row else None
+        if status is not None:
+            self.cache.put(key, status)
+        return status
+
+    def forget_accounts(self, accounts):
+        """
+        Удаляет из кеша статусы работ аккаунтов accounts.
+        Вызывается, когда воркер снова получает разделы аккаунтов:
+        пока они принадлежали другому воркеру с той же базой,
+        кешированные статусы могли устареть.
+        """
+        accounts = set(accounts)
+        return self.cache.discard(lambda key: key[0] in accounts)
+
+    def save_cursor(self, account, current_timestamp):
+        """Добавляет курсор аккаунта в буфер записи."""
+        with self._lock:
+            self._cursors[account] = current_timestamp
+            self._flush_if_needed()
+
+    def save_status(self, account, homework, status):
+        """Добавляет отправленный статус работы в буфер записи."""
+        self.cache.put((account, homework), status)
+        with self._lock:
+            self._statuses[(account, homework)] = status
+            self._flush_if_needed()
+
+    def save_quarantined(self, account, homework, reason):
+        """
+        Добавляет в буфер работу, отложенную в карантин, и причину.
+        Возвращает False, если та же работа аккаунта уже в карантине:
+        пока курсор не сдвинулся, API возвращает ее при каждом опросе.
+        """
+        payload = json.dumps(homework, ensure_ascii=False, default=str,
+                             sort_keys=True)
+        digest = hashlib.sha1(payload.encode()).hexdigest()
+        with self._lock:
+            if (account, digest) in self._quarantine or (
+                    self.connection.execute(
+                        'SELECT 1 FROM quarantine '
+                        'WHERE account = ? AND digest = ?',
+                        (account, digest)).fetchone()):
+                return False
+            self._quarantine[account, digest] = (payload, reason, time.time())
+            self._flush_if_needed()
+        return True
+
+    def quarantined(self, account):
+        """Возвращает список пар (работа, причина) из карантина аккаунта."""
+        self.flush()
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT payload, reason FROM quarantine '
+                'WHERE account = ? ORDER BY rowid',
+                (account,),
+            ).fetchall()
+        return [(json.loads(payload), reason) for payload, reason in rows]
+
+    def prune_quarantined(self, older_than):
+        """Удаляет работы, отложенные в карантин до older_than."""
+        with self._lock:
+            self._flush()
+            with self.connection:
+                return self.connection.execute(
+                    'DELETE FROM quarantine WHERE quarantined_at < ?',
+                    (older_than,)
+                ).rowcount
+
+    def snapshot_digest(self, account):
+        """Возвращает хеш последнего полного снимка аккаунта или None."""
+        with self._lock:
+            digest = self._snapshots.get(account)
+            if digest is not None:
+                return digest
+            row = self.connection.execute(
+                'SELECT digest FROM snapshots WHERE account = ?',
+                (account,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_snapshot_digest(self, account, digest):
+        """Добавляет хеш полного снимка аккаунта в буфер записи."""
+        with self._lock:
+            self._snapshots[account] = digest
+            self._flush_if_needed()
+
+    def enqueue_message(self, key, chat_id, text):
+        """
+        Добавляет сообщение для Telegram в буфер записи.
+        key — ключ идемпотентности: сообщение с уже известным ключом
+        повторно не сохраняется.
+        """
+        with self._lock:
+            self._messages.append((key, str(chat_id), text, time.time()))
+            self._flush_if_needed()
+
+    def pending_messages(self, limit=100):
+        """
+        Захватывает и возвращает неотправленные сообщения по порядку.
+        Перед чтением фиксирует буфер, поэтому отправляются только
+        сообщения, сохраненные вместе со статусами и курсором.
+        Одним UPDATE захватываются свободные сообщения, захват которых
+        истек, и продлевается захват своих. Возвращает список
+        кортежей (id, chat_id, text).
+        """
+        current = time.time()
+        with self._lock:
+            self._flush()
+            with self.connection:
+                self.connection.execute(
+                    'UPDATE outbox SET claimed_by = ?, claimed_until = ? '
+                    'WHERE id IN (SELECT id FROM outbox '
+                    'WHERE done_at IS NULL AND (claimed_by = ? '
+                    'OR claimed_until IS NULL OR claimed_until < ?) '
+                    'ORDER BY id LIMIT ?)',
+                    (self.worker_id, current + self.claim_ttl,
+                     self.worker_id, current, limit),
+                )
+            return self.connection.execute(
+                'SELECT id, chat_id, text FROM outbox '
+                'WHERE done_at IS NULL AND claimed_by = ? '
+                'ORDER BY id LIMIT ?',
+                (self.worker_id, limit),
+            ).fetchall()
+
+    def finish_message(self, message_id, result):
+        """Добавляет в буфер отметку о завершении отправки сообщения."""
+        with self._lock:
+            self._finished[message_id] = (time.time(), result)
+            self._flush_if_needed()
+
+    def prune_messages(self, older_than):
+        """Удаляет отправленные сообщения, завершенные до older_than."""
+        with self._lock:
+            self._flush()
+            with self.connection:
+                return self.connection.execute(
+                    'DELETE FROM outbox WHERE done_at < ?', (older_than,)
+                ).rowcount
+
+    def credential_checks(self, since):
+        """
+        Возвращает результаты проверки учетных данных не старше since.
+        Словарь сопоставляет субъекту проверки описание проблемы,
+        пустая строка означает, что учетные данные действительны.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT subject, problem FROM credentials '
+                'WHERE checked_at >= ?', (since,)
+            ).fetchall()
+            checks = dict(rows)
+            checks.update(
+                (subject, problem) for subject, (problem, checked_at)
+                in self._credentials.items() if checked_at >= since)
+        return checks
+
+    def save_credential_check(self, subject, problem, checked_at):
+        """Добавляет в буфер результат проверки учетных данных."""
+        with self._lock:
+            self._credentials[subject] = (problem, checked_at)
+            self._flush_if_needed()
+
+    def flush(self):
+        """Фиксирует все накопленные записи одной транзакцией."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Фиксирует буфер и закрывает соединение с базой."""
+        self.flush()
+        self.connection.close()
+
+    def _flush_if_needed(self):
+        pending = (len(self._cursors) + len(self._statuses)
+                   + len(self._quarantine) + len(self._snapshots)
+                   + len(self._messages) + len(self._finished)
+                   + len(self._credentials))
+        elapsed = time.monotonic() - self._flushed_at
+        if pending >= self.batch_size or elapsed >= self.flush_interval:
+            self._flush()
+
+    def _flush(self):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO outbox (key, chat_id, text, created_at)'
+                ' VALUES (?, ?, ?, ?)',
+                self._messages,
+            )
+            self.connection.executemany(
+                'UPDATE outbox SET done_at = ?, result = ? WHERE id = ?',
+                ((done_at, result, message_id) for message_id, (
+                    done_at, result) in self._finished.items()),
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                self._cursors.items(),
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO notified_statuses VALUES (?, ?, ?)',
+                ((account, homework, status) for (account, homework), status
+                 in self._statuses.items()),
+            )
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO quarantine'
+                ' (account, payload, reason, quarantined_at, digest)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                ((account, payload, reason, quarantined_at, digest)
+                 for (account, digest), (payload, reason, quarantined_at)
+                 in self._quarantine.items()),
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO snapshots VALUES (?, ?)',
+                self._snapshots.items(),
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO credentials VALUES (?, ?, ?)',
+                ((subject, problem, checked_at) for subject, (
+                    problem, checked_at) in self._credentials.items()),
+            )
+        self._cursors.clear()
+        self._statuses.clear()
+        self._quarantine.clear()
+        self._snapshots.clear()
+        self._messages.clear()
+        self._finished.clear()
+        self._credentials.clear()
+        self._flushed_at = time.monotonic()
@@ -0,0 +1,125 @@
+import codecs
+import json
+
+from exceptions import UnexpectedResponse
+
+WHITESPACE = ' \t\n\r'
+
+
+class HomeworkStream:
+    """
+    Класс разбирает ответ API по частям, не загружая его целиком.
+    Принимает итератор байтовых фрагментов тела ответа.
+    При итерации по экземпляру работы из списка homeworks
+    возвращаются по одной; остальные ключи верхнего уровня
+    (например, current_date) доступны через метод get после итерации.
+    В памяти хранится только необработанный остаток буфера.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+        self._fields = {}
+        self._has_homeworks = False
+        self._consumed = False
+
+    def get(self, key, default=None):
+        """Возвращает значение ключа верхнего уровня ответа."""
+        return self._fields.get(key, default)
+
+    def __iter__(self):
+        if self._consumed:
+            raise RuntimeError('Ответ API уже прочитан')
+        self._consumed = True
+        if self._next_char() != '{':
+            raise TypeError('Ответ API не является словарем.')
+        self._position += 1
+        while self._next_char() != '}':
+            if self._has_fields():
+                self._expect(',')
+            key = self._decode_value()
+            if not isinstance(key, str):
+                raise UnexpectedResponse('Некорректный ключ в ответе API')
+            self._expect(':')
+            if key == 'homeworks':
+                yield from self._homeworks()
+            else:
+                self._fields[key] = self._decode_value()
+            self._compact()
+        if not self._has_homeworks:
+            raise UnexpectedResponse('Ответ API не содержит домашних работ.')
+
+    def _has_fields(self):
+        return self._has_homeworks or bool(self._fields)
+
+    def _homeworks(self):
+        self._has_homeworks = True
+        if self._next_char() != '[':
+            raise UnexpectedResponse('Homeworks из ответа API '
+                                     'не является списком')
+        self._position += 1
+        first = True
+        while self._next_char() != ']':
+            if not first:
+                self._expect(',')
+            first = False
+            homework = self._decode_value()
+            self._compact()
+            yield homework
+        self._position += 1
+
+    def _expect(self, char):
+        if self._next_char() != char:
+            raise UnexpectedResponse(f'Некорректный JSON в ответе API: '
+                                     f'ожидался символ {char!r}')
+        self._position += 1
+
+    def _next_char(self):
+        """Пропускает пробелы и возвращает следующий символ буфера."""
+        while True:
+            while (self._position < len(self._buffer)
+                   and self._buffer[self._position] in WHITESPACE):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                raise UnexpectedResponse('Ответ API неожиданно закончился')
+
+    def _decode_value(self):
+        """
+        Декодирует следующее значение JSON, дочитывая фрагменты.
+        Значение, которое заканчивается ровно на границе буфера,
+        принимается только в конце потока: число могло быть не дочитано.
+        """
+        self._next_char()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer,
+                                                   self._position)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise UnexpectedResponse('Некорректный JSON в ответе API')
+                continue
+            if end < len(self._buffer) or not self._read():
+                self._position = end
+                return value
+
+    def _read(self):
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        self._buffer += self._decoder.decode(b'', final=True)
+        self._eof = True
+        return False
+
+    def _compact(self):
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
@@ -1,9 +1,19 @@
 import sys
 from os.path import abspath, dirname
 
+import pytest
+import requests
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 
 pytest_plugins = [
     'tests.fixtures.fixture_data'
 ]
+
+
+@pytest.fixture(autouse=True)
+def session_get_via_requests_get(monkeypatch):
+    """Направляет запросы общей сессии бота в подменяемый requests.get."""
+    monkeypatch.setattr(requests.Session, 'get',
+                        lambda self, url, **kwargs: requests.get(url, **kwargs))
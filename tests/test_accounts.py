@@ -0,0 +1,74 @@
+import random
+import tracemalloc
+
+from accounts import Account, AccountTable
+
+
+def drain(table):
+    order = []
+    while table.next_due[table.peek()] != float('inf'):
+        index = table.peek()
+        order.append(table.next_due[index])
+        table.schedule(index, float('inf'))
+    return order
+
+
+class TestAccountTable:
+
+    def test_rows_behave_like_accounts(self):
+        account = Account(token='token', chat_id='7', current_timestamp=5,
+                          subscribers=('-100',))
+        row = AccountTable([account])[0]
+        assert (row.token, row.chat_id, row.current_timestamp) == (
+            'token', '7', 5)
+        assert row.key == account.key
+        assert row.destinations == ('7', '-100')
+        row.current_timestamp = 42
+        row.last_status = 'reviewing'
+        row.current_error = 'ApiError:abc'
+        row.backoff_level += 1
+        assert (row.current_timestamp, row.last_status, row.current_error,
+                row.backoff_level) == (42, 'reviewing', 'ApiError:abc', 1), (
+            'Проверьте, что строка таблицы сохраняет состояние аккаунта'
+        )
+
+    def test_strings_are_stored_once(self):
+        table = AccountTable(Account(token=f'token{index}', chat_id=index)
+                             for index in range(100))
+        for row in table:
+            row.last_status = 'approved'
+        assert table.statuses.values == ['', 'approved']
+        assert set(table.status_codes) == {1}
+
+    def test_heap_orders_accounts_by_next_due(self):
+        rng = random.Random(1)
+        table = AccountTable(Account(token=f'token{index}', chat_id=index)
+                             for index in range(500))
+        for _ in range(3):
+            for index in range(len(table)):
+                table.schedule(index, rng.random())
+        order = drain(table)
+        assert order == sorted(order) and len(order) == 500, (
+            'Проверьте, что куча выдает аккаунты по времени опроса'
+        )
+
+    def test_table_is_more_compact_than_accounts(self):
+        def allocated(build):
+            tracemalloc.start()
+            objects = build()
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del objects
+            return size
+
+        tokens = [f'token{index:032}' for index in range(20000)]
+        accounts = allocated(lambda: [
+            Account(token=token, chat_id=index, current_timestamp=0,
+                    last_status='reviewing')
+            for index, token in enumerate(tokens)])
+        table = allocated(lambda: AccountTable(
+            Account(token=token, chat_id=index, current_timestamp=0)
+            for index, token in enumerate(tokens)))
+        assert table * 2 < accounts, (
+            'Проверьте, что таблица занимает меньше памяти, чем Account'
+        )
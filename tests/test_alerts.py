@@ -0,0 +1,91 @@
+from alerts import AlertSuppressor, fingerprint
+from circuit_breaker import CircuitBreaker
+from exceptions import ApiError, CircuitOpenError, UnexpectedResponse
+
+
+def api_error(body, timestamp):
+    return ApiError(f'Сбой при работе с эндпоинт.Bad Gateway'
+                    f'API вернул 502'
+                    f'Содержание ответа: {body}'
+                    f'Параметры запроса: {{"from_date": {timestamp}}}')
+
+
+class Clock:
+    def __init__(self):
+        self.value = 0
+
+    def __call__(self):
+        return self.value
+
+
+class TestAlerts:
+
+    def test_fingerprint_ignores_volatile_details(self):
+        assert (fingerprint(api_error('<html>1</html>', 1650000000))
+                == fingerprint(api_error('<html>2</html>', 1650000600)))
+        assert fingerprint(ApiError('x')) != fingerprint(
+            UnexpectedResponse('x'))
+
+    def test_repeats_are_suppressed_within_window(self):
+        clock = Clock()
+        alerts = AlertSuppressor(window=600, max_alerts=2, now=clock)
+        decisions = [alerts.record(account, api_error('', 1000000 + i))[1]
+                     for i, account in enumerate(['a', 'a', 'b', 'c', 'c'])]
+        assert decisions == [True, False, True, False, False], (
+            'Проверьте, что повторы ошибки подавляются'
+        )
+        clock.value = 600
+        assert alerts.record('a', api_error('', 1))[1] is False
+        digest = alerts.digest()
+        assert digest.startswith('ApiError x 6 по 3 аккаунтам '
+                                 'за последние 10 мин')
+        assert alerts.digest() is None
+        assert alerts.record('a', api_error('', 1))[1] is True
+
+    def test_poll_account_sends_error_once(self, monkeypatch):
+        import homework
+        from accounts import Account
+
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        def fail(token, timestamp):
+            raise api_error(f'body {timestamp}', timestamp)
+
+        monkeypatch.setattr(homework, 'ALERTS', AlertSuppressor())
+        monkeypatch.setattr(homework, 'get_account_api_answer', fail)
+        account = Account('token', 1, 1000000)
+        for _ in range(3):
+            account.current_timestamp += 1
+            homework.poll_account(Bot(), account)
+        assert len(sent) == 1
+        assert account.current_error.startswith('ApiError:')
+
+    def test_open_circuit_keeps_one_fingerprint(self):
+        clock = Clock()
+        breaker = CircuitBreaker('эндпоинт', failure_threshold=1,
+                                 recovery_timeout=30, half_open_probes=1,
+                                 now=clock)
+        alerts = AlertSuppressor(window=600, max_alerts=5, now=clock)
+        breaker.before_call()
+        breaker.record_failure()
+        decisions = []
+        prints = set()
+        for second in range(1, 40):
+            clock.value = second
+            try:
+                breaker.before_call()
+            except CircuitOpenError as error:
+                key, notify = alerts.record('a', error)
+                prints.add(key)
+                decisions.append(notify)
+        assert len(prints) == 1, (
+            'Проверьте, что отсчет до восстановления не меняет '
+            'отпечаток ошибки разомкнутого выключателя'
+        )
+        assert decisions.count(True) == 1, (
+            'Проверьте, что о разомкнутом выключателе уведомляют один раз'
+        )
@@ -0,0 +1,16 @@
+from benchmarks import bench_polling
+
+
+class TestBenchmarkHarness:
+
+    def test_smoke_run(self, monkeypatch, capsys):
+        monkeypatch.undo()
+        report = bench_polling.main([
+            '--accounts', '5', '--duration', '0.5', '--interval', '0.1',
+            '--api-latency', '0', '--telegram-latency', '0', '--json',
+        ])
+        assert report['polls'] >= 5, (
+            'Проверьте, что стенд опрашивает фейковый API'
+        )
+        assert report['messages'] > 0
+        assert '"polls_per_s"' in capsys.readouterr().out
@@ -0,0 +1,82 @@
+from accounts import Account
+from cache import LruTtlCache
+from storage import StateStore
+
+
+class Clock:
+    def __init__(self):
+        self.value = 0
+
+    def __call__(self):
+        return self.value
+
+
+class TestLruTtlCache:
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LruTtlCache(max_size=2, ttl=60, now=Clock())
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is None, (
+            'Проверьте, что вытесняется давно не использованная запись'
+        )
+        assert (cache.get('a'), cache.get('c')) == (1, 3)
+        assert cache.stats()['evicted'] == 1
+
+    def test_discard_by_predicate(self):
+        cache = LruTtlCache(max_size=10)
+        for key in [('a', 1), ('a', 2), ('b', 1)]:
+            cache.put(key, 'approved')
+        assert cache.discard(lambda key: key[0] == 'a') == 2
+        assert (cache.get(('a', 1)), cache.get(('b', 1))) == (
+            None, 'approved')
+
+    def test_entries_expire(self):
+        clock = Clock()
+        cache = LruTtlCache(max_size=10, ttl=60, now=clock)
+        cache.put('a', 1)
+        clock.value = 59
+        assert cache.get('a') == 1
+        clock.value = 60
+        assert cache.get('a') is None
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['expired']) == (1, 1, 1)
+        assert stats['hit_rate'] == 0.5
+
+
+class TestNotificationDedup:
+
+    def test_stuck_cursor_does_not_resend(self, monkeypatch, tmp_path):
+        import homework
+        from metrics import DUPLICATES
+
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        monkeypatch.setattr(homework, 'get_account_api_answer',
+                            lambda token, timestamp: {
+                                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                                               'status': 'approved'}]})
+        store = StateStore(tmp_path / 'state.sqlite3')
+        queries = []
+        store.connection.set_trace_callback(queries.append)
+        account = Account('token', 1, 100)
+        before = DUPLICATES.value()
+        for _ in range(5):
+            homework.poll_account(Bot(), account, store)
+        assert len(sent) == 1, (
+            'Проверьте, что при отсутствии current_date статус '
+            'не отправляется повторно'
+        )
+        assert DUPLICATES.value() == before + 4
+        assert not any('notified_statuses WHERE' in query
+                       for query in queries[1:]), (
+            'Проверьте, что повторные проверки обслуживаются кешем'
+        )
+        assert store.cache.stats()['hits'] == 4
+        store.close()
@@ -0,0 +1,110 @@
+import pytest
+import requests
+
+from accounts import Account
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from exceptions import CircuitOpenError
+from scheduler import AdaptivePollPolicy, PollOutcome
+
+
+class Clock:
+    def __init__(self):
+        self.value = 0
+
+    def __call__(self):
+        return self.value
+
+
+class Response:
+    status_code = 200
+    reason = 'OK'
+    text = '{"homeworks": []}'
+
+    def json(self):
+        return {'homeworks': []}
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_recovers(self):
+        clock = Clock()
+        transitions = []
+        breaker = CircuitBreaker('api', failure_threshold=3,
+                                 recovery_timeout=10, now=clock)
+        breaker.listeners.append(
+            lambda breaker, previous, state: transitions.append(state))
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as error:
+            breaker.before_call()
+        assert error.value.retry_after == 10
+
+        clock.value = 10
+        breaker.before_call()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert transitions == [OPEN, HALF_OPEN, CLOSED]
+
+    def test_failed_probe_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker('api', failure_threshold=1,
+                                 recovery_timeout=5, now=clock)
+        breaker.record_failure()
+        clock.value = 5
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == OPEN and breaker.retry_after() == 5
+
+    def test_open_breaker_short_circuits_requests(self, monkeypatch):
+        import homework
+
+        breaker = CircuitBreaker('api', failure_threshold=1,
+                                 recovery_timeout=60)
+        breaker.record_failure()
+        monkeypatch.setattr(homework, 'API_BREAKER', breaker)
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Запрос не должен выполняться')
+
+        monkeypatch.setattr(requests, 'get', fail)
+        with pytest.raises(CircuitOpenError):
+            homework.get_api_answer(0)
+
+    def test_probe_is_released_on_unexpected_error(self, monkeypatch):
+        import homework
+
+        clock = Clock()
+        breaker = CircuitBreaker('api', failure_threshold=1,
+                                 recovery_timeout=5, now=clock)
+        breaker.record_failure()
+        clock.value = 5
+        monkeypatch.setattr(homework, 'API_BREAKER', breaker)
+
+        def broken_header(*args, **kwargs):
+            raise UnicodeEncodeError('latin-1', 'токен', 0, 1,
+                                     'ordinal not in range(256)')
+
+        monkeypatch.setattr(requests, 'get', broken_header)
+        with pytest.raises(UnicodeEncodeError):
+            homework.get_account_api_answer('токен', 0)
+        assert breaker.state == HALF_OPEN and breaker.probes == 0, (
+            'Проверьте, что прерванный пробный запрос освобождает слот'
+        )
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            Response()))
+        assert homework.get_account_api_answer('token', 0) == {
+            'homeworks': []}
+        assert breaker.state == CLOSED
+
+    def test_scheduler_waits_for_probe(self):
+        policy = AdaptivePollPolicy(base_delay=600, fast_delay=120,
+                                    slow_delay=1800, max_backoff=3600,
+                                    rng=lambda: 0.5)
+        account = Account('token', 1)
+        error = CircuitOpenError('open', retry_after=20)
+        assert policy.next_delay(account, PollOutcome([], error)) == 80
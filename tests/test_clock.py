@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from accounts import Account
+from benchmarks import simulate_policy
+from clock import VirtualClock
+from engine import PollingEngine
+from scheduler import FixedPollPolicy
+
+
+class TestVirtualClock:
+
+    def test_week_of_sleep_is_instant(self):
+        clock = VirtualClock(start=1650000000)
+
+        async def scenario():
+            await asyncio.sleep(7 * 24 * 60 * 60)
+            return asyncio.get_running_loop().time()
+
+        started = time.perf_counter()
+        assert clock.run(scenario()) == 1650000000 + 7 * 24 * 60 * 60
+        assert time.perf_counter() - started < 1, (
+            'Проверьте, что виртуальное время не ждет реального'
+        )
+
+    def test_engine_runs_on_virtual_time(self):
+        clock = VirtualClock(start=1650000000)
+        accounts = [Account(token=f'token{i}', chat_id=i) for i in range(3)]
+        polled = []
+
+        def poll(account):
+            polled.append((account.chat_id, clock.time()))
+
+        engine = PollingEngine(accounts, poll, FixedPollPolicy(600),
+                               inline=True)
+
+        async def scenario():
+            asyncio.get_running_loop().call_later(24 * 60 * 60, engine.stop)
+            await engine.run()
+
+        clock.run(scenario())
+        assert len(polled) == 3 * 144, (
+            'Проверьте, что за сутки каждый аккаунт опрошен раз в 600 с'
+        )
+        first = [moment for chat_id, moment in polled if chat_id == 1]
+        assert first[1] - first[0] == pytest.approx(600)
+
+    def test_waiting_forever_is_an_error(self):
+        async def scenario():
+            await asyncio.Event().wait()
+
+        with pytest.raises(RuntimeError):
+            VirtualClock().run(scenario())
+
+
+class TestPolicySimulation:
+
+    def test_smoke(self):
+        import homework
+
+        get_account_api_answer = homework.get_account_api_answer
+        breaker, session = homework.API_BREAKER, homework.HTTP_SESSION
+        reports = simulate_policy.main(['--accounts', '3', '--days', '2',
+                                        '--json'])
+        assert [report['policy'] for report in reports] == [
+            'fixed', 'adaptive']
+        for report in reports:
+            assert report['api_calls'] > 0
+            assert report['notified'] + report['missed'] == (
+                report['transitions'])
+        assert homework.get_account_api_answer is get_account_api_answer, (
+            'Проверьте, что моделирование восстанавливает homework'
+        )
+        assert homework.API_BREAKER is breaker
+        assert homework.HTTP_SESSION is session
@@ -0,0 +1,155 @@
+import asyncio
+import json
+from collections import Counter
+
+from accounts import Account, AccountTable, load_accounts
+from engine import PollingEngine
+from scheduler import FixedPollPolicy
+
+
+class TestPollingEngine:
+
+    def test_load_accounts(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token1', 'chat_id': 1},
+            {'practicum_token': 'token2', 'chat_id': 2},
+        ]))
+        accounts = load_accounts(path)
+        assert [account.token for account in accounts] == [
+            'token1', 'token2'
+        ], 'Проверьте, что load_accounts читает токены из файла'
+        assert accounts[0].current_error == ''
+
+    def test_engine_polls_every_account(self):
+        accounts = [Account(token=f'token{i}', chat_id=i) for i in range(50)]
+        polled = []
+
+        async def scenario():
+            def poll(account):
+                polled.append(account.chat_id)
+                if len(polled) >= 2 * len(accounts):
+                    engine.stop()
+
+            engine = PollingEngine(accounts, poll, FixedPollPolicy(0.01),
+                                   max_in_flight=8)
+            await asyncio.wait_for(engine.run(), timeout=5)
+
+        asyncio.run(scenario())
+        assert set(polled) == set(range(50)), (
+            'Проверьте, что движок опрашивает каждый аккаунт'
+        )
+
+    def test_engine_skips_foreign_accounts(self):
+        accounts = [Account(token=f'token{i}', chat_id=i) for i in range(10)]
+        polled = []
+
+        async def scenario():
+            def poll(account):
+                polled.append(account.chat_id)
+                if len(polled) >= 10:
+                    engine.stop()
+
+            engine = PollingEngine(accounts, poll, FixedPollPolicy(0.01),
+                                   owns=lambda account: account.chat_id < 5,
+                                   idle_delay=0.01)
+            await asyncio.wait_for(engine.run(), timeout=5)
+
+        asyncio.run(scenario())
+        assert set(polled) == set(range(5)), (
+            'Проверьте, что воркер опрашивает только свои аккаунты'
+        )
+
+    def test_poll_account_updates_state(self, monkeypatch):
+        import homework
+
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append((chat_id, text))
+
+        monkeypatch.setattr(homework, 'get_account_api_answer',
+                            lambda token, timestamp: {
+                                'homeworks': [{'homework_name': 'hw',
+                                               'status': 'approved'}],
+                                'current_date': 42,
+                            })
+        account = Account(token='token', chat_id=7, current_timestamp=1)
+        outcome = homework.poll_account(Bot(), account)
+        assert outcome.statuses == ['approved'] and outcome.error is None
+        assert account.current_timestamp == 42
+        assert sent and sent[0][0] == 7, (
+            'Проверьте, что сообщение отправляется в чат аккаунта'
+        )
+
+    def test_poll_account_validates_current_date(self, monkeypatch):
+        import homework
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                pass
+
+        row = AccountTable([Account(token='token', chat_id=7,
+                                    current_timestamp=100)])[0]
+        for current_date, expected in ((None, 100), (150.7, 150),
+                                       ('200', 150), (float('nan'), 150),
+                                       (True, 150), (300, 300)):
+            monkeypatch.setattr(homework, 'get_account_api_answer',
+                                lambda token, timestamp, value=current_date: {
+                                    'homeworks': [], 'current_date': value,
+                                })
+            outcome = homework.poll_account(Bot(), row)
+            assert outcome.error is None, (
+                'Проверьте, что некорректная метка не ломает опрос'
+            )
+            assert row.current_timestamp == expected, (
+                'Проверьте, что некорректная метка не сдвигает курсор'
+            )
+
+    def test_engine_dispatches_table_by_next_due(self):
+        table = AccountTable(Account(token=f'token{i}', chat_id=i)
+                             for i in range(200))
+        polled = []
+
+        class Policy(FixedPollPolicy):
+            def next_delay(self, account, outcome):
+                return 0.01 if account.chat_id < 10 else 10
+
+        async def scenario():
+            def poll(account):
+                polled.append(account.chat_id)
+                if len(polled) >= 400:
+                    engine.stop()
+
+            engine = PollingEngine(table, poll, Policy(0.1),
+                                   max_in_flight=8)
+            await asyncio.wait_for(engine.run(), timeout=5)
+
+        asyncio.run(scenario())
+        assert set(polled) == set(range(200)), (
+            'Проверьте, что движок опрашивает каждый аккаунт таблицы'
+        )
+        counts = Counter(polled)
+        assert all(counts[chat_id] == 1 for chat_id in range(10, 200)), (
+            'Проверьте, что аккаунты опрашиваются по времени из кучи'
+        )
+
+    def test_engine_skips_foreign_table_accounts(self):
+        table = AccountTable(Account(token=f'token{i}', chat_id=i)
+                             for i in range(10))
+        polled = []
+
+        async def scenario():
+            def poll(account):
+                polled.append(account.chat_id)
+                if len(polled) >= 10:
+                    engine.stop()
+
+            engine = PollingEngine(table, poll, FixedPollPolicy(0.01),
+                                   owns=lambda account: account.chat_id < 5,
+                                   idle_delay=0.01, inline=True)
+            await asyncio.wait_for(engine.run(), timeout=5)
+
+        asyncio.run(scenario())
+        assert set(polled) == set(range(5))
@@ -0,0 +1,49 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from http_session import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"homeworks": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSessionPool:
+
+    def test_connections_are_reused(self, monkeypatch):
+        monkeypatch.undo()
+        server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        pool = SessionPool(pool_size=2, connect_timeout=1, read_timeout=1)
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/'
+            for _ in range(5):
+                assert pool.get(url).json() == {'homeworks': []}
+            stats = pool.stats()
+        finally:
+            pool.close()
+            server.shutdown()
+            server.server_close()
+        assert stats == {'requests': 5, 'hits': 4, 'misses': 1}, (
+            'Проверьте, что сессия переиспользует keep-alive соединение'
+        )
+
+    def test_default_timeout(self, monkeypatch):
+        calls = []
+        pool = SessionPool(connect_timeout=2, read_timeout=7)
+        monkeypatch.setattr(pool.session, 'get',
+                            lambda url, **kwargs: calls.append(kwargs))
+        pool.get('http://example.invalid/')
+        assert calls[0]['timeout'] == (2, 7)
@@ -0,0 +1,61 @@
+import io
+import json
+import logging
+
+from logging_config import (LazyQueueHandler, SamplingFilter, parse_sampling,
+                            setup_logging)
+
+
+class Unformattable:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'value'
+
+
+class TestLoggingConfig:
+
+    def test_json_records_with_fields(self):
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        stream = io.StringIO()
+        listener = setup_logging('DEBUG', 'json', stream=stream)
+        try:
+            logging.getLogger('homework').info(
+                'Ответ за %s', 'миг', extra={'account': 'abc',
+                                             'latency': 0.5})
+        finally:
+            listener.stop()
+            root.handlers[:] = handlers
+            root.setLevel(level)
+        record = json.loads(stream.getvalue())
+        assert record['message'] == 'Ответ за миг'
+        assert record['account'] == 'abc' and record['latency'] == 0.5
+
+    def test_formatting_is_deferred(self):
+        handler = LazyQueueHandler(None)
+        argument = Unformattable()
+        record = logging.LogRecord('homework', logging.DEBUG, __file__, 1,
+                                   'value %s', (argument,), None)
+        assert handler.prepare(record) is record
+        assert argument.formatted == 0, (
+            'Проверьте, что сообщение не форматируется в вызывающем потоке'
+        )
+
+    def test_sampling_by_category(self):
+        sampling = SamplingFilter(parse_sampling('api=0.25, poll=0'))
+
+        def record(level, category):
+            item = logging.LogRecord('homework', level, __file__, 1, 'msg',
+                                     None, None)
+            item.category = category
+            return item
+
+        kept = [sampling.filter(record(logging.DEBUG, 'api'))
+                for _ in range(8)]
+        assert kept.count(True) == 2
+        assert not sampling.filter(record(logging.DEBUG, 'poll'))
+        assert sampling.filter(record(logging.ERROR, 'poll'))
+        assert sampling.filter(record(logging.DEBUG, 'other'))
@@ -0,0 +1,63 @@
+import requests
+
+from metrics import Counter, Gauge, Histogram, MetricsServer, Registry
+
+
+class TestMetrics:
+
+    def test_histogram_text_format(self):
+        histogram = Histogram('latency_seconds', 'Задержка.',
+                              buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+        lines = list(histogram.samples())
+        assert lines == [
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1.0"} 2',
+            'latency_seconds_bucket{le="+Inf"} 3',
+            'latency_seconds_sum 5.55',
+            'latency_seconds_count 3',
+        ]
+
+    def test_counter_by_exception(self):
+        counter = Counter('errors_total', 'Ошибки.', label='exception')
+        counter.inc('ApiError')
+        counter.inc('ApiError')
+        counter.inc('UnexpectedResponse')
+        assert list(counter.samples()) == [
+            'errors_total{exception="ApiError"} 2',
+            'errors_total{exception="UnexpectedResponse"} 1',
+        ]
+
+    def test_server_exposes_registry(self, monkeypatch):
+        monkeypatch.undo()
+        registry = Registry()
+        registry.register(Gauge('outbox_depth', 'Очередь.', lambda: 3))
+        server = MetricsServer(registry)
+        server.start()
+        try:
+            response = requests.get(
+                f'http://127.0.0.1:{server.port}/metrics', timeout=5)
+        finally:
+            server.stop()
+        assert response.status_code == 200
+        assert '# TYPE outbox_depth gauge\noutbox_depth 3\n' in response.text
+
+    def test_poll_errors_are_counted(self, monkeypatch):
+        import homework
+        from accounts import Account
+        from exceptions import ApiError
+
+        def fail(token, timestamp):
+            raise ApiError('Сбой')
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                pass
+
+        monkeypatch.setattr(homework, 'get_account_api_answer', fail)
+        before = homework.ERRORS.value('ApiError')
+        polls = homework.POLL_LATENCY.count
+        homework.poll_account(Bot(), Account('token', 1, 1))
+        assert homework.ERRORS.value('ApiError') == before + 1
+        assert homework.POLL_LATENCY.count == polls + 1
@@ -0,0 +1,192 @@
+import time
+
+from accounts import Account
+
+
+class Bot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class TestBatchedNotifications:
+
+    def test_all_homeworks_in_one_message(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(homework, 'get_account_api_answer',
+                            lambda token, timestamp: {
+                                'homeworks': [
+                                    {'id': 1, 'homework_name': 'hw1',
+                                     'status': 'approved'},
+                                    {'id': 2, 'homework_name': 'hw2',
+                                     'status': 'rejected'},
+                                    {'id': 1, 'homework_name': 'hw1',
+                                     'status': 'reviewing'},
+                                ],
+                                'current_date': 42,
+                            })
+        bot = Bot()
+        homework.poll_account(bot, Account('token', 7, 1))
+        assert len(bot.sent) == 1, (
+            'Проверьте, что изменения отправляются одним сообщением'
+        )
+        text = bot.sent[0][1]
+        assert '"hw1"' in text and '"hw2"' in text
+        assert homework.HOMEWORK_STATUSES['reviewing'] not in text, (
+            'Проверьте, что для работы отправляется только последний статус'
+        )
+
+    def test_render_messages_respects_limit(self):
+        import homework
+
+        messages = list(homework.render_messages(
+            ['a' * 6, 'b' * 6, 'c' * 6], limit=13))
+        assert messages == ['a' * 6 + '\n' + 'b' * 6, 'c' * 6]
+
+
+class TestQuarantine:
+
+    def test_bad_item_does_not_block_cycle(self, monkeypatch, tmp_path):
+        import homework
+        from metrics import QUARANTINED
+        from storage import StateStore
+
+        monkeypatch.setattr(homework, 'get_account_api_answer',
+                            lambda token, timestamp: {
+                                'homeworks': [
+                                    {'id': 1, 'homework_name': 'hw1',
+                                     'status': 'approved'},
+                                    {'id': 2, 'status': 'approved'},
+                                    {'id': 3, 'homework_name': 'hw3',
+                                     'status': 'lost'},
+                                ],
+                                'current_date': 42,
+                            })
+        before = QUARANTINED.value('KeyError')
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        account = Account('token', 7, 1)
+        bot = Bot()
+        outcome = homework.poll_account(bot, account, store)
+        assert outcome.error is None, (
+            'Проверьте, что некорректная работа не прерывает цикл опроса'
+        )
+        assert outcome.statuses == ['approved']
+        assert len(bot.sent) == 1 and '"hw1"' in bot.sent[0][1]
+        assert account.current_timestamp == 42, (
+            'Проверьте, что временная метка сдвигается, '
+            'даже если часть работ отложена в карантин'
+        )
+        assert QUARANTINED.value('KeyError') == before + 1
+        reasons = [(item['id'], reason)
+                   for item, reason in store.quarantined(account.key)]
+        assert [item_id for item_id, _ in reasons] == [2, 3]
+        assert 'lost' in reasons[1][1]
+        store.close()
+
+    def test_repeated_bad_item_is_quarantined_once(self, monkeypatch,
+                                                   tmp_path):
+        import homework
+        from metrics import QUARANTINED
+        from storage import StateStore
+
+        monkeypatch.setattr(homework, 'get_account_api_answer',
+                            lambda token, timestamp: {
+                                'homeworks': [{'id': 2,
+                                               'status': 'approved'}],
+                            })
+        before = QUARANTINED.value('KeyError')
+        store = StateStore(str(tmp_path / 'state.sqlite3'), batch_size=1)
+        account = Account('token', 7, 1)
+        for _ in range(3):
+            homework.poll_account(Bot(), account, store)
+        assert len(store.quarantined(account.key)) == 1, (
+            'Проверьте, что повторно полученная работа не дублируется '
+            'в карантине'
+        )
+        assert QUARANTINED.value('KeyError') == before + 1
+        assert store.prune_quarantined(time.time() + 1) == 1
+        assert store.quarantined(account.key) == []
+        store.close()
+
+    def test_old_quarantine_schema_is_migrated(self, tmp_path):
+        import sqlite3
+
+        from storage import StateStore
+
+        path = str(tmp_path / 'state.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE quarantine (account TEXT NOT NULL,'
+                           ' payload TEXT NOT NULL, reason TEXT NOT NULL,'
+                           ' quarantined_at REAL NOT NULL)')
+        connection.execute("INSERT INTO quarantine VALUES "
+                           "('account', '{}', 'KeyError', 0)")
+        connection.commit()
+        connection.close()
+        store = StateStore(path)
+        assert store.save_quarantined('account', {}, 'KeyError')
+        assert not store.save_quarantined('account', {}, 'KeyError')
+        assert len(store.quarantined('account')) == 2
+        store.close()
+
+
+class TestFanOut:
+
+    def test_one_poll_reaches_every_subscriber(self, monkeypatch):
+        import homework
+
+        calls = []
+
+        def answer(token, timestamp):
+            calls.append(token)
+            return {'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                                   'status': 'approved'}],
+                    'current_date': 42}
+
+        monkeypatch.setattr(homework, 'get_account_api_answer', answer)
+        bot = Bot()
+        account = Account('token', 7, 1, subscribers=('@course', -100, 7))
+        homework.poll_account(bot, account)
+        assert calls == ['token'], (
+            'Проверьте, что API опрашивается один раз на аккаунт'
+        )
+        assert [chat_id for chat_id, _ in bot.sent] == [7, '@course', -100], (
+            'Проверьте, что уведомление получают все подписчики без повторов'
+        )
+        assert len({id(text) for _, text in bot.sent}) == 1, (
+            'Проверьте, что сообщение собирается один раз'
+        )
+
+    def test_durable_keys_per_destination(self, monkeypatch, tmp_path):
+        import homework
+        from storage import StateStore
+
+        monkeypatch.setattr(homework, 'get_account_api_answer',
+                            lambda token, timestamp: {
+                                'homeworks': [{'id': 1,
+                                               'homework_name': 'hw1',
+                                               'status': 'approved'}],
+                                'current_date': 42})
+        store = StateStore(tmp_path / 'state.sqlite3', durable_outbox=True)
+        account = Account('token', 7, 1, subscribers=('@course',))
+        homework.poll_account(Bot(), account, store)
+        assert sorted(chat_id for _, chat_id, _ in
+                      store.pending_messages()) == ['7', '@course']
+        store.close()
+
+    def test_load_accounts_reads_subscribers(self, tmp_path):
+        import json
+
+        from accounts import load_accounts
+
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token', 'chat_id': 1,
+             'subscribers': [-100, '@course']},
+            {'practicum_token': 'other', 'chat_id': 2},
+        ]))
+        first, second = load_accounts(path)
+        assert first.destinations == (1, -100, '@course')
+        assert second.destinations == (2,)
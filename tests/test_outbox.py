@@ -0,0 +1,249 @@
+import asyncio
+import threading
+
+import telegram
+
+from outbox import TelegramOutbox, TokenBucket
+
+
+class FlakyBot:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+
+
+def deliver(bot, messages, **kwargs):
+    async def scenario():
+        outbox = TelegramOutbox(bot, global_rate=1000, chat_rate=1000,
+                                backoff=0, **kwargs)
+        await outbox.start()
+        threads = [threading.Thread(target=outbox.send_message, args=message)
+                   for message in messages]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        await asyncio.sleep(0.05)
+        await outbox.stop(timeout=2)
+        return outbox.stats()
+
+    return asyncio.run(scenario())
+
+
+class TestTelegramOutbox:
+
+    def test_messages_from_threads_are_sent(self):
+        bot = FlakyBot([])
+        stats = deliver(bot, [(chat, 'text') for chat in range(20)])
+        assert sorted(chat for chat, _ in bot.sent) == list(range(20))
+        assert stats['sent'] == 20 and stats['queue_depth'] == 0
+
+    def test_retry_after_is_honoured(self):
+        bot = FlakyBot([telegram.error.RetryAfter(0.01),
+                        telegram.error.NetworkError('timeout')])
+        stats = deliver(bot, [(1, 'text')])
+        assert bot.sent == [(1, 'text')], (
+            'Проверьте, что сообщение повторно отправляется после ошибки'
+        )
+        assert stats['retried'] == 2 and stats['dropped'] == 0
+
+    def test_permanent_error_drops_message(self):
+        bot = FlakyBot([telegram.error.BadRequest('chat not found')])
+        stats = deliver(bot, [(1, 'text')])
+        assert bot.sent == [] and stats['dropped'] == 1
+
+    def test_chat_has_one_bucket(self):
+        outbox = TelegramOutbox(FlakyBot([]))
+        assert outbox._chat_bucket(7) is outbox._chat_bucket('7'), (
+            'Проверьте, что чат с числовым и строковым идентификатором '
+            'получает один лимит'
+        )
+
+    def test_enqueue_is_not_logged_as_sent(self, monkeypatch):
+        import homework
+
+        logged = []
+        monkeypatch.setattr(homework.logger, 'info',
+                            lambda message, *args, **kwargs: logged.append(
+                                message))
+
+        async def scenario():
+            outbox = TelegramOutbox(FlakyBot([telegram.error.BadRequest(
+                'chat not found')]))
+            await outbox.start()
+            homework.send_chat_message(outbox, 1, 'text')
+            await outbox.stop(timeout=1)
+            return outbox.stats()
+
+        stats = asyncio.run(scenario())
+        assert stats['dropped'] == 1
+        assert logged == ['Сообщение поставлено в очередь отправки: %s'], (
+            'Проверьте, что постановка в очередь не считается отправкой'
+        )
+
+    def test_token_bucket_limits_rate(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, now=lambda: now[0])
+        assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+        bucket.pause(5)
+        now[0] = 10
+        bucket.pause(5)
+        assert bucket.reserve() == 5
+
+
+class TestDurableOutbox:
+
+    def answer(self, token, timestamp):
+        return {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved',
+                               'date_updated': '2022-01-01T12:00:00Z'}],
+                'current_date': 200}
+
+    def test_crash_before_commit_loses_nothing(self, monkeypatch, tmp_path):
+        import homework
+        from accounts import Account
+        from storage import StateStore
+
+        monkeypatch.setattr(homework, 'get_account_api_answer', self.answer)
+        path = tmp_path / 'state.sqlite3'
+        bot = FlakyBot([])
+        store = StateStore(path, batch_size=1000, flush_interval=1000,
+                           durable_outbox=True)
+        homework.poll_account(bot, Account('token', 1, 100), store)
+        assert bot.sent == [], (
+            'Проверьте, что при durable_outbox опрос не отправляет напрямую'
+        )
+        store.connection.close()
+
+        store = StateStore(path, durable_outbox=True)
+        assert store.load_cursors() == {}
+        assert store.pending_messages() == [], (
+            'Проверьте, что курсор и сообщения фиксируются вместе'
+        )
+        account = Account('token', 1, 100)
+        homework.poll_account(bot, account, store)
+        homework.poll_account(bot, account, store)
+        [(_, chat_id, text)] = store.pending_messages()
+        assert chat_id == '1' and '"hw"' in text
+        assert store.load_cursors() == {account.key: 200}
+        store.close()
+
+    def test_enqueue_is_idempotent(self, tmp_path):
+        from storage import StateStore
+
+        store = StateStore(tmp_path / 'state.sqlite3', durable_outbox=True)
+        store.enqueue_message('key', 1, 'text')
+        store.enqueue_message('key', 1, 'text')
+        assert len(store.pending_messages()) == 1
+        store.close()
+
+    def test_drain_delivers_at_least_once(self, monkeypatch, tmp_path):
+        import homework
+        from storage import StateStore
+
+        monkeypatch.setattr(homework, 'OUTBOX_DRAIN_INTERVAL', 0.01)
+        store = StateStore(tmp_path / 'state.sqlite3', durable_outbox=True)
+        store.enqueue_message('first', 1, 'first')
+        store.enqueue_message('second', 2, 'second')
+        bot = FlakyBot([telegram.error.NetworkError('timeout')] * 2)
+
+        async def scenario():
+            outbox = TelegramOutbox(bot, global_rate=1000, chat_rate=1000,
+                                    backoff=0, max_retries=0)
+            await outbox.start()
+            drain = asyncio.ensure_future(homework.drain_outbox(store,
+                                                                outbox))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if len(bot.sent) == 2:
+                    break
+            drain.cancel()
+            await asyncio.gather(drain, return_exceptions=True)
+            await outbox.stop(timeout=1)
+
+        asyncio.run(scenario())
+        assert sorted(bot.sent) == [('1', 'first'), ('2', 'second')], (
+            'Проверьте, что отложенные сообщения отправляются повторно'
+        )
+        assert store.pending_messages() == [], (
+            'Проверьте, что отправленные сообщения отмечаются в хранилище'
+        )
+        store.close()
+
+    def test_workers_claim_disjoint_messages(self, tmp_path, monkeypatch):
+        import storage
+        from storage import StateStore
+
+        path = tmp_path / 'state.sqlite3'
+        first = StateStore(path, durable_outbox=True, worker_id='first',
+                           claim_ttl=60)
+        second = StateStore(path, durable_outbox=True, worker_id='second',
+                            claim_ttl=60)
+        for index in range(4):
+            first.enqueue_message(f'key{index}', index, 'text')
+        claimed = first.pending_messages(limit=3)
+        assert len(claimed) == 3
+        rest = second.pending_messages()
+        assert len(rest) == 1 and rest[0] not in claimed, (
+            'Проверьте, что сообщение отправляет только захвативший воркер'
+        )
+        assert first.pending_messages(limit=10) == claimed
+        now = storage.time.time() + 61
+        monkeypatch.setattr(storage.time, 'time', lambda: now)
+        assert len(second.pending_messages(limit=10)) == 4, (
+            'Проверьте, что сообщения остановившегося воркера '
+            'отправляют другие'
+        )
+        first.close()
+        second.close()
+
+    def test_old_outbox_schema_is_migrated(self, tmp_path):
+        import sqlite3
+
+        from storage import StateStore
+
+        path = tmp_path / 'state.sqlite3'
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE outbox (id INTEGER PRIMARY KEY, key TEXT NOT NULL '
+            'UNIQUE, chat_id TEXT NOT NULL, text TEXT NOT NULL, '
+            'created_at REAL NOT NULL, done_at REAL, result TEXT)')
+        connection.close()
+        store = StateStore(path, durable_outbox=True)
+        store.enqueue_message('key', 1, 'text')
+        assert len(store.pending_messages()) == 1
+        store.close()
+
+    def test_drain_survives_store_errors(self, monkeypatch):
+        import sqlite3
+
+        import homework
+
+        calls = []
+
+        class Store:
+            def pending_messages(self, limit):
+                calls.append(limit)
+                if len(calls) == 1:
+                    raise sqlite3.OperationalError('database is locked')
+                return []
+
+        async def scenario():
+            drain = asyncio.ensure_future(homework.drain_outbox(Store(),
+                                                                None))
+            while len(calls) < 2:
+                await asyncio.sleep(0.01)
+            drain.cancel()
+            await asyncio.gather(drain, return_exceptions=True)
+
+        errors = []
+        monkeypatch.setattr(homework, 'OUTBOX_DRAIN_INTERVAL', 0.01)
+        monkeypatch.setattr(homework.logger, 'error',
+                            lambda *args, **kwargs: errors.append(args))
+        asyncio.run(scenario())
+        assert errors, 'Проверьте, что сбой хранилища пишется в лог'
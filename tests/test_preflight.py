@@ -0,0 +1,286 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+import telegram
+
+from accounts import Account, AccountTable
+from engine import PollingEngine
+from exceptions import ApiError, InvalidCredentials
+from preflight import CACHED, INVALID, UNKNOWN, VALID, PreflightCheck
+from scheduler import FixedPollPolicy
+from storage import StateStore
+
+
+class Response:
+    reason = 'Unauthorized'
+    text = '{}'
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def json(self):
+        return {'homeworks': [], 'current_date': 0}
+
+
+class Probes:
+
+    def __init__(self, bad_tokens=(), bad_chats=(), broken=()):
+        self.bad = set(bad_tokens) | set(bad_chats)
+        self.broken = set(broken)
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def probe(self, value):
+        with self._lock:
+            self.calls.append(value)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        if value in self.broken:
+            raise ConnectionError('сеть недоступна')
+        if value in self.bad:
+            raise InvalidCredentials(f'{value} отклонен')
+
+
+def accounts():
+    return [
+        Account(token='good', chat_id=1, subscribers=(10, 11)),
+        Account(token='revoked', chat_id=2),
+        Account(token='good2', chat_id=3),
+        Account(token='good3', chat_id=10),
+        Account(token='flaky', chat_id=4),
+    ]
+
+
+class TestPreflightCheck:
+
+    def test_rejects_invalid_credentials(self):
+        probes = Probes(bad_tokens={'revoked'}, bad_chats={3, 11},
+                        broken={'flaky'})
+        results = []
+        check = PreflightCheck(probes.probe, probes.probe, workers=4,
+                               observe=results.append)
+        accepted, rejected = check.run(accounts())
+        assert [account.token for account in accepted] == [
+            'good', 'good3', 'flaky'
+        ], 'Проверьте, что аккаунты с отклоненным токеном или чатом исключены'
+        assert [account.token for account, _ in rejected] == [
+            'revoked', 'good2']
+        assert accepted[0].subscribers == (10,), (
+            'Проверьте, что недоступные чаты подписчиков исключаются'
+        )
+        assert sorted(probes.calls, key=str).count(10) == 1, (
+            'Проверьте, что каждый чат проверяется один раз'
+        )
+        assert 1 < probes.peak <= 4, (
+            'Проверьте, что проверки идут параллельно не более workers'
+        )
+        assert results.count(INVALID) == 3 and results.count(UNKNOWN) == 1
+        assert results.count(VALID) == len(probes.calls) - 4
+
+    def test_caches_results_in_store(self, tmp_path):
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        clock = [1000.0]
+        probes = Probes(bad_tokens={'revoked'}, broken={'flaky'})
+        results = []
+        check = PreflightCheck(probes.probe, probes.probe, ttl=60,
+                               store=store, observe=results.append,
+                               now=lambda: clock[0])
+        first = check.run(accounts())
+        probes.calls.clear()
+        results.clear()
+        assert check.run(accounts()) == first
+        assert probes.calls == ['flaky'], (
+            'Проверьте, что результаты проверки кешируются, '
+            'а сбои проверки — нет'
+        )
+        assert UNKNOWN in results and CACHED in results
+        clock[0] += 61
+        probes.calls.clear()
+        check.run(accounts())
+        assert 'good' in probes.calls, (
+            'Проверьте, что устаревшие результаты проверяются заново'
+        )
+        store.close()
+
+
+class TestProbes:
+
+    def test_practicum_token_probe(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(requests, 'get',
+                            lambda *args, **kwargs: Response(401))
+        with pytest.raises(InvalidCredentials):
+            homework.probe_practicum_token('revoked')
+        monkeypatch.setattr(requests, 'get',
+                            lambda *args, **kwargs: Response(429))
+        with pytest.raises(ApiError):
+            homework.probe_practicum_token('token')
+        monkeypatch.setattr(requests, 'get',
+                            lambda *args, **kwargs: Response(200))
+        homework.probe_practicum_token('token')
+
+    def test_chat_probe(self):
+        import homework
+
+        class Bot:
+            def __init__(self, error):
+                self.error = error
+
+            def get_chat(self, chat_id):
+                if self.error is not None:
+                    raise self.error
+
+        with pytest.raises(InvalidCredentials):
+            homework.probe_chat(Bot(telegram.error.BadRequest(
+                'Chat not found')), 1)
+        with pytest.raises(telegram.error.TimedOut):
+            homework.probe_chat(Bot(telegram.error.TimedOut()), 1)
+        homework.probe_chat(Bot(None), 1)
+
+    def test_bot_probe_survives_network_errors(self):
+        import homework
+
+        class Bot:
+            def __init__(self, error):
+                self.error = error
+
+            def get_me(self):
+                raise self.error
+
+        homework.probe_bot(Bot(telegram.error.NetworkError('reset')))
+        homework.probe_bot(Bot(telegram.error.TimedOut()))
+        with pytest.raises(InvalidCredentials):
+            homework.probe_bot(Bot(telegram.error.Unauthorized('revoked')))
+
+    def test_chat_probes_are_rate_limited(self, monkeypatch):
+        import homework
+        from outbox import TokenBucket
+
+        clock = [0.0]
+        waits = []
+
+        class Clock:
+            def time(self):
+                return clock[0]
+
+            def sleep(self, delay):
+                waits.append(delay)
+                clock[0] += delay
+
+        class Bot:
+            error = None
+
+            def get_chat(self, chat_id):
+                if self.error is not None:
+                    raise self.error
+
+        monkeypatch.setattr(homework, 'CLOCK', Clock())
+        bucket = TokenBucket(2, now=lambda: clock[0])
+        bot = Bot()
+        for chat_id in range(6):
+            homework.probe_chat(bot, chat_id, bucket=bucket)
+        assert clock[0] == pytest.approx(2), (
+            'Проверьте, что проверки чатов ограничены по частоте'
+        )
+        bot.error = telegram.error.RetryAfter(30)
+        with pytest.raises(telegram.error.RetryAfter):
+            homework.probe_chat(bot, 6, bucket=bucket)
+        bot.error = None
+        homework.probe_chat(bot, 7, bucket=bucket)
+        assert waits[-1] == pytest.approx(30, abs=1), (
+            'Проверьте, что после RetryAfter проверки чатов приостанавливаются'
+        )
+
+    def test_chat_rate_is_shared_by_workers(self, monkeypatch):
+        import homework
+        from outbox import TokenBucket
+
+        class Bot:
+            def get_chat(self, chat_id):
+                pass
+
+        monkeypatch.setattr(homework, 'PREFLIGHT_CHAT_RATE', 20)
+        bucket = TokenBucket(20)
+        homework.probe_chat(Bot(), 1, bucket=bucket, workers=lambda: 4)
+        assert bucket.rate == 5, (
+            'Проверьте, что лимит проверок чатов делится между воркерами'
+        )
+
+
+class TestBackgroundPreflight:
+
+    def test_sharded_worker_checks_only_own_accounts(self, tmp_path):
+        import homework
+        from sharding import LeaseCoordinator
+
+        path = str(tmp_path / 'shards.sqlite3')
+        workers = [LeaseCoordinator(path, name, partitions=16)
+                   for name in ('first', 'second')]
+        for _ in range(2):
+            for worker in workers:
+                worker.heartbeat()
+        coordinator = workers[0]
+        table = AccountTable(Account(token=f'token{index}', chat_id=index)
+                             for index in range(40))
+        own = {account.token for account in table
+               if coordinator.owns(account.key)}
+        revoked = sorted(own)[0]
+        probed = []
+
+        def probe_token(token):
+            probed.append(token)
+            if token == revoked:
+                raise InvalidCredentials('revoked')
+
+        check = PreflightCheck(probe_token, lambda chat_id: None, workers=4)
+        excluded = set()
+
+        async def scenario():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(homework.check_accounts(
+                    check, None, table, excluded,
+                    owns=lambda account: coordinator.owns(account.key),
+                    interval=60), timeout=1)
+
+        asyncio.run(scenario())
+        assert 0 < len(own) < len(table) and set(probed) == own, (
+            'Проверьте, что воркер проверяет только аккаунты своих разделов'
+        )
+        assert {table[index].token for index in excluded} == {revoked}, (
+            'Проверьте, что отклоненный аккаунт исключается из опроса'
+        )
+        for worker in workers:
+            worker.release()
+
+
+class TestEngineAdd:
+
+    def test_added_account_is_polled(self):
+        table = AccountTable([Account(token='token0', chat_id=0)])
+        polled = []
+
+        async def scenario():
+            def poll(account):
+                polled.append(account.chat_id)
+                if account.chat_id == 1:
+                    engine.stop()
+
+            engine = PollingEngine(table, poll, FixedPollPolicy(60),
+                                   inline=True)
+            asyncio.get_running_loop().call_later(
+                0.05, engine.add, Account(token='token1', chat_id=1))
+            await asyncio.wait_for(engine.run(), timeout=5)
+
+        asyncio.run(scenario())
+        assert polled == [0, 1], (
+            'Проверьте, что добавленный аккаунт сразу опрашивается'
+        )
@@ -0,0 +1,199 @@
+import json
+import os
+import pstats
+import signal
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from metrics import MetricsServer, Registry
+from profiling import Profiler
+
+
+def busy_work():
+    return sum(index * index for index in range(2000))
+
+
+def run_phases(profiler, stop):
+    while not stop.is_set():
+        with profiler.phase('get_api_answer'):
+            time.sleep(0.001)
+        with profiler.phase('parse_status'):
+            busy_work()
+
+
+@pytest.fixture
+def worker():
+    stop = threading.Event()
+    threads = []
+
+    def start(profiler):
+        thread = threading.Thread(target=run_phases, args=(profiler, stop))
+        thread.start()
+        threads.append(thread)
+
+    yield start
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+
+class TestProfiler:
+
+    def test_sampling_capture_is_tagged_by_phase(self, tmp_path, worker):
+        profiler = Profiler(str(tmp_path), interval=0.001)
+        worker(profiler)
+        paths = profiler.capture(str(tmp_path / 'run'), 0.3, 'sampling')
+        assert [os.path.basename(path) for path in paths] == [
+            'run-stacks.txt', 'run-samples.folded', 'run-phases.json',
+            'run-tracemalloc.txt']
+        folded = (tmp_path / 'run-samples.folded').read_text()
+        assert any(line.startswith('parse_status;')
+                   for line in folded.splitlines()), (
+            'Проверьте, что сэмплы привязаны к этапам конвейера'
+        )
+        phases = json.loads((tmp_path / 'run-phases.json').read_text())
+        assert phases['parse_status']['calls'] > 0
+        assert 'Поток' in (tmp_path / 'run-stacks.txt').read_text()
+        assert (tmp_path / 'run-tracemalloc.txt').read_text()
+        assert not profiler.capturing
+
+    def test_cprofile_capture_covers_worker_threads(self, tmp_path, worker):
+        profiler = Profiler(str(tmp_path))
+        worker(profiler)
+        profiler.capture(str(tmp_path / 'run'), 0.2, 'cprofile')
+        stats = pstats.Stats(str(tmp_path / 'run-profile.pstats'))
+        assert any(name == 'busy_work'
+                   for _, _, name in stats.stats), (
+            'Проверьте, что cProfile записывает потоки опроса'
+        )
+
+    def test_phase_is_free_when_idle(self):
+        profiler = Profiler('unused')
+        with profiler.phase('send_message'):
+            pass
+        assert profiler._phase_stats == {}
+
+    def test_trigger_runs_once(self, tmp_path):
+        profiler = Profiler(str(tmp_path), interval=0.001)
+        with pytest.raises(ValueError):
+            profiler.trigger(mode='unknown')
+        assert profiler.trigger(seconds=0.2) is not None
+        assert profiler.trigger(seconds=0.2) is None, (
+            'Проверьте, что одновременно идет только одна запись'
+        )
+        for _ in range(100):
+            if not profiler.capturing:
+                break
+            time.sleep(0.05)
+        assert len(os.listdir(tmp_path)) == 4
+
+    def test_failed_capture_can_be_retried(self, tmp_path, monkeypatch):
+        import tracemalloc
+
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        profiler = Profiler(str(blocker / 'profiles'), interval=0.001)
+        errors = []
+        monkeypatch.setattr('profiling.logger.exception',
+                            lambda *args, **kwargs: errors.append(args))
+        assert profiler.capture(str(tmp_path / 'x'), 0.01, 'cprofile') == []
+        assert errors and not profiler.capturing and not profiler._cprofile, (
+            'Проверьте, что сбой записи профиля сбрасывает флаг записи'
+        )
+        assert not tracemalloc.is_tracing(), (
+            'Проверьте, что после сбоя записи tracemalloc остановлен'
+        )
+        profiler.directory = str(tmp_path)
+        assert profiler.trigger(seconds=0.01) is not None, (
+            'Проверьте, что после сбоя профиль можно записать снова'
+        )
+        for _ in range(100):
+            if len(os.listdir(tmp_path)) == 5:
+                break
+            time.sleep(0.05)
+        assert len(os.listdir(tmp_path)) == 5
+
+    def test_signal_triggers_capture(self, monkeypatch):
+        profiler = Profiler('unused')
+        triggered = threading.Event()
+        monkeypatch.setattr(profiler, 'trigger', triggered.set)
+        previous = signal.getsignal(signal.SIGUSR1)
+        try:
+            assert profiler.install_signal()
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert triggered.wait(1)
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+
+    def test_signal_does_not_take_lock_in_handler(self, monkeypatch):
+        profiler = Profiler('unused')
+        triggered = threading.Event()
+
+        def trigger():
+            if profiler._lock.acquire(timeout=1):
+                profiler._lock.release()
+                triggered.set()
+
+        monkeypatch.setattr(profiler, 'trigger', trigger)
+        previous = signal.getsignal(signal.SIGUSR1)
+        try:
+            assert profiler.install_signal()
+            with profiler._lock:
+                os.kill(os.getpid(), signal.SIGUSR1)
+                time.sleep(0.05)
+            assert triggered.wait(2), (
+                'Проверьте, что сигнал во время этапа не блокирует процесс'
+            )
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+
+    def test_signal_is_handled_in_loop(self, monkeypatch):
+        import asyncio
+
+        profiler = Profiler('unused')
+        threads = []
+        monkeypatch.setattr(profiler, 'trigger', lambda: threads.append(
+            threading.current_thread()))
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            assert profiler.install_signal(loop=loop)
+            try:
+                os.kill(os.getpid(), signal.SIGUSR1)
+                for _ in range(100):
+                    if threads:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                loop.remove_signal_handler(signal.SIGUSR1)
+
+        asyncio.run(scenario())
+        assert threads == [threading.main_thread()], (
+            'Проверьте, что запись по сигналу запускается из цикла событий'
+        )
+
+    def test_admin_command(self, monkeypatch, tmp_path):
+        import homework
+
+        monkeypatch.setattr(homework, 'PROFILER',
+                            Profiler(str(tmp_path), interval=0.001))
+        server = MetricsServer(
+            Registry(), routes={'/debug/profile': homework.profile_command})
+        server.start()
+        url = f'http://127.0.0.1:{server.port}/debug/profile?seconds=0.1'
+        try:
+            with urllib.request.urlopen(url) as response:
+                assert response.status == 202
+                assert str(tmp_path) in response.read().decode()
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(url + '&mode=unknown')
+            assert error.value.code in (400, 409)
+        finally:
+            server.stop()
+            for _ in range(100):
+                if not homework.PROFILER.capturing:
+                    break
+                time.sleep(0.05)
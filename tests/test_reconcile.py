@@ -0,0 +1,160 @@
+from accounts import Account
+from reconcile import ReconcileSchedule, snapshot_digest
+from storage import StateStore
+
+
+class Clock:
+    def __init__(self):
+        self.value = 0
+
+    def __call__(self):
+        return self.value
+
+
+class Bot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def snapshot(*statuses):
+    return {
+        'homeworks': [{'id': index, 'homework_name': f'hw{index}',
+                       'status': status}
+                      for index, status in enumerate(statuses)],
+        'current_date': 42,
+    }
+
+
+class TestReconcileSchedule:
+
+    def test_first_runs_are_staggered(self):
+        clock = Clock()
+        schedule = ReconcileSchedule(interval=3600, now=clock)
+        offsets = {schedule.offset(f'account{index}') for index in range(20)}
+        assert len(offsets) == 20 and max(offsets) < 3600, (
+            'Проверьте, что сверки аккаунтов распределены по интервалу'
+        )
+        key = 'account0'
+        clock.value = schedule.offset(key) - 1
+        assert not schedule.due(key)
+        clock.value += 1
+        assert schedule.due(key)
+        assert not schedule.due(key)
+        clock.value += 3600
+        assert schedule.due(key)
+
+    def test_zero_interval_disables(self):
+        assert not ReconcileSchedule(interval=0).due('account')
+
+    def test_digest_ignores_key_order(self):
+        assert (snapshot_digest([{'id': 1, 'status': 'approved'}])
+                == snapshot_digest([{'status': 'approved', 'id': 1}]))
+        assert (snapshot_digest([{'id': 1, 'status': 'approved'}])
+                != snapshot_digest([{'id': 1, 'status': 'rejected'}]))
+
+
+class TestReconcileAccount:
+
+    def test_missed_transition_is_sent_once(self, monkeypatch, tmp_path):
+        import homework
+
+        responses = [snapshot('reviewing', 'reviewing')]
+        monkeypatch.setattr(homework, 'get_account_snapshot',
+                            lambda token: responses[-1])
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        account = Account('token', 7, 1)
+        bot = Bot()
+        assert homework.reconcile_account(bot, account, store) == 0
+        assert bot.sent == [], (
+            'Проверьте, что первый снимок только запоминается'
+        )
+
+        diffs = []
+        diff_statuses = homework.diff_statuses
+
+        def spy(*args, **kwargs):
+            diffs.append(args)
+            return diff_statuses(*args, **kwargs)
+
+        monkeypatch.setattr(homework, 'diff_statuses', spy)
+        assert homework.reconcile_account(bot, account, store) == 0
+        assert diffs == [], (
+            'Проверьте, что неизмененный снимок отбрасывается по хешу'
+        )
+
+        responses.append(snapshot('approved', 'reviewing'))
+        assert homework.reconcile_account(bot, account, store) == 1
+        assert len(bot.sent) == 1 and '"hw0"' in bot.sent[0][1]
+        assert homework.reconcile_account(bot, account, store) == 0
+        assert len(bot.sent) == 1, (
+            'Проверьте, что пропущенное изменение отправляется один раз'
+        )
+        store.close()
+
+    def test_snapshot_is_not_quarantined_or_counted_as_duplicates(
+            self, monkeypatch, tmp_path):
+        import homework
+        from metrics import DUPLICATES, QUARANTINED
+
+        response = snapshot('approved', 'reviewing')
+        response['homeworks'].append({'id': 9, 'status': 'approved'})
+        monkeypatch.setattr(homework, 'get_account_snapshot',
+                            lambda token: response)
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        account = Account('token', 7, 1)
+        homework.notify_statuses(Bot(), account, response['homeworks'],
+                                 store)
+        duplicates = DUPLICATES.value()
+        quarantined = QUARANTINED.value('KeyError')
+        store.save_snapshot_digest(account.key, 'stale')
+        assert homework.reconcile_account(Bot(), account, store) == 0
+        assert (DUPLICATES.value(), QUARANTINED.value('KeyError')) == (
+            duplicates, quarantined), (
+            'Проверьте, что сверка не учитывает работы снимка '
+            'как дубли и не откладывает их в карантин повторно'
+        )
+        assert len(store.quarantined(account.key)) == 1
+        store.close()
+
+    def test_statuses_are_sent_while_parsing(self):
+        import homework
+
+        consumed = []
+        bot = Bot()
+
+        def homeworks():
+            for index in range(500):
+                if not bot.sent:
+                    consumed.append(index)
+                yield {'id': index, 'homework_name': f'hw{index}',
+                       'status': 'approved'}
+
+        statuses = homework.notify_statuses(bot, Account('token', 7, 1),
+                                            homeworks())
+        assert len(statuses) == 500 and len(bot.sent) > 1
+        assert len(consumed) < 100, (
+            'Проверьте, что сообщения отправляются по мере разбора ответа, '
+            'а не после сбора всех изменений'
+        )
+
+    def test_snapshot_requests_from_zero(self, monkeypatch):
+        import homework
+
+        calls = []
+
+        class Response:
+            status_code = 200
+
+            def json(self):
+                return snapshot()
+
+        def get(url, headers=None, params=None, **kwargs):
+            calls.append(params)
+            return Response()
+
+        monkeypatch.setattr(homework.get_http_session(), 'get', get)
+        homework.get_account_snapshot('token')
+        assert calls == [{'from_date': 0}]
@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+
+from exceptions import UnexpectedHomeworkStatus
+from records import Homework, HomeworkDecoder
+
+STATUSES = {
+    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+    'reviewing': 'Работа взята на проверку ревьюером.',
+    'rejected': 'Работа проверена: у ревьюера есть замечания.'
+}
+
+
+class TestHomeworkDecoder:
+
+    def test_decode_batch(self):
+        decoder = HomeworkDecoder(STATUSES)
+        records = decoder.decode_batch([
+            {'id': 1, 'homework_name': 'hw1', 'status': 'rejected',
+             'date_updated': '2020-02-13T14:40:57Z'},
+            {'homework_name': 'hw2', 'status': 'approved'},
+        ])
+        assert records == [Homework(1, 'hw1', 2, 1581604857),
+                           Homework(None, 'hw2', 0, 0)]
+        assert [record.key for record in records] == ['1', 'hw2']
+        assert decoder.status_name(records[0]) == 'rejected'
+
+    def test_message_matches_parse_status_format(self):
+        decoder = HomeworkDecoder(STATUSES)
+        record = decoder.decode({'homework_name': 'hw',
+                                 'status': 'reviewing'})
+        assert decoder.message(record) == (
+            'Изменился статус проверки работы "hw". '
+            'Работа взята на проверку ревьюером.'
+        )
+
+    def test_invalid_homeworks(self):
+        decoder = HomeworkDecoder(STATUSES)
+        with pytest.raises(KeyError):
+            decoder.decode({'status': 'approved'})
+        with pytest.raises(UnexpectedHomeworkStatus):
+            decoder.decode({'homework_name': 'hw', 'status': 'unknown'})
+
+    def test_decode_isolated_skips_invalid(self):
+        decoder = HomeworkDecoder(STATUSES)
+        rejected = []
+        records = list(decoder.decode_isolated([
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'status': 'approved'},
+            {'homework_name': 'hw2', 'status': 'lost'},
+            'hw3',
+            {'homework_name': 'hw4', 'status': 'rejected'},
+        ], lambda homework, error: rejected.append((homework, type(error)))))
+        assert [record.name for record in records] == ['hw1', 'hw4'], (
+            'Проверьте, что корректные работы декодируются '
+            'несмотря на некорректные соседние'
+        )
+        assert [error for _, error in rejected] == [
+            KeyError, UnexpectedHomeworkStatus, KeyError]
+
+    def test_record_has_no_dict(self):
+        record = Homework(1, 'hw', 0)
+        assert not hasattr(record, '__dict__')
+        assert sys.getsizeof(record) < sys.getsizeof({'id': 1})
@@ -0,0 +1,105 @@
+from accounts import Account
+from exceptions import ApiError, UnexpectedResponse
+from scheduler import IDLE, MIN_SAMPLES, AdaptivePollPolicy, PollOutcome
+
+DAY = 24 * 3600
+START = 1650000000
+
+
+def make_policy(now=0):
+    return AdaptivePollPolicy(base_delay=600, fast_delay=120,
+                              slow_delay=1800, max_backoff=3600,
+                              now=lambda: now, rng=lambda: 1.0)
+
+
+class TestAdaptivePollPolicy:
+
+    def test_reviewing_is_polled_faster(self):
+        policy = make_policy()
+        account = Account(token='token', chat_id=1)
+        delay = policy.next_delay(account,
+                                  PollOutcome(['reviewing'], None))
+        assert delay < 600, (
+            'Проверьте, что работа на проверке опрашивается чаще'
+        )
+        assert account.last_status == 'reviewing'
+
+    def test_idle_interval_is_capped(self):
+        policy = make_policy()
+        account = Account(token='token', chat_id=1)
+        assert policy.next_delay(account, PollOutcome([], None)) == 600, (
+            'Проверьте, что без тихого окна аккаунт опрашивается '
+            'не реже base_delay'
+        )
+
+    def test_quiet_window_is_polled_slower(self):
+        clock = [START]
+        policy = AdaptivePollPolicy(base_delay=600, fast_delay=120,
+                                    slow_delay=1800, max_backoff=3600,
+                                    now=lambda: clock[0], rng=lambda: 1.0)
+        for index in range(MIN_SAMPLES):
+            account = Account(token=f'token{index}', chat_id=index)
+            clock[0] = START
+            policy.next_delay(account, PollOutcome(['approved'], None))
+            clock[0] = START + DAY + index * 3600
+            policy.next_delay(account, PollOutcome(['reviewing'], None))
+        assert policy.quiet[IDLE] == DAY
+        policy.hour_weight = lambda: 1
+        account = Account(token='token', chat_id=1)
+        clock[0] = START
+        assert policy.next_delay(
+            account, PollOutcome(['approved'], None)) == 1800, (
+            'Проверьте, что в тихом окне после вердикта опрос реже'
+        )
+        clock[0] = START + DAY - 100
+        assert policy.next_delay(account, PollOutcome([], None)) == 100
+        clock[0] = START + DAY
+        assert policy.next_delay(account, PollOutcome([], None)) == 600
+
+    def test_review_interval_ramps_up(self):
+        clock = [0]
+        policy = AdaptivePollPolicy(base_delay=600, fast_delay=120,
+                                    slow_delay=1800, max_backoff=3600,
+                                    now=lambda: clock[0], rng=lambda: 1.0,
+                                    review_ramp=0.1)
+        account = Account(token='token', chat_id=1)
+        delays = []
+        for moment in (0, 1200, 3600, 36000):
+            clock[0] = moment
+            delays.append(policy.next_delay(
+                account, PollOutcome(['reviewing'] if not moment else [],
+                                     None)))
+        assert delays == [120, 240, 480, 600], (
+            'Проверьте, что интервал растет во время долгой проверки'
+        )
+
+    def test_quiet_hour_does_not_lengthen_delay(self):
+        policy = make_policy(now=3 * 3600)
+        account = Account(token='token', chat_id=1)
+        policy.verdicts_by_hour[10] = 100
+        assert policy.next_delay(account, PollOutcome([], None)) == 600
+
+    def test_api_error_backoff_grows_and_is_capped(self):
+        policy = make_policy()
+        account = Account(token='token', chat_id=1)
+        delays = [policy.next_delay(account, PollOutcome([], ApiError()))
+                  for _ in range(5)]
+        assert delays == [600, 1200, 2400, 3600, 3600]
+        policy.next_delay(account, PollOutcome([], None))
+        assert account.backoff_level == 0
+
+    def test_other_errors_use_base_delay(self):
+        policy = make_policy()
+        account = Account(token='token', chat_id=1)
+        outcome = PollOutcome([], UnexpectedResponse())
+        assert policy.next_delay(account, outcome) == 600
+        assert account.backoff_level == 0
+
+    def test_busy_hour_shortens_delay(self):
+        policy = make_policy(now=10 * 3600)
+        account = Account(token='token', chat_id=1)
+        for _ in range(10):
+            policy.observe(['approved'])
+        account.last_status = 'reviewing'
+        account.status_changed_at = 10 * 3600
+        assert policy.next_delay(account, PollOutcome([], None)) == 60
@@ -0,0 +1,157 @@
+import asyncio
+import sqlite3
+
+from sharding import LeaseCoordinator, choose_worker, partition_of
+
+
+class Clock:
+    def __init__(self):
+        self.value = 1000.0
+
+    def __call__(self):
+        return self.value
+
+
+def coordinator(path, worker, clock):
+    return LeaseCoordinator(path, worker, partitions=64, lease_ttl=30,
+                            now=clock)
+
+
+class TestSharding:
+
+    def test_rendezvous_moves_minimum(self):
+        before = {p: choose_worker(p, ['a', 'b', 'c']) for p in range(256)}
+        after = {p: choose_worker(p, ['a', 'b', 'c', 'd'])
+                 for p in range(256)}
+        moved = [p for p in before if before[p] != after[p]]
+        assert all(after[p] == 'd' for p in moved), (
+            'Проверьте, что при добавлении воркера разделы переходят '
+            'только к новому воркеру'
+        )
+        assert 0 < len(moved) < 128
+
+    def test_partitions_are_stable(self):
+        assert partition_of('account', 64) == partition_of('account', 64)
+
+    def test_workers_split_partitions_without_overlap(self, tmp_path):
+        path = tmp_path / 'shards.sqlite3'
+        clock = Clock()
+        first = coordinator(path, 'first', clock)
+        assert len(first.heartbeat()) == 64
+
+        second = coordinator(path, 'second', clock)
+        second.heartbeat()
+        assert not second.owned, (
+            'Проверьте, что занятые разделы не захватываются до освобождения'
+        )
+        first.heartbeat()
+        second.heartbeat()
+        assert first.owned and second.owned
+        assert not first.owned & second.owned
+        assert len(first.owned | second.owned) == 64
+
+        first.release()
+        clock.value += 31
+        second.heartbeat()
+        assert len(second.owned) == 64
+        second.release()
+
+    def test_expired_leases_are_taken_over(self, tmp_path):
+        path = tmp_path / 'shards.sqlite3'
+        clock = Clock()
+        crashed = coordinator(path, 'crashed', clock)
+        crashed.heartbeat()
+        survivor = coordinator(path, 'survivor', clock)
+        clock.value += 31
+        survivor.heartbeat()
+        assert len(survivor.owned) == 64
+        survivor.release()
+        crashed.connection.close()
+
+    def test_expired_lease_is_not_owned(self, tmp_path):
+        path = tmp_path / 'shards.sqlite3'
+        clock = Clock()
+        stalled = coordinator(path, 'stalled', clock)
+        stalled.heartbeat()
+        assert stalled.owns('account')
+        clock.value += 31
+        taker = coordinator(path, 'taker', clock)
+        taker.heartbeat()
+        assert taker.owns('account')
+        assert not stalled.owns('account'), (
+            'Проверьте, что воркер не опрашивает разделы после '
+            'истечения аренды'
+        )
+        taker.release()
+        stalled.connection.close()
+
+    def test_keep_leases_survives_errors(self, monkeypatch):
+        import homework
+
+        calls = []
+
+        class Coordinator:
+            def heartbeat(self):
+                calls.append(1)
+                if len(calls) == 1:
+                    raise sqlite3.OperationalError('database is locked')
+                return set()
+
+        class Store:
+            def flush(self):
+                pass
+
+        async def scenario():
+            task = asyncio.ensure_future(
+                homework.keep_leases(Coordinator(), [], Store()))
+            while len(calls) < 2:
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        errors = []
+        monkeypatch.setattr(homework, 'SHARD_LEASE_TTL', 0.03)
+        monkeypatch.setattr(homework.logger, 'error',
+                            lambda *args, **kwargs: errors.append(args))
+        asyncio.run(scenario())
+        assert errors and 'database is locked' in str(errors[0]), (
+            'Проверьте, что сбой продления аренды пишется в лог'
+        )
+
+    def test_acquired_partitions_refresh_status_cache(self, monkeypatch,
+                                                      tmp_path):
+        import homework
+        from accounts import Account
+        from storage import StateStore
+
+        path = str(tmp_path / 'state.sqlite3')
+        first, second = StateStore(path), StateStore(path)
+        account = Account('token', 1, 1)
+        first.save_status(account.key, 'hw', 'reviewing')
+        first.flush()
+        assert first.last_status(account.key, 'hw') == 'reviewing'
+        second.save_status(account.key, 'hw', 'approved')
+        second.flush()
+        partition = partition_of(account.key, homework.SHARD_PARTITIONS)
+        calls = []
+
+        class Coordinator:
+            def heartbeat(self):
+                calls.append(1)
+                return {partition}
+
+        async def scenario():
+            task = asyncio.ensure_future(
+                homework.keep_leases(Coordinator(), [account], first))
+            while not calls:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.01)
+            task.cancel()
+
+        monkeypatch.setattr(homework, 'SHARD_LEASE_TTL', 3)
+        asyncio.run(scenario())
+        assert first.last_status(account.key, 'hw') == 'approved', (
+            'Проверьте, что при получении раздела кеш статусов его '
+            'аккаунтов сбрасывается'
+        )
+        first.close()
+        second.close()
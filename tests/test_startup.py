@@ -0,0 +1,36 @@
+import homework
+from benchmarks import bench_startup
+
+
+class TestStartup:
+
+    def test_import_does_not_load_clients(self):
+        _, heavy = bench_startup.measure_import()
+        assert heavy == [], (
+            f'Проверьте, что модули {heavy} загружаются лениво'
+        )
+
+    def test_check_config_reports_missing_tokens(self, monkeypatch):
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', None)
+        monkeypatch.setattr(homework, 'ACCOUNTS_FILE', None)
+        assert homework.run_check() == 1, (
+            'Проверьте, что --check завершается с ошибкой без токенов'
+        )
+
+    def test_check_config_accepts_tokens(self, monkeypatch, capsys):
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'practicum')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 'telegram')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        monkeypatch.setattr(homework, 'ACCOUNTS_FILE', None)
+        assert homework.run_check() == 0
+        assert 'Конфигурация корректна' in capsys.readouterr().out
+
+    def test_check_config_rejects_broken_accounts_file(self, monkeypatch,
+                                                       tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text('{')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 'telegram')
+        monkeypatch.setattr(homework, 'ACCOUNTS_FILE', str(path))
+        problems = homework.check_config()
+        assert len(problems) == 1
+        assert 'accounts.json' in problems[0]
@@ -0,0 +1,71 @@
+from accounts import Account
+from storage import StateStore
+
+
+class TestStateStore:
+
+    def test_cursors_survive_restart(self, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        store = StateStore(path, batch_size=1000, flush_interval=3600)
+        store.save_cursor('account', 100)
+        store.save_status('account', '1', 'reviewing')
+        store.close()
+
+        store = StateStore(path)
+        assert store.load_cursors() == {'account': 100}, (
+            'Проверьте, что курсор аккаунта сохраняется в базе'
+        )
+        assert store.last_status('account', '1') == 'reviewing'
+        assert store.last_status('account', '2') is None
+        store.close()
+
+    def test_wal_mode(self, tmp_path):
+        store = StateStore(tmp_path / 'state.sqlite3')
+        mode = store.connection.execute('PRAGMA journal_mode').fetchone()[0]
+        store.close()
+        assert mode == 'wal'
+
+    def test_batched_writes_are_visible_before_flush(self, tmp_path):
+        store = StateStore(tmp_path / 'state.sqlite3', batch_size=1000,
+                           flush_interval=3600)
+        store.save_cursor('account', 5)
+        count = store.connection.execute(
+            'SELECT COUNT(*) FROM cursors').fetchone()[0]
+        assert count == 0
+        assert store.load_cursors() == {'account': 5}
+        store.close()
+
+    def test_poll_account_resumes_and_skips_notified(self, monkeypatch,
+                                                     tmp_path):
+        import homework
+
+        requested = []
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        def answer(token, timestamp):
+            requested.append(timestamp)
+            return {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                                   'status': 'approved'}],
+                    'current_date': 200}
+
+        monkeypatch.setattr(homework, 'get_account_api_answer', answer)
+        path = tmp_path / 'state.sqlite3'
+        store = StateStore(path)
+        homework.poll_account(Bot(), Account('token', 1, 100), store)
+        store.close()
+
+        store = StateStore(path)
+        account = Account('token', 1, 0)
+        homework.restore_cursors([account], store)
+        homework.poll_account(Bot(), account, store)
+        store.close()
+        assert requested == [100, 200], (
+            'Проверьте, что после перезапуска опрос продолжается с курсора'
+        )
+        assert len(sent) == 1, (
+            'Проверьте, что уже отправленный статус не отправляется повторно'
+        )
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from exceptions import UnexpectedResponse
+from streaming import HomeworkStream
+
+
+def chunked(data, size):
+    raw = json.dumps(data, ensure_ascii=False).encode()
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 3, 7, 1024])
+    def test_yields_every_homework(self, size):
+        data = {
+            'current_date': 1234567890,
+            'homeworks': [{'id': i, 'homework_name': f'работа {i}',
+                           'status': 'approved'} for i in range(20)],
+            'extra': {'nested': [1, 2]},
+        }
+        stream = HomeworkStream(chunked(data, size))
+        assert list(stream) == data['homeworks'], (
+            'Проверьте, что поток выдает все работы из ответа'
+        )
+        assert stream.get('current_date') == 1234567890
+        assert stream.get('missing', 5) == 5
+
+    def test_buffer_stays_small(self):
+        data = {'homeworks': [{'id': i, 'status': 'approved',
+                               'homework_name': 'x' * 100}
+                              for i in range(1000)]}
+        stream = HomeworkStream(chunked(data, 512))
+        largest = 0
+        for _ in stream:
+            largest = max(largest, len(stream._buffer))
+        assert largest < 2048, (
+            'Проверьте, что ответ не накапливается в памяти целиком'
+        )
+
+    @pytest.mark.parametrize('data, error', [
+        ([], TypeError),
+        ({'current_date': 1}, UnexpectedResponse),
+        ({'homeworks': {'status': 'approved'}}, UnexpectedResponse),
+    ])
+    def test_invalid_responses(self, data, error):
+        with pytest.raises(error):
+            list(HomeworkStream(chunked(data, 4)))
+
+    def test_truncated_response(self):
+        raw = b'{"homeworks": [{"id": 1}, {"id"'
+        with pytest.raises(UnexpectedResponse):
+            list(HomeworkStream([raw]))
+
+    def test_poll_account_in_streaming_mode(self, monkeypatch):
+        import homework
+        from accounts import Account
+
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        data = {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': 42}
+        monkeypatch.setattr(homework, 'STREAM_RESPONSES', True)
+        monkeypatch.setattr(homework, 'stream_account_api_answer',
+                            lambda token, timestamp: HomeworkStream(
+                                chunked(data, 5)))
+        account = Account('token', 1, 1)
+        outcome = homework.poll_account(Bot(), account)
+        assert outcome.statuses == ['approved'] and len(sent) == 1
+        assert account.current_timestamp == 42
@@ -0,0 +1,118 @@
+import json
+
+import requests
+
+from benchmarks import replay_trace
+from traces import CaptureSink, TraceEntry, TraceRecorder, read_trace
+
+
+class Response:
+    status_code = 200
+    reason = 'OK'
+
+    def __init__(self, payload):
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def entry(time, from_date, status, *homeworks):
+    body = json.dumps({'homeworks': list(homeworks), 'current_date': time})
+    return TraceEntry(time, 'account', from_date, status, body)
+
+
+class TestTraces:
+
+    def test_recorder_appends_across_runs(self, tmp_path):
+        path = str(tmp_path / 'trace.jsonl.gz')
+        for index in range(2):
+            recorder = TraceRecorder(path, now=lambda: 100)
+            recorder.record('account', index, 200, '{}')
+            recorder.close()
+        assert list(read_trace(path)) == [
+            TraceEntry(100, 'account', 0, 200, '{}'),
+            TraceEntry(100, 'account', 1, 200, '{}'),
+        ]
+
+    def test_api_responses_are_recorded(self, monkeypatch, tmp_path):
+        import homework
+
+        payload = {'homeworks': [], 'current_date': 5}
+        monkeypatch.setattr(requests, 'get',
+                            lambda url, **kwargs: Response(payload))
+        path = str(tmp_path / 'trace.jsonl.gz')
+        recorder = TraceRecorder(path)
+        monkeypatch.setattr(homework, 'TRACE_RECORDER', recorder)
+        assert homework.get_account_api_answer('token', 3) == payload
+        recorder.close()
+        [recorded] = read_trace(path)
+        assert recorded.account == homework.account_key('token'), (
+            'Проверьте, что в трассу пишется ключ аккаунта, а не токен'
+        )
+        assert (recorded.from_date, recorded.status) == (3, 200)
+        assert json.loads(recorded.body) == payload
+
+    def test_replay_is_repeatable(self):
+        entries = [
+            entry(10, 0, 200, {'homework_name': 'hw1', 'status': 'approved'},
+                  {'homework_name': 'hw2', 'status': 'lost'}),
+            entry(20, 10, 500),
+            entry(30, 10, 200,
+                  {'homework_name': 'hw3', 'status': 'rejected'}),
+        ]
+        first, second = CaptureSink(), CaptureSink(keep=False)
+        stats = replay_trace.replay(entries, first)
+        replay_trace.replay(entries, second)
+        assert stats == {'responses': 3, 'errors': 1, 'homeworks': 3,
+                         'invalid': 1, 'cursor_mismatches': 0}
+        texts = [text for _, text in first.sent]
+        assert len(texts) == 3 and 'API вернул 500' in texts[1]
+        assert [texts[0], texts[2]] == [
+            'Изменился статус проверки работы "hw1". '
+            'Работа проверена: ревьюеру всё понравилось. Ура!',
+            'Изменился статус проверки работы "hw3". '
+            'Работа проверена: у ревьюера есть замечания.',
+        ]
+        assert first.digest() == second.digest(), (
+            'Проверьте, что одинаковые сообщения дают одинаковый хеш'
+        )
+
+    def test_replay_runs_polling_pipeline(self):
+        import homework
+
+        saved = homework.get_account_api_answer
+        entries = [
+            entry(10, 0, 200, {'homework_name': 'hw1', 'status': 'reviewing'},
+                  {'homework_name': 'hw2', 'status': 'reviewing'}),
+            entry(20, 10, 200,
+                  {'homework_name': 'hw1', 'status': 'approved'},
+                  {'homework_name': 'hw1', 'status': 'reviewing'}),
+            entry(30, 20, 200,
+                  {'homework_name': 'hw1', 'status': 'approved'}),
+            entry(40, 5, 200),
+        ]
+        sink = CaptureSink()
+        stats = replay_trace.replay(entries, sink)
+        assert [text.count('\n') for _, text in sink.sent] == [1, 0], (
+            'Проверьте, что воспроизведение объединяет изменения '
+            'в одно сообщение и не повторяет отправленные статусы'
+        )
+        assert stats['cursor_mismatches'] == 1, (
+            'Проверьте, что воспроизведение сверяет курсоры с трассой'
+        )
+        assert homework.get_account_api_answer is saved
+
+    def test_replay_speed_scales_pauses(self):
+        pauses = []
+        clock = [0.0]
+
+        def sleep(delay):
+            pauses.append(delay)
+            clock[0] += delay
+
+        replay_trace.replay([entry(100, 0, 500), entry(110, 0, 500),
+                             entry(130, 0, 500)],
+                            CaptureSink(), speed=10, sleep=sleep,
+                            now=lambda: clock[0])
+        assert pauses == [1.0, 2.0]
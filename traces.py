@@ -0,0 +1,76 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+
+TraceEntry = namedtuple('TraceEntry',
+                        ['time', 'account', 'from_date', 'status', 'body'])
+
+
+class TraceRecorder:
+    """
+    Класс записывает ответы API homework_statuses в трассу на диске.
+    Трасса — сжатый gzip файл, по одной JSON-строке на ответ:
+    время получения, ключ аккаунта, from_date запроса, код и тело ответа.
+    Файл открывается на дозапись, поэтому трассы нескольких
+    запусков складываются в один файл.
+    """
+
+    def __init__(self, path, now=time.time):
+        self.path = path
+        self.now = now
+        self.recorded = 0
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def record(self, account, from_date, status, body):
+        """Добавляет ответ API в трассу."""
+        line = json.dumps([self.now(), account, from_date, status, body],
+                          ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self.recorded += 1
+
+    def close(self):
+        """Дописывает буфер и закрывает файл трассы."""
+        with self._lock:
+            self._file.close()
+
+
+def read_trace(path):
+    """Функция лениво читает трассу и выдает записи TraceEntry."""
+    with gzip.open(path, 'rt', encoding='utf-8') as trace_file:
+        for line in trace_file:
+            if line.strip():
+                yield TraceEntry(*json.loads(line))
+
+
+class CaptureSink:
+    """
+    Класс заменяет telegram.Bot при воспроизведении трассы.
+    Сообщения не отправляются, а сохраняются в списке sent;
+    digest() возвращает хеш всех сообщений по порядку, по которому
+    удобно сравнивать результаты двух воспроизведений.
+    """
+
+    def __init__(self, keep=True):
+        self.keep = keep
+        self.sent = []
+        self.count = 0
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        """Сохраняет сообщение вместо отправки."""
+        with self._lock:
+            self.count += 1
+            self._hash.update(f'{chat_id}\0{text}\0'.encode())
+            if self.keep:
+                self.sent.append((chat_id, text))
+
+    def digest(self):
+        """Возвращает хеш всех сохраненных сообщений."""
+        with self._lock:
+            return self._hash.hexdigest()
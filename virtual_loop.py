@@ -0,0 +1,66 @@
+import asyncio
+import selectors
+
+# Точность часов цикла. Наносекундная точность asyncio меньше шага float
+# для временных меток порядка 1e9, и таймер мог бы не сработать никогда.
+CLOCK_RESOLUTION = 1e-3
+
+
+class VirtualSelector(selectors.BaseSelector):
+    """
+    Класс селектора для цикла событий с виртуальным временем.
+    Готовность файлов проверяется без ожидания, а вместо ожидания
+    таймаута часы переводятся вперед на его длительность.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        """Регистрирует файл в настоящем селекторе."""
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        """Удаляет файл из настоящего селектора."""
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        """Изменяет отслеживаемые события файла."""
+        return self._selector.modify(fileobj, events, data)
+
+    def select(self, timeout=None):
+        """
+        Возвращает готовые файлы, переводя часы на timeout секунд.
+        Если ждать нечего (timeout=None), цикл событий завис бы
+        навсегда, поэтому выбрасывается RuntimeError.
+        """
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            raise RuntimeError('Виртуальный цикл событий: нет таймеров, '
+                               'корутины ожидают навсегда')
+        self.clock.sleep(timeout)
+        return ready
+
+    def get_map(self):
+        """Возвращает отображение зарегистрированных файлов."""
+        return self._selector.get_map()
+
+    def close(self):
+        """Закрывает настоящий селектор."""
+        self._selector.close()
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Класс цикла событий, время которого задают виртуальные часы."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        super().__init__(VirtualSelector(clock))
+        self._clock_resolution = CLOCK_RESOLUTION
+
+    def time(self):
+        """Возвращает виртуальное время."""
+        return self.clock.time()